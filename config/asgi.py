@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests served here resolve against ``settings.ASGI_URLCONF``, which routes
+the read-heavy pages to their async views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +11,21 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+
+class AsyncRoutedRequest(ASGIRequest):
+    urlconf = settings.ASGI_URLCONF
+
+
+class AsyncRoutedHandler(ASGIHandler):
+    request_class = AsyncRoutedRequest
+
+
+application = AsyncRoutedHandler()
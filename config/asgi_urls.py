@@ -0,0 +1,13 @@
+"""
+URL configuration for requests served through config.asgi.
+
+The read-heavy pages resolve to their async views, which fetch related
+data concurrently; every other URL falls through to config.urls.
+"""
+from django.urls import include, path
+
+from . import urls
+
+urlpatterns = [
+    path('', include('core.async_urls')),
+] + urls.urlpatterns
@@ -42,7 +42,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.WhiteNoiseMiddleware',
+    'core.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,6 +53,9 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'config.urls'
+# Requests arriving through config.asgi resolve here first, reaching the
+# async variants of the read-heavy pages
+ASGI_URLCONF = 'config.asgi_urls'
 
 TEMPLATES = [
     {
@@ -75,10 +79,31 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer; busy_timeout makes a writer queue for the lock instead of
+# failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable with WAL, fsyncs only at checkpoints
+    'busy_timeout': 20000,  # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative is KiB, so 64 MB of page cache
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests; checked before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so a transaction that reads first
+            # can't fail to upgrade halfway through (SQLITE_BUSY without waiting)
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ''.join(f'PRAGMA {name}={value};' for name, value in SQLITE_PRAGMAS.items()),
+        },
     }
 }
 
@@ -122,9 +147,114 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Media is served by core.views.MediaView, which checks the file belongs to a
+# report the user can see. Behind a front-end server set MEDIA_SENDFILE so it
+# transfers the file itself: 'x-accel-redirect' for nginx, with
+#   location /protected-media/ { internal; alias /path/to/media/; }
+# or 'x-sendfile' for Apache's mod_xsendfile and lighttpd. Left at None,
+# Django streams the file, which servers with a wsgi.file_wrapper (gunicorn)
+# still send with sendfile().
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_LOCATION = '/protected-media/'
+
+# Renditions generated for uploaded report photos, keyed by ReportImage field (bounding boxes in px)
+REPORT_IMAGE_SIZES = {
+    'thumbnail': (480, 480),
+    'medium': (1280, 1280),
+}
+REPORT_IMAGE_FORMAT = 'WEBP'  # or 'JPEG'
+REPORT_IMAGE_QUALITY = 80
+
+# Photo uploads are size/type-checked while streaming and spill to disk above 1 MB
+REPORT_IMAGE_MAX_UPLOAD_SIZE = 15 * 1024 * 1024
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.ReportImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Rendered report PDFs, one file per report version (id + updated_at); safe to delete
+REPORT_PDF_CACHE_DIR = BASE_DIR / 'cache' / 'report_pdfs'
+REPORT_PDF_IMAGE_SIZE = (1000, 1000)  # photos are downscaled to fit this box (px) before embedding
+REPORT_PDF_IMAGE_QUALITY = 70
+
+# Signatures are rendered on demand from their strokes; requested sizes are
+# rounded up to one of these widths (px) so the cache stays small
+REPORT_SIGNATURE_CACHE_DIR = BASE_DIR / 'cache' / 'signatures'
+REPORT_SIGNATURE_WIDTHS = (300, 600, 1200)
+
+# Dispatch planning for open maintenance requests (core.scheduling)
+SCHEDULE_HORIZON_DAYS = 14
+SCHEDULE_WORKDAYS = (0, 1, 2, 3, 4)  # Monday to Friday
+SCHEDULE_VISITS_PER_DAY = 4  # per engineer, booked reports included
+
+# Background jobs (thumbnails etc.) are stored in the database.
+# 'thread' drains the queue from a daemon thread in each web process,
+# 'worker' leaves it to `manage.py run_worker`, 'eager' runs jobs right after commit.
+TASKS_MODE = 'thread'
+TASKS_POLL_INTERVAL = 30  # seconds between queue checks when idle
+TASKS_RETRY_DELAY = 10  # seconds, doubled on every failed attempt
+TASKS_LOCK_TIMEOUT = 600  # seconds before a running job is assumed dead and requeued
+
+# A product edit reindexes up to this many of its reports as the save commits;
+# beyond that the search.index_product_reports job does it, so search shows
+# the old name until a worker (see TASKS_MODE) gets to the job.
+SEARCH_INLINE_REINDEX_LIMIT = 50
+
+# Rendered dashboard cards live in their own cache, keyed by report id and content version.
+# Local memory needs no extra service; FileBasedCache shares entries across worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+DASHBOARD_CARD_CACHE = 'fragments'
+
+# Select choices shared across forms; entries are versioned and dropped on any row change
+CHOICE_CACHE_TIMEOUT = 60 * 60
+
+# Per-view cost limits keyed by URL name, overriding @budget on the view.
+# Over-budget requests log a warning, or raise when VIEW_BUDGETS_STRICT is set,
+# as the test runner does.
+VIEW_BUDGETS = {}
+VIEW_BUDGETS_STRICT = False
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One key=value line per request with query count, timings and size
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic is the asset build step: it minifies CSS and JS, shrinks the
+# PNGs, names every file by its content hash and writes gzip/brotli copies,
+# which WhiteNoise serves with a year-long immutable Cache-Control. The hashed
+# names come from the manifest, so the test runner, which doesn't collect,
+# switches to the plain storage.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.assets.StaticAssetStorage'},
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, ServiceReport, ReportItem, ReportImage
+from .models import Product, ServiceReport, ReportItem, ReportImage, Job
 
 class ReportItemInline(admin.TabularInline):
     model = ReportItem
@@ -19,9 +19,18 @@ class ProductAdmin(admin.ModelAdmin):
 class ServiceReportAdmin(admin.ModelAdmin):
     list_display = ('id', 'client_name', 'location', 'service_date', 'engineer', 'status')
     list_filter = ('status', 'service_date', 'engineer')
+    # Matches the service_date indexes, so date and engineer filters don't scan
+    ordering = ('-service_date',)
     search_fields = ('client_name', 'location', 'issue_description')
     inlines = [ReportItemInline, ReportImageInline]
     readonly_fields = ('created_at', 'updated_at')
 
 admin.site.register(ReportItem)
 admin.site.register(ReportImage)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,209 @@
+import io
+import os
+import re
+
+from django.conf import settings
+from PIL import Image
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+WHITESPACE = ' \t\r\n\f\v'
+# After these a slash starts a regular expression rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'instanceof', 'new', 'throw', 'void', 'delete'}
+
+
+def is_word(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 126
+
+
+def scan_string(source, start):
+    # Index just past the string or template literal opening at ``start``
+    quote, i = source[start], start + 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    raise ValueError(f'Unterminated string at offset {start}')
+
+
+def scan_regex(source, start):
+    i, in_class = start + 1, False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '\n':
+            break
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            i += 1
+            while i < len(source) and is_word(source[i]):
+                i += 1
+            return i
+        i += 1
+    raise ValueError(f'Unterminated regular expression at offset {start}')
+
+
+def minify_js(source):
+    """
+    Strip comments and indentation from JavaScript without parsing it.
+
+    Line breaks between statements are kept (collapsed to one) so automatic
+    semicolon insertion still sees them; strings, template literals and
+    regular expressions are copied untouched.
+    """
+    out = []
+    last = ''  # last emitted character outside whitespace
+    word = ''  # identifier or keyword ending at ``last``
+    gap = ''  # whitespace seen since ``last``: '', ' ' or '\n'
+    i, n = 0, len(source)
+    while i < n:
+        char = source[i]
+        if char in WHITESPACE:
+            gap = '\n' if char == '\n' or gap == '\n' else ' '
+            i += 1
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end == -1:
+                raise ValueError(f'Unterminated comment at offset {i}')
+            gap = '\n' if '\n' in source[i:end] or gap == '\n' else gap or ' '
+            i = end + 2
+            continue
+
+        if gap and out:
+            if gap == '\n':
+                out.append('\n')
+            elif (is_word(last) and is_word(char)) or (last in '+-/' and char == last):
+                out.append(' ')
+        gap = ''
+
+        if char in '"\'`':
+            end = scan_string(source, i)
+        elif char == '/' and (not last or last in REGEX_PRECEDERS or word in REGEX_KEYWORDS):
+            end = scan_regex(source, i)
+        elif is_word(char):
+            end = i + 1
+            while end < n and is_word(source[end]):
+                end += 1
+        else:
+            end = i + 1
+        token = source[i:end]
+        out.append(token)
+        word = token if is_word(char) else ''
+        last = token[-1]
+        i = end
+    return ''.join(out)
+
+
+def minify_css(source):
+    """Drop comments and the whitespace CSS doesn't need, leaving strings alone."""
+    out, code = [], []
+
+    def flush():
+        # Spaces before ':' are kept, "a :hover" differs from "a:hover"
+        css = re.sub(r'\s+', ' ', ''.join(code))
+        out.append(re.sub(r' ?([{};,>]) ?|: ', lambda m: m.group(1) or ':', css).replace(';}', '}'))
+        code.clear()
+
+    i, n = 0, len(source)
+    while i < n:
+        if source[i] in '"\'':
+            end = scan_string(source, i)
+            flush()
+            out.append(source[i:end])
+            i = end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            code.append(' ')
+        else:
+            code.append(source[i])
+            i += 1
+    flush()
+    return ''.join(out).strip()
+
+
+def optimize_png(data):
+    """
+    Losslessly re-encode a PNG: drop metadata, write an exact palette when
+    the image has at most 256 colours, and let zlib search harder.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        image = original.convert('RGBA')
+    options = {'optimize': True}
+    colours = image.getcolors(256)
+    if colours is not None:
+        palette = [colour for _, colour in colours]
+        index = {bytes(colour): i for i, colour in enumerate(palette)}
+        pixels = image.tobytes()
+        indices = bytes(index[pixels[i:i + 4]] for i in range(0, len(pixels), 4))
+        encoded = Image.frombytes('P', image.size, indices)
+        encoded.putpalette([value for colour in palette for value in colour[:3]])
+        options['transparency'] = bytes(colour[3] for colour in palette)
+        image = encoded
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', **options)
+    return buffer.getvalue()
+
+
+OPTIMIZERS = {
+    '.css': lambda data: minify_css(data.decode()).encode(),
+    '.js': lambda data: minify_js(data.decode()).encode(),
+    '.png': optimize_png,
+}
+
+
+class StaticAssetStorage(CompressedManifestStaticFilesStorage):
+    """
+    Makes ``collectstatic`` the asset build step.
+
+    The project's own CSS and JS are minified and its PNGs losslessly shrunk
+    in STATIC_ROOT first; WhiteNoise's storage then hashes those optimized
+    copies into the file names, rewrites the references between files and
+    writes .gz copies (and .br ones when Brotli is installed). WhiteNoise
+    serves the hashed names as immutable. Files from apps, such as the
+    admin's, are already built and are only hashed and compressed.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for name, (storage, path) in paths.items():
+                if self.is_project_asset(storage) and self.optimize(name):
+                    # Hash the optimized copy rather than the source file
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def is_project_asset(self, storage):
+        roots = {
+            os.path.abspath(root[1] if isinstance(root, (list, tuple)) else root)
+            for root in settings.STATICFILES_DIRS
+        }
+        return os.path.abspath(getattr(storage, 'location', '')) in roots
+
+    def optimize(self, name):
+        optimizer = OPTIMIZERS.get(os.path.splitext(name)[1].lower())
+        if optimizer is None:
+            return False
+        path = self.path(name)
+        with open(path, 'rb') as fh:
+            original = fh.read()
+        optimized = optimizer(original)
+        # Already optimized files come out no smaller and are left alone
+        if len(optimized) >= len(original):
+            return False
+        with open(path, 'wb') as fh:
+            fh.write(optimized)
+        return True
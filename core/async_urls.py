@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import AsyncDashboardView, AsyncServiceReportDetailView, AsyncMaintenanceRequestDetailView
+
+# Served ahead of core.urls to requests that come in through ASGI
+urlpatterns = [
+    path('', AsyncDashboardView.as_view(), name='dashboard'),
+    path('report/<int:pk>/', AsyncServiceReportDetailView.as_view(), name='report_detail'),
+    path('requests/<int:pk>/', AsyncMaintenanceRequestDetailView.as_view(), name='request_detail'),
+]
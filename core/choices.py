@@ -0,0 +1,57 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import Lower
+
+from .models import ChoiceVersion, MaintenanceRequest, Product
+
+
+def open_requests():
+    return MaintenanceRequest.objects.exclude(status__in=MaintenanceRequest.CLOSED_STATUSES).order_by('-created_at')
+
+
+# name -> (model whose changes invalidate it, queryset factory)
+CHOICE_SOURCES = {
+    'open_requests': (MaintenanceRequest, open_requests),
+    # Every product, inactive ones included, for labelling saved report items
+    'products': (Product, lambda: Product.objects.order_by(Lower('name'))),
+}
+
+
+def choice_version(model):
+    # Kept in the database so a bump made by one worker is seen by all of them
+    label = model._meta.label_lower
+    return ChoiceVersion.objects.filter(pk=label).values_list('token', flat=True).first() or ''
+
+
+def bump_version(model):
+    # A fresh random token rather than a counter, so a rolled back or
+    # restored database never brings back a version with stale lists cached
+    ChoiceVersion.objects.update_or_create(model=model._meta.label_lower, defaults={'token': uuid.uuid4().hex})
+
+
+def get_choices(name, request=None):
+    """
+    Return the (pk, label) list for a choice source.
+
+    Lists live in the cache under a per-model version, a database row
+    replaced whenever a row of the model changes, and are memoized on
+    ``request`` so every form built while handling it shares one copy.
+    """
+    memo = getattr(request, '_choice_cache', None) if request is not None else None
+    if memo is not None and name in memo:
+        return memo[name]
+
+    model, queryset = CHOICE_SOURCES[name]
+    key = f'choices:{name}:{choice_version(model)}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = [(obj.pk, str(obj)) for obj in queryset()]
+        cache.set(key, choices, settings.CHOICE_CACHE_TIMEOUT)
+
+    if request is not None:
+        if memo is None:
+            memo = request._choice_cache = {}
+        memo[name] = choices
+    return choices
@@ -0,0 +1,46 @@
+import asyncio
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+
+def _request_context():
+    return list(connection.execute_wrappers), not connection.in_atomic_block
+
+
+def _read(func, wrappers):
+    # Worker threads keep their connection between calls; drop it once it is stale or broken
+    close_old_connections()
+    with ExitStack() as stack:
+        for wrapper in wrappers:
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        return func()
+
+
+async def gather_reads(*funcs):
+    """
+    Run independent ORM reads at the same time and return their results in order.
+
+    Each function runs on a worker thread with its own connection, which
+    SQLite in WAL mode serves concurrently, and the request's execute
+    wrappers are installed there so the queries still count against its
+    budget. Inside a transaction, such as a test case, other connections
+    can't see its uncommitted rows, so the reads then run one after the
+    other on the request's own connection.
+    """
+    wrappers, isolated = await sync_to_async(_request_context)()
+    if not isolated:
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(sync_to_async(_read, thread_sensitive=False)(func, wrappers) for func in funcs))
+
+
+def attach_prefetched(instance, **related):
+    """Store already fetched rows of ``instance``'s related managers as if prefetch_related had loaded them."""
+    cache = instance.__dict__.setdefault('_prefetched_objects_cache', {})
+    for name, rows in related.items():
+        queryset = getattr(instance, name).all()
+        queryset._result_cache = list(rows)
+        queryset._prefetch_done = True
+        cache[name] = queryset
+    return instance
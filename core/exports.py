@@ -0,0 +1,198 @@
+import csv
+import datetime
+import decimal
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import MaintenanceRequestEquipment, ReportItem
+
+CHUNK_SIZE = 500
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+REPORT_HEADERS = [
+    'Report', 'Service date', 'Status', 'Client', 'Project reference', 'Location', 'Donor', 'Engineer',
+    'Maintenance request', 'Service type', 'Billing category', 'Final status', 'Follow-up required',
+    'Issue', 'Work performed', 'Parts used', 'Product', 'Product model', 'Serial number', 'Equipment note',
+    'Created at',
+]
+REQUEST_HEADERS = [
+    'Request', 'Created at', 'Status', 'Urgency', 'Facility', 'Location', 'Donor', 'Contact name',
+    'Contact number', 'Contact email', 'Customer contact date', 'Available from', 'Available until',
+    'Billing status', 'Estimated cost', 'Created by', 'Details', 'Equipment type', 'Equipment model',
+]
+# Text starting with these is run as a formula when a spreadsheet opens a CSV
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if timezone.is_aware(value) else value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    return value
+
+
+def csv_cell(value):
+    # A leading apostrophe makes spreadsheets show the text as typed. XLSX
+    # cells are typed as strings, which are never evaluated, so need none.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def report_rows(queryset):
+    """One row per report item, or a single row for a report without items."""
+    items = ReportItem.objects.select_related('product').order_by('pk')
+    queryset = queryset.select_related('engineer').prefetch_related(Prefetch('items', queryset=items))
+    for report in queryset.iterator(chunk_size=CHUNK_SIZE):
+        head = [
+            f'SR-{report.pk}', report.service_date, report.get_status_display(), report.client_name,
+            report.project_reference, report.location, report.donor, report.engineer.username,
+            f'MR-{report.maintenance_request_id}' if report.maintenance_request_id else None,
+            str(report.service_type), str(report.billing_category), str(report.final_status),
+            report.follow_up_required, report.issue_description, report.work_performed, report.parts_used,
+        ]
+        for item in report.items.all() or [None]:
+            tail = [item.product.name, item.product.model, item.serial_number, item.equipment_note] if item else [None] * 4
+            yield [cell(value) for value in head + tail + [report.created_at]]
+
+
+def request_rows(queryset):
+    """One row per requested instrument, or a single row for a request without any."""
+    equipment = MaintenanceRequestEquipment.objects.order_by('pk')
+    queryset = queryset.select_related('created_by').prefetch_related(Prefetch('equipment_items', queryset=equipment))
+    for request in queryset.iterator(chunk_size=CHUNK_SIZE):
+        head = [
+            f'MR-{request.pk}', request.created_at, request.get_status_display(), request.get_urgency_display(),
+            request.facility_name, request.get_location_display(), request.donor, request.contact_name,
+            request.contact_number, request.contact_email, request.customer_contact_date,
+            request.availability_start, request.availability_end, request.get_billing_status_display(),
+            request.estimated_cost, request.created_by.username if request.created_by else None,
+            request.request_details,
+        ]
+        for item in request.equipment_items.all() or [None]:
+            tail = [item.equipment_type, item.model_name] if item else [None] * 2
+            yield [cell(value) for value in head + tail]
+
+
+class _Buffer:
+    # Write target for csv/zipfile that hands back whatever was written since the last drain
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data) if not isinstance(data, str) else data.encode())
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def csv_stream(headers, rows):
+    buffer = _Buffer()
+    buffer.write('\ufeff')  # lets Excel detect UTF-8
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield buffer.drain()
+    for i, row in enumerate(rows, 1):
+        writer.writerow([csv_cell(value) for value in row])
+        if i % CHUNK_SIZE == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# Control characters XML 1.0 cannot carry at all
+INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def xlsx_cell(value):
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(INVALID_XML_RE.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_stream(headers, rows, sheet='Export'):
+    """
+    Write a single-sheet workbook as it is generated.
+
+    zipfile falls back to data descriptors on an unseekable target, so each
+    deflated chunk of the worksheet can be sent as soon as it is written;
+    strings are stored inline, which avoids holding a shared string table.
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in XLSX_PARTS.items():
+            archive.writestr(name, XML_DECLARATION + xml.replace('{sheet}', escape(sheet, {'"': '&quot;'})))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as worksheet:
+            worksheet.write((
+                XML_DECLARATION +
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            ).encode())
+            worksheet.write(('<row>' + ''.join(xlsx_cell(v) for v in headers) + '</row>').encode())
+            yield buffer.drain()
+            for i, row in enumerate(rows, 1):
+                worksheet.write(('<row>' + ''.join(xlsx_cell(v) for v in row) + '</row>').encode())
+                if i % CHUNK_SIZE == 0:
+                    yield buffer.drain()
+            worksheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+def export_response(headers, rows, filename, export_format, sheet='Export'):
+    """Stream rows as a CSV or XLSX attachment named ``filename`` plus the extension."""
+    if export_format == 'xlsx':
+        content = xlsx_stream(headers, rows, sheet=sheet)
+    else:
+        export_format = 'csv'
+        content = csv_stream(headers, rows)
+    response = StreamingHttpResponse(content, content_type=FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,115 @@
+from django import forms
+from django.core import exceptions
+from django.core.exceptions import EmptyResultSet
+from django.db import models
+from django.db.models import Lookup
+from django.db.models.query_utils import DeferredAttribute
+
+
+class Flags(list):
+    """The labels set in a FlagsField, in choice order; renders as "A, B"."""
+
+    def __str__(self):
+        return ', '.join(self)
+
+
+class FlagsDescriptor(DeferredAttribute):
+    # Normalize on assignment so instances always hold a Flags list
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = self.field.to_python(value)
+
+
+class FlagsField(models.PositiveIntegerField):
+    """
+    A set of choices stored as one integer bitmask, bit N for the Nth choice.
+
+    Reads give a Flags list of the selected values; lists, comma-separated
+    strings and ints are accepted on write. ``field__has='Repair'`` matches
+    rows with that flag set, expanded to an IN over every mask containing
+    the bit so an index on the column can be used.
+    """
+    description = 'Set of choices stored as a bitmask'
+    descriptor_class = FlagsDescriptor
+
+    def __init__(self, *args, flags=(), **kwargs):
+        self.flags = [value for value, _ in flags]
+        self.flag_choices = list(flags)
+        kwargs.setdefault('default', 0)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['flags'] = self.flag_choices
+        if kwargs.get('default') == 0:
+            del kwargs['default']
+        return name, path, args, kwargs
+
+    def bit(self, value):
+        try:
+            return 1 << self.flags.index(value)
+        except ValueError:
+            raise exceptions.ValidationError(f'{value!r} is not one of {", ".join(self.flags)}.', code='invalid_choice')
+
+    def to_mask(self, value):
+        if value is None or value == '':
+            return 0
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str):
+            value = [part.strip() for part in value.split(',') if part.strip()]
+        mask = 0
+        for item in value:
+            mask |= self.bit(item)
+        return mask
+
+    def to_flags(self, mask):
+        return Flags(value for i, value in enumerate(self.flags) if mask & (1 << i))
+
+    def masks_with(self, value):
+        bit = self.bit(value)
+        return [mask for mask in range(1 << len(self.flags)) if mask & bit]
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_flags(value or 0)
+
+    def to_python(self, value):
+        if isinstance(value, Flags):
+            return value
+        return self.to_flags(self.to_mask(value))
+
+    def get_prep_value(self, value):
+        return self.to_mask(value)
+
+    def value_to_string(self, obj):
+        return str(self.to_mask(self.value_from_object(obj)))
+
+    def run_validators(self, value):
+        super().run_validators(self.to_mask(value))
+
+    def validate(self, value, model_instance):
+        # Choice validation happens in to_mask; skip IntegerField's checks on the list
+        if not self.blank and not value:
+            raise exceptions.ValidationError(self.error_messages['blank'], code='blank')
+
+    def formfield(self, **kwargs):
+        return forms.MultipleChoiceField(
+            choices=self.flag_choices,
+            widget=forms.CheckboxSelectMultiple,
+            required=not self.blank,
+            label=kwargs.get('label') or self.verbose_name.capitalize(),
+            help_text=self.help_text,
+        )
+
+
+@FlagsField.register_lookup
+class HasFlag(Lookup):
+    lookup_name = 'has'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        try:
+            masks = self.lhs.output_field.masks_with(self.rhs)
+        except exceptions.ValidationError:
+            raise EmptyResultSet
+        return f'{lhs} IN ({", ".join(["%s"] * len(masks))})', (*lhs_params, *masks)
@@ -1,4 +1,8 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
+from . import signatures
+from .choices import get_choices, open_requests
 from .models import ServiceReport, Product, ReportItem, MaintenanceRequest, MaintenanceRequestEquipment
 from django.forms import inlineformset_factory
 
@@ -42,47 +46,9 @@ MaintenanceRequestEquipmentFormSet = inlineformset_factory(
 )
 
 class ServiceReportForm(forms.ModelForm):
-    client_signature = forms.CharField(widget=forms.HiddenInput(), required=False)
+    # JSON strokes from the signature pad, left empty unless a new signature was drawn
+    signature_strokes = forms.CharField(widget=forms.HiddenInput(), required=False)
     
-    SERVICE_TYPE_CHOICES = [
-        ('Preventive Maintenance', 'Preventive Maintenance'),
-        ('Training', 'Training'),
-        ('Installation', 'Installation'),
-        ('Repair', 'Repair'),
-        ('Commissioning', 'Commissioning'),
-    ]
-    
-    BILLING_CATEGORY_CHOICES = [
-        ('Paid Service', 'Paid Service'),
-        ('Contract', 'Contract'),
-        ('Warranty', 'Warranty'),
-        ('Other', 'Other'),
-    ]
-    
-    FINAL_STATUS_CHOICES = [
-        ('Returned to working conditions', 'Returned to working conditions'),
-        ('Needs Follow up', 'Needs Follow up'),
-        ('Collected for maintenance', 'Collected for maintenance'),
-    ]
-
-    service_type = forms.MultipleChoiceField(
-        choices=SERVICE_TYPE_CHOICES,
-        widget=forms.CheckboxSelectMultiple,
-        required=False
-    )
-    
-    billing_category = forms.MultipleChoiceField(
-        choices=BILLING_CATEGORY_CHOICES,
-        widget=forms.CheckboxSelectMultiple,
-        required=False
-    )
-    
-    final_status = forms.MultipleChoiceField(
-        choices=FINAL_STATUS_CHOICES,
-        widget=forms.CheckboxSelectMultiple,
-        required=False
-    )
-
     class Meta:
         model = ServiceReport
         fields = [
@@ -97,39 +63,20 @@ class ServiceReportForm(forms.ModelForm):
             'issue_description': forms.Textarea(attrs={'rows': 3}),
             'work_performed': forms.Textarea(attrs={'rows': 3}),
             'parts_used': forms.Textarea(attrs={'rows': 2}),
-            # client_signature widget is defined in field above
+            # signature_strokes widget is defined in field above
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, request=None, **kwargs):
         super().__init__(*args, **kwargs)
         # Filter maintenance requests to show only open/active ones
-        self.fields['maintenance_request'].queryset = MaintenanceRequest.objects.exclude(status__in=['Completed', 'Cancelled']).order_by('-created_at')
-        
-        if self.instance.pk:
-            if self.instance.service_type:
-                self.fields['service_type'].initial = [x.strip() for x in self.instance.service_type.split(',')]
-            if self.instance.billing_category:
-                self.fields['billing_category'].initial = [x.strip() for x in self.instance.billing_category.split(',')]
-            if self.instance.final_status:
-                self.fields['final_status'].initial = [x.strip() for x in self.instance.final_status.split(',')]
-
-    def clean_service_type(self):
-        data = self.cleaned_data.get('service_type')
-        if isinstance(data, list):
-            return ', '.join(data)
-        return data or ''
-
-    def clean_billing_category(self):
-        data = self.cleaned_data.get('billing_category')
-        if isinstance(data, list):
-            return ', '.join(data)
-        return data or ''
-        
-    def clean_final_status(self):
-        data = self.cleaned_data.get('final_status')
-        if isinstance(data, list):
-            return ', '.join(data)
-        return data or ''
+        field = self.fields['maintenance_request']
+        field.queryset = open_requests()
+        # Render from the shared choice cache; the queryset is still used to validate
+        field.choices = [('', field.empty_label)] + get_choices('open_requests', request)
+
+    def clean_signature_strokes(self):
+        value = self.cleaned_data.get('signature_strokes')
+        return signatures.parse(value) if value else None
 
     def clean(self):
         cleaned_data = super().clean()
@@ -147,17 +94,102 @@ class ServiceReportForm(forms.ModelForm):
         
         return cleaned_data
 
+class ProductAutocompleteWidget(forms.HiddenInput):
+    """Posts only the product id; the label is looked up by the formset and searched via /products/search/."""
+    def __init__(self, attrs=None):
+        super().__init__(attrs={'class': 'product-id', **(attrs or {})})
+        self.label = ''
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-label'] = self.label
+        return context
+
+class ProductChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField that resolves ids from a dict shared by the whole formset.
+
+    BaseReportItemFormSet fills ``lookup`` with one IN query, so validating
+    N rows costs one query instead of N.
+    """
+    widget = ProductAutocompleteWidget
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookup = None
+
+    def to_python(self, value):
+        if self.lookup is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            return self.lookup[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
 class ReportItemForm(forms.ModelForm):
+    product = ProductChoiceField(queryset=Product.objects.all())
+
     class Meta:
         model = ReportItem
         fields = ['product', 'serial_number', 'equipment_note']
         widgets = {
-            'product': forms.Select(attrs={'class': 'form-control product-select'}),
             'serial_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Serial Number'}),
             'equipment_note': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Specific note for this equipment'}),
         }
 
+    @property
+    def product_label(self):
+        return self.fields['product'].widget.label
+
+    def _get_validation_exclusions(self):
+        # The product already exists: ProductChoiceField checked it against the shared lookup
+        exclude = super()._get_validation_exclusions()
+        exclude.add('product')
+        return exclude
+
 class BaseReportItemFormSet(forms.BaseInlineFormSet):
+    def __init__(self, *args, request=None, **kwargs):
+        self.request = request
+        super().__init__(*args, **kwargs)
+
+    def _product_ids(self):
+        ids = set()
+        for form in self.forms:
+            value = form['product'].value()
+            try:
+                ids.add(int(value))
+            except (TypeError, ValueError):
+                pass
+        return ids
+
+    @cached_property
+    def products(self):
+        # Bound: one IN query for every row's product, shared by validation and rendering.
+        # Unbound: labels come from the shared choice cache and no instances are needed.
+        if self.is_bound:
+            products = Product.objects.in_bulk(self._product_ids())
+            labels = {pk: str(product) for pk, product in products.items()}
+        else:
+            products = None
+            labels = dict(get_choices('products', self.request)) if self._product_ids() else {}
+        for form in self.forms:
+            form.fields['product'].lookup = products
+            try:
+                label = labels.get(int(form['product'].value()), '')
+            except (TypeError, ValueError):
+                label = ''
+            form.fields['product'].widget.label = label
+        return products
+
+    def full_clean(self):
+        if self.is_bound:
+            self.products
+        super().full_clean()
+
+    def __iter__(self):
+        self.products
+        return super().__iter__()
+
     def clean(self):
         super().clean()
         if any(self.errors):
@@ -0,0 +1,65 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def render_derivative(image, size, fmt, quality):
+    copy = image.copy()
+    copy.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    # Saving without exif/icc kwargs drops the original metadata
+    if fmt == 'JPEG':
+        copy.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        copy.save(buffer, fmt, quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def derivative_name(original_name, label, fmt):
+    stem, _ = os.path.splitext(os.path.basename(original_name))
+    return f'{stem}_{label}.{FORMAT_EXTENSIONS[fmt]}'
+
+
+def generate_derivatives(report_image, force=False):
+    """
+    Build the thumbnail and medium renditions of a ReportImage.
+
+    Derivatives are EXIF-rotated, stripped of metadata and re-encoded in
+    REPORT_IMAGE_FORMAT, then saved under the same upload path as the
+    original. Returns True when the row was updated.
+    """
+    if not report_image.image:
+        return False
+    if report_image.thumbnail and report_image.medium and not force:
+        return False
+
+    fmt = settings.REPORT_IMAGE_FORMAT.upper()
+    quality = settings.REPORT_IMAGE_QUALITY
+    try:
+        with report_image.image.open('rb') as source:
+            with Image.open(source) as original:
+                image = ImageOps.exif_transpose(original)
+                allowed_modes = ('RGB', 'RGBA') if fmt == 'WEBP' else ('RGB',)
+                if image.mode not in allowed_modes:
+                    image = image.convert('RGBA' if 'A' in image.mode and fmt == 'WEBP' else 'RGB')
+                renditions = {
+                    label: render_derivative(image, size, fmt, quality)
+                    for label, size in settings.REPORT_IMAGE_SIZES.items()
+                }
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        logger.warning('Could not build derivatives for %s: %s', report_image.image.name, exc)
+        return False
+
+    # Replaced renditions are left for gc_media, they may be shared with other rows
+    for label, data in renditions.items():
+        getattr(report_image, label).save(derivative_name(report_image.image.name, label, fmt), ContentFile(data), save=False)
+    report_image.save(update_fields=list(renditions))
+    return True
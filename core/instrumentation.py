@@ -0,0 +1,148 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('core.metrics')
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def budget(**limits):
+    """
+    Declare the cost a view is allowed, e.g. ``@budget(queries=6)``.
+
+    Works on function views and view classes. Limits are ``queries``,
+    ``db_ms``, ``template_ms``, ``total_ms`` and ``bytes``; entries in
+    ``settings.VIEW_BUDGETS`` (keyed by URL name) take precedence.
+    """
+    def decorator(view):
+        view.budget = limits
+        return view
+    return decorator
+
+
+def view_budget(view_func, url_name):
+    view = getattr(view_func, 'view_class', view_func)
+    limits = dict(getattr(view, 'budget', {}))
+    limits.update(settings.VIEW_BUDGETS.get(url_name, {}))
+    return limits
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.total_ms = 0.0
+        self.bytes = None
+        self.budget = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - start) * 1000
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ])
+
+    def over_budget(self):
+        return {
+            name: (getattr(self, name), limit) for name, limit in self.budget.items()
+            if getattr(self, name) is not None and getattr(self, name) > limit
+        }
+
+
+def add_query_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_query_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class InstrumentationMiddleware:
+    """
+    Measure query count, DB time, template render time and response size.
+
+    Results go out as a ``Server-Timing`` header and one ``core.metrics``
+    log line per request. Views over their budget log a warning, or raise
+    BudgetExceeded when ``settings.VIEW_BUDGETS_STRICT`` is set (as it is
+    by the project's test runner). Runs natively in both the WSGI and the
+    ASGI handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        with connection.execute_wrapper(metrics.record_query):
+            response = self.get_response(request)
+        return self.finish(request, response, start)
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs on the request's sync thread, so the wrapper goes on that thread's connection
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        await sync_to_async(add_query_wrapper)(metrics.record_query)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_query_wrapper)(metrics.record_query)
+        return self.finish(request, response, start)
+
+    def finish(self, request, response, start):
+        metrics = request.metrics
+        metrics.total_ms = (time.perf_counter() - start) * 1000
+        if not response.streaming:
+            metrics.bytes = len(response.content)
+        response['Server-Timing'] = metrics.server_timing()
+
+        match = request.resolver_match
+        view = match.view_name if match else '-'
+        logger.info(
+            'view=%s method=%s status=%s queries=%d db_ms=%.1f template_ms=%.1f total_ms=%.1f bytes=%s',
+            view, request.method, response.status_code, metrics.queries, metrics.db_ms,
+            metrics.template_ms, metrics.total_ms, metrics.bytes if metrics.bytes is not None else '-',
+        )
+
+        exceeded = metrics.over_budget()
+        if exceeded:
+            message = f'{view} over budget: ' + ', '.join(
+                f'{name}={value:g} (limit {limit:g})' for name, (value, limit) in exceeded.items()
+            )
+            if settings.VIEW_BUDGETS_STRICT:
+                raise BudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics.budget = view_budget(view_func, request.resolver_match.url_name)
+
+    def process_template_response(self, request, response):
+        # Render here, inside the timer; Django skips rendering an already rendered response
+        start = time.perf_counter()
+        response.render()
+        request.metrics.template_ms += (time.perf_counter() - start) * 1000
+        return response
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.images import generate_derivatives
+from core.models import ReportImage
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and medium renditions for report photos that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives for every image')
+
+    def handle(self, *args, **options):
+        queryset = ReportImage.objects.order_by('pk')
+        if not options['force']:
+            queryset = queryset.filter(Q(thumbnail='') | Q(thumbnail__isnull=True) | Q(medium='') | Q(medium__isnull=True))
+
+        built = skipped = 0
+        for report_image in queryset.iterator(chunk_size=100):
+            if generate_derivatives(report_image, force=options['force']):
+                built += 1
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} images ({skipped} skipped).'))
@@ -0,0 +1,192 @@
+import asyncio
+import io
+import logging
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import MaintenanceRequest, ServiceReport
+
+from .benchmark_views import percentile
+
+HOST = 'testserver'
+
+
+def wsgi_get(application, path, cookie):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '443', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST, 'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_get(application, path, cookie):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'https', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': (HOST, 443),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client never disconnects; Django cancels this wait once it has responded
+        return await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+def http_get(base_url, path, cookie):
+    request = urllib.request.Request(base_url.rstrip('/') + path, headers={'Cookie': cookie})
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def run_threads(get, paths, concurrency):
+    def timed(path):
+        start = time.perf_counter()
+        status = get(path)
+        return (time.perf_counter() - start) * 1000, status
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(timed, paths))
+
+
+def run_tasks(get, paths, concurrency):
+    async def main():
+        pending = iter(paths)
+        results = []
+
+        async def worker():
+            for path in pending:
+                start = time.perf_counter()
+                status = await get(path)
+                results.append(((time.perf_counter() - start) * 1000, status))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the read-heavy pages through the WSGI and the ASGI entry points at the same '
+        'concurrency and report throughput and p50/p95 latency for each. By default both '
+        'applications are driven in-process: WSGI from a pool of threads, as gunicorn\'s threaded '
+        'workers do, and ASGI from tasks on one event loop, as a uvicorn worker does. Pass '
+        '--wsgi-url and --asgi-url to load running servers instead, e.g. '
+        '"gunicorn config.wsgi --threads 8" and "gunicorn config.asgi -k uvicorn.workers.UvicornWorker".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and server')
+        parser.add_argument('--scenario', action='append', help='Only run these scenarios (repeatable)')
+        parser.add_argument('--wsgi-url', help='Base URL of a running WSGI server')
+        parser.add_argument('--asgi-url', help='Base URL of a running ASGI server')
+
+    def handle(self, *args, **options):
+        if bool(options['wsgi_url']) != bool(options['asgi_url']):
+            raise CommandError('Pass both --wsgi-url and --asgi-url, or neither.')
+        user = User.objects.filter(is_staff=True, is_active=True).order_by('pk').first()
+        report = ServiceReport.objects.order_by('-created_at').first()
+        request = MaintenanceRequest.objects.order_by('-created_at').first()
+        if user is None or report is None or request is None:
+            raise CommandError('Needs a staff user, a service report and a maintenance request; run generate_synthetic_data first.')
+
+        scenarios = {
+            'dashboard': reverse('dashboard'),
+            'report_detail': reverse('report_detail', args=[report.pk]),
+            'request_detail': reverse('request_detail', args=[request.pk]),
+        }
+        if options['scenario']:
+            unknown = set(options['scenario']) - set(scenarios)
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}. Choose from {", ".join(scenarios)}.')
+            scenarios = {name: scenarios[name] for name in options['scenario']}
+
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        concurrency = options['concurrency']
+
+        if options['wsgi_url']:
+            servers = {
+                'wsgi': lambda paths: run_threads(lambda path: http_get(options['wsgi_url'], path, cookie), paths, concurrency),
+                'asgi': lambda paths: run_threads(lambda path: http_get(options['asgi_url'], path, cookie), paths, concurrency),
+            }
+        else:
+            from config.asgi import application as asgi_application
+            from config.wsgi import application as wsgi_application
+            servers = {
+                'wsgi': lambda paths: run_threads(lambda path: wsgi_get(wsgi_application, path, cookie), paths, concurrency),
+                'asgi': lambda paths: run_tasks(lambda path: asgi_get(asgi_application, path, cookie), paths, concurrency),
+            }
+
+        # The per-request metrics lines would drown the report
+        metrics_logger = logging.getLogger('core.metrics')
+        level = metrics_logger.level
+        metrics_logger.setLevel(logging.WARNING)
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+                for name, path in scenarios.items():
+                    for server, run in servers.items():
+                        run([path] * concurrency)  # warm up connections, caches and threads
+                        start = time.perf_counter()
+                        samples = run([path] * options['requests'])
+                        results[name, server] = self.summarise(samples, time.perf_counter() - start)
+        finally:
+            metrics_logger.setLevel(level)
+        self.report(results, concurrency, options['requests'])
+
+    def summarise(self, samples, elapsed):
+        timings = [ms for ms, _ in samples]
+        return {
+            'rps': len(samples) / elapsed,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 95),
+            'errors': sum(1 for _, status in samples if status != 200),
+        }
+
+    def report(self, results, concurrency, requests):
+        self.stdout.write(f'{requests} requests per scenario and server, {concurrency} in flight')
+        self.stdout.write(f"{'scenario':<18}{'server':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for (name, server), r in results.items():
+            line = f"{name:<18}{server:<8}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['errors']:>8}"
+            self.stdout.write(self.style.ERROR(line) if r['errors'] else line)
@@ -0,0 +1,94 @@
+import io
+import math
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from PIL import Image
+
+from core.models import ReportImage, ServiceReport
+from core.uploads import attach_images, stage_images
+
+
+class Rollback(Exception):
+    pass
+
+
+def noise_jpeg(target_bytes):
+    # Random pixels barely compress, so size the image from a small calibration run
+    sample = io.BytesIO()
+    Image.frombytes('RGB', (200, 200), os.urandom(200 * 200 * 3)).save(sample, 'JPEG', quality=90)
+    side = int(math.sqrt(target_bytes / (sample.tell() / (200 * 200))))
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure how long the report save transaction stays open with large photos, '
+        'writing files inside the transaction (before) vs staging them first (after). '
+        'Everything runs in a rolled-back transaction against a temporary MEDIA_ROOT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--photos', type=int, default=10)
+        parser.add_argument('--size-mb', type=float, default=5)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root, REPORT_IMAGE_MAX_UPLOAD_SIZE=10 ** 9):
+                results = self.run(options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(f"{options['photos']} photos x {options['size_mb']} MB, {options['repeat']} runs")
+        for label, timings in results.items():
+            self.stdout.write(
+                f'{label:<28} median {statistics.median(timings) * 1000:8.1f} ms   '
+                f'max {max(timings) * 1000:8.1f} ms'
+            )
+
+    def photos(self, options):
+        size = int(options['size_mb'] * 1024 * 1024)
+        return [
+            SimpleUploadedFile(f'photo_{i}.jpg', noise_jpeg(size), content_type='image/jpeg')
+            for i in range(options['photos'])
+        ]
+
+    def run(self, options):
+        results = {'inline (create per file)': [], 'staged (bulk_create)': []}
+        factory = RequestFactory()
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__upload_benchmark__')
+                for _ in range(options['repeat']):
+                    report = ServiceReport.objects.create(client_name='Benchmark', engineer=user)
+
+                    photos = self.photos(options)
+                    start = time.perf_counter()
+                    with transaction.atomic():
+                        for photo in photos:
+                            ReportImage.objects.create(report=report, image=photo)
+                    results['inline (create per file)'].append(time.perf_counter() - start)
+
+                    request = factory.post('/', {'images': self.photos(options)})
+                    names = stage_images(request)
+                    request.close()
+                    start = time.perf_counter()
+                    with transaction.atomic():
+                        attach_images(report, names)
+                    results['staged (bulk_create)'].append(time.perf_counter() - start)
+                raise Rollback
+        except Rollback:
+            pass
+        return results
@@ -0,0 +1,202 @@
+import json
+import logging
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import MaintenanceRequest, Product, ReportItem, ServiceReport
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the main views through the test client and report p50/p95 latency, query count, '
+        'peak Python memory and response size per scenario. Writes are rolled back. Results can '
+        'be saved as a JSON baseline and compared against a previous one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--scenario', action='append', help='Only run these scenarios (repeatable)')
+        parser.add_argument('--save', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Compare against a baseline JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Relative p95 slowdown allowed before a scenario counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_staff=True, is_active=True).order_by('pk').first()
+        report = ServiceReport.objects.order_by('-created_at').first()
+        request = MaintenanceRequest.objects.order_by('-created_at').first()
+        if user is None or report is None or request is None:
+            raise CommandError('Needs a staff user, a service report and a maintenance request; run generate_synthetic_data first.')
+
+        scenarios = self.scenarios(report, request)
+        if options['scenario']:
+            unknown = set(options['scenario']) - set(scenarios)
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}. Choose from {", ".join(scenarios)}.')
+            scenarios = {name: scenarios[name] for name in options['scenario']}
+
+        client = Client()
+        client.force_login(user)
+        results = {}
+        # The per-request metrics lines would drown the report
+        metrics_logger = logging.getLogger('core.metrics')
+        level = metrics_logger.level
+        metrics_logger.setLevel(logging.WARNING)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for name, run in scenarios.items():
+                    results[name] = self.measure(client, run, options['iterations'], options['warmup'])
+        finally:
+            metrics_logger.setLevel(level)
+
+        data = {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'rows': {
+                'reports': ServiceReport.objects.count(),
+                'report_items': ReportItem.objects.count(),
+                'maintenance_requests': MaintenanceRequest.objects.count(),
+                'products': Product.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        self.report(data)
+
+        if options['save']:
+            with open(options['save'], 'w') as fh:
+                json.dump(data, fh, indent=2)
+            self.stdout.write(f'Saved results to {options["save"]}')
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+            regressions = self.compare(baseline, data, options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'Regressions in: {", ".join(regressions)}')
+
+    def scenarios(self, report, request):
+        items = list(report.items.all())
+        search_term = (report.client_name or 'clinic').split()[0]
+        report_data = {
+            'client_name': 'Benchmark Facility',
+            'location': 'Beirut',
+            'status': 'Draft',
+            'items-TOTAL_FORMS': str(len(items)),
+            'items-INITIAL_FORMS': str(len(items)),
+            'items-MIN_NUM_FORMS': '0',
+            'items-MAX_NUM_FORMS': '1000',
+        }
+        for i, item in enumerate(items):
+            report_data.update({
+                f'items-{i}-id': str(item.pk),
+                f'items-{i}-product': str(item.product_id),
+                f'items-{i}-serial_number': item.serial_number or '',
+            })
+        create_data = {
+            **report_data,
+            'items-INITIAL_FORMS': '0',
+            **{f'items-{i}-id': '' for i in range(len(items))},
+        }
+        update_url = reverse('report_update', args=[report.pk])
+
+        return {
+            'dashboard': lambda c: c.get(reverse('dashboard')),
+            'dashboard_search': lambda c: c.get(reverse('dashboard'), {'q': search_term}),
+            'report_detail': lambda c: c.get(reverse('report_detail', args=[report.pk])),
+            'request_list': lambda c: c.get(reverse('request_list')),
+            'request_detail': lambda c: c.get(reverse('request_detail', args=[request.pk])),
+            'report_create_form': lambda c: c.get(reverse('report_create')),
+            'report_create_submit': lambda c: self.rolled_back(lambda: c.post(reverse('report_create'), create_data)),
+            'report_update_form': lambda c: c.get(update_url),
+            'report_update_submit': lambda c: self.rolled_back(lambda: c.post(update_url, report_data)),
+        }
+
+    def rolled_back(self, func):
+        response = None
+        try:
+            with transaction.atomic():
+                response = func()
+                raise Rollback
+        except Rollback:
+            pass
+        return response
+
+    def measure(self, client, run, iterations, warmup):
+        for _ in range(warmup):
+            run(client)
+
+        timings, queries = [], []
+        response = None
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = run(client)
+            timings.append((time.perf_counter() - start) * 1000)
+            queries.append(response.wsgi_request.metrics.queries)
+        if response.status_code >= 400:
+            raise CommandError(f'{response.wsgi_request.path} returned {response.status_code}')
+
+        # Separate pass: tracemalloc slows allocation-heavy code too much to time alongside
+        tracemalloc.start()
+        try:
+            run(client)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': max(queries),
+            'peak_kb': round(peak / 1024, 1),
+            'bytes': len(response.content),
+        }
+
+    def report(self, data):
+        self.stdout.write(f"{data['rows']['reports']} reports, {data['iterations']} iterations per scenario")
+        self.stdout.write(f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>10}{'bytes':>10}")
+        for name, r in data['results'].items():
+            self.stdout.write(
+                f"{name:<24}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['queries']:>9}{r['peak_kb']:>10.1f}{r['bytes']:>10}"
+            )
+
+    def compare(self, baseline, current, tolerance):
+        regressions = []
+        self.stdout.write(f"Compared with baseline from {baseline.get('created_at', '?')}:")
+        for name, r in current['results'].items():
+            before = baseline['results'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:<24} (not in baseline)')
+                continue
+            change = (r['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+            regressed = change > tolerance or r['queries'] > before['queries']
+            line = f"{name:<24} p95 {change:+7.1%}   queries {before['queries']} -> {r['queries']}"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line + '   REGRESSION'))
+            else:
+                self.stdout.write(line)
+        return regressions
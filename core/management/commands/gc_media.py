@@ -0,0 +1,107 @@
+import datetime
+import posixpath
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import MediaBlob, media_storage
+from core.storage import referenced_names
+
+
+class Command(BaseCommand):
+    help = 'Recount media references and delete content-addressed blobs no row points at'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Keep unreferenced blobs younger than this (uploads still in flight)')
+        parser.add_argument('--adopt-legacy', action='store_true',
+                            help='Move files saved before content addressing into the blob store first')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if options['adopt_legacy']:
+            adopted, freed = self.adopt_legacy(dry_run)
+            self.stdout.write(f'Adopted {adopted} legacy file references, freed {freed} duplicate files.')
+
+        registered = self.register_untracked(dry_run)
+        counts = referenced_names()
+        changed = []
+        for blob in MediaBlob.objects.iterator():
+            refs = counts.get(blob.name, 0)
+            if blob.ref_count != refs:
+                blob.ref_count = refs
+                changed.append(blob)
+        if not dry_run:
+            MediaBlob.objects.bulk_update(changed, ['ref_count'], batch_size=500)
+
+        cutoff = timezone.now() - datetime.timedelta(minutes=options['grace_minutes'])
+        orphans = [
+            blob for blob in MediaBlob.objects.filter(created_at__lt=cutoff).iterator()
+            if not counts.get(blob.name)
+        ]
+        freed = sum(blob.size for blob in orphans)
+        if not dry_run:
+            for blob in orphans:
+                media_storage.delete(blob.name)
+            MediaBlob.objects.filter(pk__in=[blob.pk for blob in orphans]).delete()
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Registered {registered} untracked blobs, fixed {len(changed)} ref counts, '
+            f'removed {len(orphans)} orphaned blobs ({freed} bytes).'
+        ))
+
+    def content_fields(self):
+        for model in apps.get_app_config('core').get_models():
+            for field in model._meta.concrete_fields:
+                if getattr(field, 'storage', None) is media_storage:
+                    yield model, field
+
+    def walk(self, directory):
+        try:
+            subdirs, files = media_storage.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in files:
+            yield posixpath.join(directory, name)
+        for sub in subdirs:
+            yield from self.walk(posixpath.join(directory, sub))
+
+    def register_untracked(self, dry_run):
+        # Blobs on disk without a MediaBlob row (e.g. copied in from a backup)
+        directories = {field.upload_to.rstrip('/') for _, field in self.content_fields()}
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        missing = [
+            MediaBlob(name=name, size=media_storage.size(name))
+            for directory in directories
+            for name in self.walk(directory)
+            if media_storage.is_hashed(name) and name not in known
+        ]
+        if not dry_run:
+            MediaBlob.objects.bulk_create(missing, ignore_conflicts=True)
+        return len(missing)
+
+    def adopt_legacy(self, dry_run):
+        adopted, legacy = 0, set()
+        for model, field in self.content_fields():
+            rows = model.objects.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+            for pk, name in rows.values_list('pk', field.attname).iterator():
+                if media_storage.is_hashed(name) or not media_storage.exists(name):
+                    continue
+                adopted += 1
+                legacy.add(name)
+                if dry_run:
+                    continue
+                with media_storage.open(name, 'rb') as legacy_file:
+                    hashed = media_storage.save(name, legacy_file)
+                model.objects.filter(pk=pk).update(**{field.attname: hashed})
+
+        still_used = referenced_names()
+        freed = 0
+        for name in legacy:
+            if not dry_run and name not in still_used:
+                media_storage.delete(name)
+                freed += 1
+        return adopted, freed
@@ -0,0 +1,240 @@
+import datetime
+import io
+import random
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core import choices, search, signatures, stats
+from core.images import derivative_name, render_derivative
+from core.models import (
+    MaintenanceRequest, MaintenanceRequestEquipment, Product, ReportImage, ReportItem, ServiceReport, media_storage,
+)
+from core.storage import adjust_references
+
+USER_PREFIX = 'synthetic_'
+
+INSTRUMENTS = [
+    ('Centrifuge', 'Lab Equipment'), ('Incubator', 'Lab Equipment'), ('Autoclave', 'Sterilization'),
+    ('Hematology Analyzer', 'Diagnostics'), ('Chemistry Analyzer', 'Diagnostics'), ('Microscope', 'Imaging'),
+    ('Ultrasound Scanner', 'Imaging'), ('Patient Monitor', 'ICU'), ('Infusion Pump', 'ICU'),
+    ('Ventilator', 'ICU'), ('Defibrillator', 'Emergency'), ('Biosafety Cabinet', 'Lab Equipment'),
+    ('PCR Thermocycler', 'Molecular'), ('Spectrophotometer', 'Lab Equipment'), ('X-Ray Unit', 'Imaging'),
+]
+MANUFACTURERS = ['Thermo Fisher', 'Siemens', 'Mindray', 'Philips', 'GE Healthcare', 'Eppendorf', 'Olympus', 'Sysmex']
+FACILITIES = ['Hospital', 'Medical Center', 'Clinic', 'Primary Healthcare Center', 'Laboratory', 'Blood Bank']
+TOWNS = [town for _, towns in MaintenanceRequest.LEBANON_LOCATIONS for town, _ in towns]
+DONORS = ['WHO', 'UNICEF', 'USAID', 'EU', 'World Bank', 'MoPH', '']
+ISSUES = [
+    'Device does not power on', 'Error code on startup', 'Temperature drifts out of range',
+    'Unusual noise during operation', 'Calibration overdue', 'Display flickers', 'Door seal leaking',
+    'Results inconsistent with controls', 'Battery does not hold charge', 'Alarm triggers without cause',
+]
+WORK = [
+    'Replaced the power supply board', 'Recalibrated sensors against reference standard',
+    'Cleaned and lubricated moving parts', 'Updated firmware to latest version', 'Replaced door gasket',
+    'Performed full preventive maintenance checklist', 'Trained staff on daily operation',
+    'Replaced worn drive belt', 'Verified electrical safety', 'Replaced battery pack',
+]
+PARTS = ['Power supply', 'Fuse 2A', 'Door gasket', 'Drive belt', 'Battery pack', 'Temperature probe', '']
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with realistic synthetic users, products, maintenance requests and service '
+        'reports (with items, photos and signatures) for benchmarking. Rows are bulk inserted; the '
+        'search index and media reference counts are brought up to date at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--products', type=int, default=300)
+        parser.add_argument('--requests', type=int, default=3000)
+        parser.add_argument('--reports', type=int, default=10000)
+        parser.add_argument('--items-per-report', type=int, default=3, help='Maximum items per report')
+        parser.add_argument('--images-per-report', type=int, default=3, help='Maximum photos per report')
+        parser.add_argument('--photo-pool', type=int, default=25,
+                            help='Distinct photos to generate; reports reuse them like repeated uploads would')
+        parser.add_argument('--days', type=int, default=730, help='Spread creation dates over this many days')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        photos = self.photo_pool(options['photo_pool'])
+        signatures = self.signature_pool(5)
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            products = self.create_products(options['products'])
+            requests = self.create_requests(options['requests'], users)
+            reports = self.create_reports(options['reports'], users, requests, signatures)
+            items = self.create_items(reports, products, options['items_per_report'])
+            images = self.create_images(reports, photos, options['images_per_report'])
+            adjust_references(Counter(
+                name for image in images for name in (image.image.name, image.thumbnail.name, image.medium.name)
+            ))
+            indexed = search.rebuild_index()
+        # bulk_create bypasses the signals that normally invalidate these
+        choices.bump_version(Product)
+        choices.bump_version(MaintenanceRequest)
+        stats.recompute()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users, {len(products)} products, {len(requests)} maintenance requests, '
+            f'{len(reports)} reports with {items} items and {len(images)} photos; indexed {indexed} reports.'
+        ))
+
+    def timestamp(self):
+        return self.now - datetime.timedelta(seconds=self.random.randint(0, self.days * 86400))
+
+    def spread_created_at(self, model, objects):
+        # auto_now_add overwrites created_at on insert, so backdate in a second pass
+        for obj in objects:
+            obj.created_at = self.timestamp()
+        model.objects.bulk_update(objects, ['created_at'], batch_size=self.batch_size)
+
+    def photo_pool(self, count):
+        fmt = settings.REPORT_IMAGE_FORMAT.upper()
+        pool = []
+        for i in range(count):
+            width, height = self.random.choice([(1600, 1200), (1200, 1600), (2048, 1536)])
+            image = Image.new('RGB', (width, height), tuple(self.random.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(40):
+                x, y = self.random.randrange(width), self.random.randrange(height)
+                draw.ellipse(
+                    [x, y, x + self.random.randint(50, 400), y + self.random.randint(50, 400)],
+                    fill=tuple(self.random.randrange(256) for _ in range(3)),
+                )
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            original = media_storage.save(f'report_photos/synthetic_{i}.jpg', ContentFile(buffer.getvalue()))
+            renditions = {
+                label: media_storage.save(
+                    f'report_photos/{derivative_name(original, label, fmt)}',
+                    ContentFile(render_derivative(image, size, fmt, settings.REPORT_IMAGE_QUALITY)),
+                )
+                for label, size in settings.REPORT_IMAGE_SIZES.items()
+            }
+            pool.append((original, renditions.get('thumbnail'), renditions.get('medium')))
+        return pool
+
+    def signature_pool(self, count):
+        pool = []
+        for _ in range(count):
+            strokes = [
+                [(x, 100 + self.random.randint(-60, 60)) for x in range(start, start + 180, 12)]
+                for start in (30, 240)
+            ]
+            data = signatures.encode(500, 200, strokes)
+            pool.append((data, signatures.digest(data)))
+        return pool
+
+    def create_users(self, count):
+        start = User.objects.filter(username__startswith=USER_PREFIX).count()
+        users = []
+        for i in range(start, start + count):
+            user = User(username=f'{USER_PREFIX}{i:04d}', first_name=f'Engineer {i}', is_staff=(i == 0))
+            user.set_unusable_password()
+            users.append(user)
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_products(self, count):
+        products = []
+        for i in range(count):
+            name, category = self.random.choice(INSTRUMENTS)
+            manufacturer = self.random.choice(MANUFACTURERS)
+            products.append(Product(
+                name=f'{name} {manufacturer.split()[0]} {self.random.randint(100, 999)}',
+                category=category,
+                manufacturer=manufacturer,
+                model=f'{manufacturer[:2].upper()}-{self.random.randint(1000, 9999)}',
+                is_active=self.random.random() > 0.05,
+            ))
+        return Product.objects.bulk_create(products, batch_size=self.batch_size)
+
+    def create_requests(self, count, users):
+        requests = []
+        for i in range(count):
+            requests.append(MaintenanceRequest(
+                urgency=self.random.choice(MaintenanceRequest.URGENCY_CHOICES)[0],
+                contact_name=f'Contact {i}',
+                contact_number=f'+961 {self.random.randint(1000000, 9999999)}',
+                facility_name=f'{self.random.choice(TOWNS)} {self.random.choice(FACILITIES)}',
+                location=self.random.choice(TOWNS),
+                donor=self.random.choice(DONORS),
+                request_details=self.random.choice(ISSUES),
+                billing_status=self.random.choice(MaintenanceRequest.BILLING_STATUS_CHOICES)[0],
+                status=self.random.choice(MaintenanceRequest.REQUEST_STATUS_CHOICES)[0],
+                created_by=self.random.choice(users),
+            ))
+        requests = MaintenanceRequest.objects.bulk_create(requests, batch_size=self.batch_size)
+        self.spread_created_at(MaintenanceRequest, requests)
+        MaintenanceRequestEquipment.objects.bulk_create([
+            MaintenanceRequestEquipment(
+                request=request, equipment_type=self.random.choice(INSTRUMENTS)[0],
+                model_name=f'Model {self.random.randint(1, 99)}',
+            )
+            for request in requests for _ in range(self.random.randint(1, 3))
+        ], batch_size=self.batch_size)
+        return requests
+
+    def create_reports(self, count, users, requests, signatures):
+        reports = []
+        for i in range(count):
+            request = self.random.choice(requests) if requests and self.random.random() < 0.6 else None
+            status = self.random.choice(ServiceReport.STATUS_CHOICES)[0]
+            reports.append(ServiceReport(
+                client_name=request.facility_name if request else f'{self.random.choice(TOWNS)} {self.random.choice(FACILITIES)}',
+                project_reference=f'PRJ-{self.random.randint(100, 999)}',
+                location=request.location if request else self.random.choice(TOWNS),
+                donor=self.random.choice(DONORS),
+                service_date=self.timestamp(),
+                maintenance_request=request,
+                engineer=self.random.choice(users),
+                issue_description=self.random.choice(ISSUES),
+                work_performed='. '.join(self.random.sample(WORK, 2)),
+                parts_used=self.random.choice(PARTS),
+                service_type=self.random.choice([['Repair'], ['Preventive Maintenance'], ['Installation', 'Training']]),
+                billing_category=[self.random.choice(['Paid Service', 'Contract', 'Warranty'])],
+                final_status=['Returned to working conditions'],
+                status=status,
+                client_representative_name=f'Representative {i}',
+                **self.signature_fields(signatures, status),
+            ))
+        reports = ServiceReport.objects.bulk_create(reports, batch_size=self.batch_size)
+        self.spread_created_at(ServiceReport, reports)
+        return reports
+
+    def signature_fields(self, signatures, status):
+        if status != 'Completed':
+            return {}
+        data, digest = self.random.choice(signatures)
+        return {'signature_strokes': data, 'signature_digest': digest}
+
+    def create_items(self, reports, products, per_report):
+        items = [
+            ReportItem(report=report, product=self.random.choice(products), serial_number=f'SN-{self.random.randint(10 ** 5, 10 ** 6)}')
+            for report in reports for _ in range(self.random.randint(1, max(per_report, 1)))
+        ]
+        ReportItem.objects.bulk_create(items, batch_size=self.batch_size)
+        return len(items)
+
+    def create_images(self, reports, photos, per_report):
+        if not photos:
+            return []
+        images = []
+        for report in reports:
+            for image, thumbnail, medium in self.random.sample(photos, self.random.randint(0, min(per_report, len(photos)))):
+                images.append(ReportImage(report=report, image=image, thumbnail=thumbnail, medium=medium))
+        return ReportImage.objects.bulk_create(images, batch_size=self.batch_size)
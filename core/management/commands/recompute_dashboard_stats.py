@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core import stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard summary counters from the reports and requests tables (run nightly)'
+
+    def handle(self, *args, **options):
+        drifted = stats.recompute()
+        for (metric, key), (stored, actual) in sorted(drifted.items()):
+            self.stdout.write(f'{metric}[{key}]: {stored} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'Dashboard stats rebuilt, {len(drifted)} counters had drifted.'))
@@ -0,0 +1,38 @@
+import datetime
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ServiceReport
+from core.pdf import report_pdf
+
+
+def date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Expected a YYYY-MM-DD date, got {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Render the completed service reports of a date range into one ZIP of PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date, required=True, help='First service date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date, required=True, help='Last service date, inclusive')
+        parser.add_argument('--output', required=True, help='Path of the ZIP archive to write')
+
+    def handle(self, *args, **options):
+        if options['end'] < options['start']:
+            raise CommandError('--end is before --start.')
+        reports = ServiceReport.objects.filter(
+            status='Completed', service_date__date__range=(options['start'], options['end']),
+        ).only('id', 'updated_at').order_by('service_date', 'pk')
+
+        count = 0
+        # PDFs are already compressed, so they are stored as-is
+        with zipfile.ZipFile(options['output'], 'w', compression=zipfile.ZIP_STORED) as archive:
+            for report in reports.iterator(chunk_size=200):
+                archive.write(report_pdf(report), f'SR-{report.pk}.pdf')
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} report PDFs to {options["output"]}.'))
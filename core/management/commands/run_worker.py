@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Process queued background jobs (thumbnails, search reindexing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--sleep', type=float, default=None,
+                            help='Seconds to wait when the queue is empty (default TASKS_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        sleep = options['sleep'] if options['sleep'] is not None else settings.TASKS_POLL_INTERVAL
+        while True:
+            close_old_connections()
+            requeued = tasks.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale jobs.')
+            processed = tasks.run_pending()
+            if processed:
+                self.stdout.write(f'Processed {processed} jobs.')
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(sleep)
@@ -0,0 +1,43 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.scheduling import Plan
+
+
+class Command(BaseCommand):
+    help = (
+        'Plan visits for the open maintenance requests: assign each to an engineer and a working day '
+        'within its availability window, urgent requests first and visits grouped by district. '
+        'Prints the plan; --apply marks the planned requests Scheduled.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to plan (YYYY-MM-DD), default today')
+        parser.add_argument('--days', type=int, help='Calendar days to plan, default SCHEDULE_HORIZON_DAYS')
+        parser.add_argument('--visits-per-day', type=int, help='Visits per engineer and day, default SCHEDULE_VISITS_PER_DAY')
+        parser.add_argument('--apply', action='store_true', help='Save the plan')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        plan = Plan(start=options['start'], horizon=options['days'], capacity=options['visits_per_day'])
+        elapsed = (time.perf_counter() - started) * 1000
+
+        for engineer, day, rows in plan.day_plans():
+            self.stdout.write(f'{day:%a %Y-%m-%d}  {engineer}')
+            for row in rows:
+                self.stdout.write(
+                    f"    MR-{row['pk']:<6} {row['urgency']:<10} {row['location'] or '-':<16} {row['facility_name'] or ''}"
+                )
+        if options['verbosity'] > 1:
+            for row, reason in plan.unscheduled_rows():
+                self.stdout.write(f"MR-{row['pk']} ({row['urgency']}) not scheduled: {reason}")
+
+        self.stdout.write(
+            f'{len(plan.assignments)} of {len(plan.requests)} open requests planned over {len(plan.days)} working days '
+            f'for {len(plan.engineers)} engineers in {elapsed:.0f} ms.'
+        )
+        if options['apply']:
+            count = plan.apply()
+            self.stdout.write(self.style.SUCCESS(f'{count} requests marked Scheduled.'))
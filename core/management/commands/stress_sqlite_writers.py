@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+from core.models import MaintenanceRequest, Product, ReportItem, ServiceReport
+
+# Django's stock SQLite behaviour: rollback journal, deferred BEGIN, 5 s busy timeout
+PROFILES = {
+    'stock': {'init_command': 'PRAGMA journal_mode=DELETE;'},
+    'tuned': settings.DATABASES['default'].get('OPTIONS', {}),
+}
+
+
+def use_database(path, options):
+    # Give this (forked) process a fresh default connection to the scratch database
+    current = connections['default']
+    settings_dict = {**current.settings_dict, 'NAME': path, 'OPTIONS': dict(options), 'CONN_MAX_AGE': None}
+    connections['default'] = current.__class__(settings_dict, 'default')
+
+
+def prepare(path):
+    use_database(path, PROFILES['stock'])
+    call_command('migrate', verbosity=0)
+    user = User.objects.create(username='stress')
+    product = Product.objects.create(name='Centrifuge', category='Lab', manufacturer='Acme', model='C1')
+    connections.close_all()
+    os._exit(0 if user.pk and product.pk else 1)
+
+
+def writer(path, options, deadline, results):
+    use_database(path, options)
+    user = User.objects.get(username='stress')
+    product = Product.objects.get()
+    saves, errors, latencies = 0, 0, []
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            # Same shape as a report save: a read, the report, its items, the search index
+            with transaction.atomic():
+                MaintenanceRequest.objects.exists()
+                report = ServiceReport.objects.create(client_name='Stress Clinic', location='Beirut', engineer=user)
+                for i in range(3):
+                    ReportItem.objects.create(report=report, product=product, serial_number=f'SN-{i}')
+        except OperationalError:
+            errors += 1
+            continue
+        saves += 1
+        latencies.append(time.monotonic() - start)
+    connections.close_all()
+    results.put(('writer', saves, errors, latencies))
+
+
+def reader(path, options, deadline, results):
+    use_database(path, options)
+    reads, errors = 0, 0
+    while time.monotonic() < deadline:
+        try:
+            list(ServiceReport.objects.cards().order_by('-created_at')[:20])
+        except OperationalError:
+            errors += 1
+            continue
+        reads += 1
+    connections.close_all()
+    results.put(('reader', reads, errors, []))
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer a scratch copy of the schema with concurrent report saves and dashboard reads from '
+        'separate processes, once with stock SQLite settings and once with the tuned profile from '
+        'settings, and report writer throughput, lock errors and save latency for each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('This stress test only applies to SQLite.')
+        context = multiprocessing.get_context('fork')
+        workdir = tempfile.mkdtemp()
+        connections.close_all()
+        try:
+            template = os.path.join(workdir, 'template.sqlite3')
+            process = context.Process(target=prepare, args=(template,))
+            process.start()
+            process.join()
+            if process.exitcode:
+                raise CommandError('Could not build the scratch database.')
+
+            self.stdout.write(
+                f"{options['writers']} writers, {options['readers']} readers, {options['seconds']:g} s per profile"
+            )
+            for name in options['profile'] or ['stock', 'tuned']:
+                path = os.path.join(workdir, f'{name}.sqlite3')
+                shutil.copy(template, path)
+                self.report(name, self.run(context, path, PROFILES[name], options))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run(self, context, path, profile, options):
+        results = context.Queue()
+        deadline = time.monotonic() + options['seconds']
+        processes = [
+            context.Process(target=writer, args=(path, profile, deadline, results)) for _ in range(options['writers'])
+        ] + [
+            context.Process(target=reader, args=(path, profile, deadline, results)) for _ in range(options['readers'])
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        writers = [r for r in collected if r[0] == 'writer']
+        readers = [r for r in collected if r[0] == 'reader']
+        latencies = sorted(latency for r in writers for latency in r[3])
+        return {
+            'saves': sum(r[1] for r in writers),
+            'write_errors': sum(r[2] for r in writers),
+            'reads': sum(r[1] for r in readers),
+            'read_errors': sum(r[2] for r in readers),
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+            'seconds': options['seconds'],
+        }
+
+    def report(self, name, r):
+        self.stdout.write(
+            f"{name:<6} {r['saves'] / r['seconds']:8.1f} saves/s  {r['write_errors']:5} locked saves  "
+            f"p50 {r['p50'] * 1000:7.1f} ms  p95 {r['p95'] * 1000:7.1f} ms  |  "
+            f"{r['reads'] / r['seconds']:8.1f} reads/s  {r['read_errors']:4} locked reads"
+        )
@@ -0,0 +1,149 @@
+import mimetypes
+import os
+import posixpath
+import re
+from functools import reduce
+from operator import or_
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import ReportImage, ServiceReport, media_storage
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+YEAR = 365 * 24 * 3600
+
+# Upload directory -> the model whose rows reference files there, the field
+# leading to their report, and the file fields to look in
+REFERENCES = {
+    'signatures': (ServiceReport, 'pk', ('client_signature',)),
+    'report_photos': (ReportImage, 'report_id', ('image', 'thumbnail', 'medium')),
+}
+
+
+def owning_report(name):
+    """The id of a report referencing media file ``name``, or None. One indexed query."""
+    reference = REFERENCES.get(name.split('/', 1)[0])
+    if reference is None:
+        return None
+    model, report_field, fields = reference
+    matches = reduce(or_, (Q(**{field: name}) for field in fields))
+    return model.objects.filter(matches).values_list(report_field, flat=True).first()
+
+
+class FileRange:
+    """
+    The next ``length`` bytes of an open file. Exposes ``fileno`` so a
+    server's wsgi.file_wrapper can still sendfile() it; the response's
+    Content-Length bounds that transfer.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    The inclusive ``(start, end)`` of a single byte range, or None to send
+    the whole file: no header, a malformed one, or several ranges, which
+    are rarely asked for and may be answered in full. Raises ValueError
+    when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N asks for the last N bytes
+        if int(last) == 0:
+            raise ValueError('Empty suffix range.')
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('Range starts past the end of the file.')
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def send_file(request, name):
+    """
+    Respond with media file ``name``, which the caller has already
+    authorized. Conditional requests are answered here; the transfer is
+    handed to the front-end server when ``MEDIA_SENDFILE`` names one, and
+    otherwise streamed from the open file, honouring Range requests.
+    """
+    path = media_storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('No such file.')
+
+    hashed = media_storage.is_hashed(name)
+    if hashed:
+        etag = quote_etag(posixpath.splitext(posixpath.basename(name))[0])
+    else:
+        etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(name)
+        elif settings.MEDIA_SENDFILE == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = os.path.abspath(path)
+        else:
+            response = stream_file(request, path, stat.st_size, content_type, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if hashed:
+        # Content-addressed names never change content
+        patch_cache_control(response, private=True, max_age=YEAR, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def stream_file(request, path, size, content_type, etag, last_modified):
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range in (etag, http_date(last_modified)):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
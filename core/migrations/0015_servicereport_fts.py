@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_servicereport_fts USING fts5("
+        "client_name, location, donor, issue_description, work_performed, parts_used, products, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_servicereport_fts "
+        "(rowid, client_name, location, donor, issue_description, work_performed, parts_used, products) "
+        "SELECT r.id, COALESCE(r.client_name, ''), COALESCE(r.location, ''), COALESCE(r.donor, ''), "
+        "COALESCE(r.issue_description, ''), COALESCE(r.work_performed, ''), COALESCE(r.parts_used, ''), "
+        "COALESCE((SELECT group_concat(COALESCE(p.name, '') || ' ' || COALESCE(p.model, '') || ' ' || "
+        "COALESCE(p.serial_number, '') || ' ' || COALESCE(i.serial_number, ''), ' ') "
+        "FROM core_reportitem i JOIN core_product p ON p.id = i.product_id WHERE i.report_id = r.id), '') "
+        "FROM core_servicereport r"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_servicereport_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_maintenancerequest_billing_status_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
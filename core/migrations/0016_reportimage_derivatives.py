@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_servicereport_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportimage',
+            name='medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='report_photos/'),
+        ),
+        migrations.AddField(
+            model_name='reportimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='report_photos/'),
+        ),
+    ]
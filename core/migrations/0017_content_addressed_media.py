@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:34
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_reportimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Content-addressed path relative to MEDIA_ROOT', max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='reportimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to='report_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='reportimage',
+            name='medium',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='report_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='reportimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='report_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='servicereport',
+            name='client_signature',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='signatures/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:42
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='core_product_name_lower'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+import core.fields
+from django.db import migrations
+
+FIELDS = ['service_type', 'billing_category', 'final_status']
+
+
+def strings_to_flags(apps, schema_editor):
+    ServiceReport = apps.get_model('core', 'ServiceReport')
+    known = {
+        name: {flag.lower(): flag for flag in ServiceReport._meta.get_field(f'{name}_flags').flags}
+        for name in FIELDS
+    }
+    reports = []
+    for report in ServiceReport.objects.only('pk', *FIELDS).iterator():
+        for name in FIELDS:
+            # Values outside the form's choices can't be represented and are dropped
+            parts = [part.strip().lower() for part in (getattr(report, name) or '').split(',')]
+            setattr(report, f'{name}_flags', [known[name][part] for part in parts if part in known[name]])
+        reports.append(report)
+    ServiceReport.objects.bulk_update(reports, [f'{name}_flags' for name in FIELDS], batch_size=500)
+
+
+def flags_to_strings(apps, schema_editor):
+    ServiceReport = apps.get_model('core', 'ServiceReport')
+    reports = []
+    for report in ServiceReport.objects.only('pk', *[f'{name}_flags' for name in FIELDS]).iterator():
+        for name in FIELDS:
+            setattr(report, name, str(getattr(report, f'{name}_flags')))
+        reports.append(report)
+    ServiceReport.objects.bulk_update(reports, FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_product_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicereport',
+            name='service_type_flags',
+            field=core.fields.FlagsField(blank=True, db_index=True, flags=[('Preventive Maintenance', 'Preventive Maintenance'), ('Training', 'Training'), ('Installation', 'Installation'), ('Repair', 'Repair'), ('Commissioning', 'Commissioning')]),
+        ),
+        migrations.AddField(
+            model_name='servicereport',
+            name='billing_category_flags',
+            field=core.fields.FlagsField(blank=True, db_index=True, flags=[('Paid Service', 'Paid Service'), ('Contract', 'Contract'), ('Warranty', 'Warranty'), ('Other', 'Other')]),
+        ),
+        migrations.AddField(
+            model_name='servicereport',
+            name='final_status_flags',
+            field=core.fields.FlagsField(blank=True, db_index=True, flags=[('Returned to working conditions', 'Returned to working conditions'), ('Needs Follow up', 'Needs Follow up'), ('Collected for maintenance', 'Collected for maintenance')]),
+        ),
+        migrations.RunPython(strings_to_flags, flags_to_strings),
+        migrations.RemoveField(model_name='servicereport', name='service_type'),
+        migrations.RemoveField(model_name='servicereport', name='billing_category'),
+        migrations.RemoveField(model_name='servicereport', name='final_status'),
+        migrations.RenameField(model_name='servicereport', old_name='service_type_flags', new_name='service_type'),
+        migrations.RenameField(model_name='servicereport', old_name='billing_category_flags', new_name='billing_category'),
+        migrations.RenameField(model_name='servicereport', old_name='final_status_flags', new_name='final_status'),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_servicereport_category_flags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['created_at'], name='core_request_created'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['status', 'created_at'], name='core_request_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['created_by', 'created_at'], name='core_request_owner_created'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['created_by', 'status', 'created_at'], name='core_request_owner_status'),
+        ),
+        migrations.AddIndex(
+            model_name='servicereport',
+            index=models.Index(fields=['created_at'], name='core_report_created'),
+        ),
+        migrations.AddIndex(
+            model_name='servicereport',
+            index=models.Index(fields=['status', 'created_at'], name='core_report_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='servicereport',
+            index=models.Index(fields=['service_date'], name='core_report_service_date'),
+        ),
+        migrations.AddIndex(
+            model_name='servicereport',
+            index=models.Index(fields=['engineer', 'service_date'], name='core_report_engineer_date'),
+        ),
+    ]
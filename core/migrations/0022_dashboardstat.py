@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:06
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+# As core.stats counted them when this table was added
+CLOSED_STATUSES = ['Completed', 'Cancelled']
+UNSPECIFIED = 'Unspecified'
+
+
+def seed_stats(apps, schema_editor):
+    # Start from the current counts; signals keep them up to date from here
+    ServiceReport = apps.get_model('core', 'ServiceReport')
+    MaintenanceRequest = apps.get_model('core', 'MaintenanceRequest')
+    User = apps.get_model('auth', 'User')
+    DashboardStat = apps.get_model('core', 'DashboardStat')
+
+    report_labels = dict(ServiceReport._meta.get_field('status').choices)
+    governorates = {
+        town: governorate
+        for governorate, towns in MaintenanceRequest._meta.get_field('location').choices
+        for town, _ in towns
+    }
+    reports = ServiceReport.objects.order_by()
+    requests = MaintenanceRequest.objects.order_by()
+
+    stats = {}
+    for row in reports.values('status').annotate(total=Count('pk')):
+        stats['report_status', row['status']] = (report_labels.get(row['status'], row['status']), row['total'])
+    months = reports.values('engineer_id', month=TruncMonth('created_at')).annotate(total=Count('pk'))
+    usernames = dict(User.objects.filter(pk__in={row['engineer_id'] for row in months}).values_list('pk', 'username'))
+    for row in months:
+        key = f"{row['month']:%Y-%m}:{row['engineer_id']}"
+        stats['engineer_month', key] = (usernames.get(row['engineer_id'], key), row['total'])
+    for row in requests.exclude(status__in=CLOSED_STATUSES).values('urgency').annotate(total=Count('pk')):
+        stats['open_request_urgency', row['urgency']] = (row['urgency'], row['total'])
+    by_governorate = Counter()
+    for row in requests.values('location').annotate(total=Count('pk')):
+        by_governorate[governorates.get(row['location'], UNSPECIFIED)] += row['total']
+    for governorate, total in by_governorate.items():
+        stats['request_governorate', governorate] = (governorate, total)
+
+    DashboardStat.objects.bulk_create([
+        DashboardStat(metric=metric, key=key, label=label, value=value)
+        for (metric, key), (label, value) in stats.items() if value
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_list_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=100)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'key'), name='core_dashboardstat_metric_key')],
+            },
+        ),
+        migrations.RunPython(seed_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_dashboardstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicereport',
+            name='signature_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='servicereport',
+            name='signature_strokes',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
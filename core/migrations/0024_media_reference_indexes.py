@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:55
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_servicereport_signature_strokes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportimage',
+            name='image',
+            field=models.ImageField(db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to='report_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='reportimage',
+            name='medium',
+            field=models.ImageField(blank=True, db_index=True, editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='report_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='reportimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='report_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='servicereport',
+            name='client_signature',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='signatures/'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChoiceVersion',
+            fields=[
+                ('model', models.CharField(help_text='Model label, e.g. core.product', max_length=100, primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=32)),
+            ],
+        ),
+    ]
@@ -1,7 +1,19 @@
+import hashlib
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils import timezone
 
+from . import signatures
+from .fields import FlagsField
+from .storage import ContentAddressedStorage
+
+media_storage = ContentAddressedStorage()
+
 class Product(models.Model):
     name = models.CharField(max_length=255)
     category = models.CharField(max_length=255)
@@ -10,10 +22,36 @@ class Product(models.Model):
     serial_number = models.CharField(max_length=255, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the prefix search behind /products/search/
+            models.Index(Lower('name'), name='core_product_name_lower'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.model})"
 
+class ServiceReportQuerySet(models.QuerySet):
+    CARD_FIELDS = (
+        'id', 'client_name', 'location', 'service_date', 'status',
+        'created_at', 'updated_at', 'engineer__id', 'engineer__username',
+    )
+
+    def cards(self):
+        # Everything a dashboard card renders, fetched in a single query
+        images = ReportImage.objects.filter(report=OuterRef('pk')).order_by('pk')
+        items = ReportItem.objects.filter(report=OuterRef('pk')).order_by('pk')
+        item_count = items.order_by().values('report').annotate(total=Count('pk')).values('total')
+        return self.select_related('engineer').only(*self.CARD_FIELDS).annotate(
+            first_image=Subquery(images.values('image')[:1]),
+            first_thumbnail=Subquery(images.values('thumbnail')[:1]),
+            first_medium=Subquery(images.values('medium')[:1]),
+            first_product_name=Subquery(items.values('product__name')[:1]),
+            item_count=Coalesce(Subquery(item_count), Value(0)),
+        )
+
 class ServiceReport(models.Model):
     STATUS_CHOICES = [
         ('Draft', 'Draft'),
@@ -21,6 +59,27 @@ class ServiceReport(models.Model):
         ('Completed', 'Completed'),
     ]
 
+    SERVICE_TYPE_CHOICES = [
+        ('Preventive Maintenance', 'Preventive Maintenance'),
+        ('Training', 'Training'),
+        ('Installation', 'Installation'),
+        ('Repair', 'Repair'),
+        ('Commissioning', 'Commissioning'),
+    ]
+
+    BILLING_CATEGORY_CHOICES = [
+        ('Paid Service', 'Paid Service'),
+        ('Contract', 'Contract'),
+        ('Warranty', 'Warranty'),
+        ('Other', 'Other'),
+    ]
+
+    FINAL_STATUS_CHOICES = [
+        ('Returned to working conditions', 'Returned to working conditions'),
+        ('Needs Follow up', 'Needs Follow up'),
+        ('Collected for maintenance', 'Collected for maintenance'),
+    ]
+
     client_name = models.CharField(max_length=200, blank=True, null=True)
     project_reference = models.CharField(max_length=100, blank=True, null=True, help_text="Project Reference / Contract Number")
     location = models.CharField(max_length=200, blank=True, null=True, help_text="City / Facility / Department")
@@ -35,23 +94,87 @@ class ServiceReport(models.Model):
     work_performed = models.TextField(blank=True, null=True)
     parts_used = models.TextField(blank=True, null=True)
 
-    service_type = models.CharField(max_length=255, help_text="Comma-separated service types", blank=True, null=True)
-    billing_category = models.CharField(max_length=255, help_text="Comma-separated billing categories", blank=True, null=True)
-    final_status = models.CharField(max_length=255, help_text="Comma-separated final status outcomes", blank=True, null=True)
+    service_type = FlagsField(flags=SERVICE_TYPE_CHOICES, blank=True, db_index=True)
+    billing_category = FlagsField(flags=BILLING_CATEGORY_CHOICES, blank=True, db_index=True)
+    final_status = FlagsField(flags=FINAL_STATUS_CHOICES, blank=True, db_index=True)
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Draft')
     follow_up_required = models.BooleanField(default=False)
 
     client_representative_name = models.CharField(max_length=200, blank=True, null=True)
     client_phone_number = models.CharField(max_length=20, blank=True, null=True, help_text="Contact number for the client")
-    client_signature = models.ImageField(upload_to='signatures/', blank=True, null=True)
+    client_signature = models.ImageField(upload_to='signatures/', storage=media_storage, blank=True, null=True, db_index=True)
+    # Pen strokes from the signature pad (see core.signatures); client_signature
+    # only holds the PNGs of reports signed before strokes were recorded
+    signature_strokes = models.BinaryField(blank=True, null=True, editable=False)
+    signature_digest = models.CharField(max_length=64, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ServiceReportQuerySet.as_manager()
+
+    CARD_VERSION_FIELDS = (
+        'client_name', 'location', 'service_date', 'status', 'updated_at',
+        'first_image', 'first_thumbnail', 'first_medium', 'first_product_name', 'item_count',
+    )
+
+    class Meta:
+        indexes = [
+            # Dashboard: newest first, optionally by status
+            models.Index(fields=['created_at'], name='core_report_created'),
+            models.Index(fields=['status', 'created_at'], name='core_report_status_created'),
+            # Admin list filters
+            models.Index(fields=['service_date'], name='core_report_service_date'),
+            models.Index(fields=['engineer', 'service_date'], name='core_report_engineer_date'),
+        ]
+
     def __str__(self):
         return f"SR-{self.id} | {self.client_name}"
 
+    # The first_* properties are only available on querysets built with ServiceReport.objects.cards()
+    @property
+    def card_version(self):
+        # Digest of everything a dashboard card shows, so any edit to the report,
+        # its first image, its items or their product names yields a new version
+        values = [self.engineer.username] + [getattr(self, name, None) for name in self.CARD_VERSION_FIELDS]
+        return hashlib.md5(repr(values).encode()).hexdigest()
+
+    def set_signature(self, strokes):
+        """Store encoded pen strokes, leaving the report untouched if they match the current ones."""
+        digest = signatures.digest(strokes)
+        if digest == self.signature_digest:
+            return False
+        self.signature_strokes = strokes
+        self.signature_digest = digest
+        self.client_signature = None
+        return True
+
+    @property
+    def signature_url(self):
+        # Drawn signatures render on demand; older reports still point at their PNG
+        if self.signature_digest:
+            return f"{reverse('report_signature', args=[self.pk, 'svg'])}?v={self.signature_digest[:12]}"
+        return self.client_signature.url if self.client_signature else ''
+
+    def _media_url(self, name):
+        return ReportImage._meta.get_field('image').storage.url(name) if name else ''
+
+    @property
+    def first_image_url(self):
+        return self._media_url(getattr(self, 'first_image', None))
+
+    @property
+    def first_thumbnail_url(self):
+        return self._media_url(getattr(self, 'first_thumbnail', None) or getattr(self, 'first_image', None))
+
+    @property
+    def first_image_srcset(self):
+        return image_srcset({
+            'thumbnail': getattr(self, 'first_thumbnail', None),
+            'medium': getattr(self, 'first_medium', None),
+        })
+
 class ReportItem(models.Model):
     report = models.ForeignKey(ServiceReport, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -63,12 +186,31 @@ class ReportItem(models.Model):
 
 class ReportImage(models.Model):
     report = models.ForeignKey(ServiceReport, related_name='images', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to='report_photos/')
+    # Indexed so the media view can find the report a file belongs to
+    image = models.ImageField(upload_to='report_photos/', storage=media_storage, db_index=True)
+    thumbnail = models.ImageField(upload_to='report_photos/', storage=media_storage, blank=True, null=True, editable=False, db_index=True)
+    medium = models.ImageField(upload_to='report_photos/', storage=media_storage, blank=True, null=True, editable=False, db_index=True)
     caption = models.CharField(max_length=255, blank=True, null=True)
 
     def __str__(self):
         return f"Image for Report {self.report.id}"
 
+    @property
+    def thumbnail_url(self):
+        return (self.thumbnail or self.image).url
+
+    @property
+    def srcset(self):
+        return image_srcset({'thumbnail': self.thumbnail.name, 'medium': self.medium.name})
+
+def image_srcset(names):
+    # names maps a REPORT_IMAGE_SIZES label to a stored file name
+    storage = ReportImage._meta.get_field('image').storage
+    return ', '.join(
+        f"{storage.url(name)} {settings.REPORT_IMAGE_SIZES[label][0]}w"
+        for label, name in names.items() if name
+    )
+
 class MaintenanceRequest(models.Model):
     URGENCY_CHOICES = [
         ('Low', 'Low'),
@@ -84,6 +226,7 @@ class MaintenanceRequest(models.Model):
         ('Completed', 'Completed'),
         ('Cancelled', 'Cancelled'),
     ]
+    CLOSED_STATUSES = ['Completed', 'Cancelled']
 
     LEBANON_LOCATIONS = [
         ('Beirut', (
@@ -156,11 +299,23 @@ class MaintenanceRequest(models.Model):
     estimated_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Engineer's estimated pricing")
     
     status = models.CharField(max_length=20, choices=REQUEST_STATUS_CHOICES, default='Open')
+    # Set when the request is Scheduled, by hand or by core.scheduling
+    assigned_engineer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_requests')
+    scheduled_date = models.DateField(blank=True, null=True, db_index=True)
     
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Request list (staff see everything, engineers their own) and the open-request choices
+            models.Index(fields=['created_at'], name='core_request_created'),
+            models.Index(fields=['status', 'created_at'], name='core_request_status_created'),
+            models.Index(fields=['created_by', 'created_at'], name='core_request_owner_created'),
+            models.Index(fields=['created_by', 'status', 'created_at'], name='core_request_owner_status'),
+        ]
+
     def __str__(self):
         return f"MR-{self.id} | {self.facility_name or 'No Facility'}"
 
@@ -171,3 +326,73 @@ class MaintenanceRequestEquipment(models.Model):
 
     def __str__(self):
         return f"{self.equipment_type} - {self.model_name} (MR-{self.request.id})"
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True, help_text="Content-addressed path relative to MEDIA_ROOT")
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class DashboardStat(models.Model):
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100)
+    label = models.CharField(max_length=255, blank=True)
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key'], name='core_dashboardstat_metric_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}[{self.key}] = {self.value}"
+
+class ChoiceVersion(models.Model):
+    """Changes on every write to ``model``, naming the cached choice lists that are current."""
+    model = models.CharField(max_length=100, primary_key=True, help_text="Model label, e.g. core.product")
+    token = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.model} @ {self.token}"
+
+class Job(models.Model):
+    PENDING = 'Pending'
+    RUNNING = 'Running'
+    DONE = 'Done'
+    FAILED = 'Failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=255, blank=True, null=True, help_text="Only one pending job per key")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='core_job_status_run_after'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'], condition=models.Q(status='Pending'),
+                name='core_job_unique_pending_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
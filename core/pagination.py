@@ -0,0 +1,179 @@
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, direction):
+    def prep(value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    payload = json.dumps({'v': [prep(v) for v in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+class CursorPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.cursor_for(self.object_list[-1], 'n')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return self.paginator.cursor_for(self.object_list[0], 'p')
+        return None
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over the queryset's own ordering.
+
+    The ordering must be made of plain field or annotation names; ``id`` is
+    appended as a tie-breaker so every row has a unique position. Pages are
+    addressed by opaque tokens holding the ordering values of the boundary
+    row, so page N costs the same as page 1 and no OFFSET is used.
+    """
+    count_cache_timeout = 60
+
+    def __init__(self, queryset, per_page, count_cache_timeout=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        if count_cache_timeout is not None:
+            self.count_cache_timeout = count_cache_timeout
+        self.keys = self._ordering_keys(queryset)
+
+    @staticmethod
+    def _ordering_keys(queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        keys = []
+        for field in ordering:
+            if not isinstance(field, str) or field == '?':
+                raise ValueError(f'Cursor pagination needs named orderings, got {field!r}')
+            name = field.lstrip('-')
+            keys.append(('id' if name == 'pk' else name, field.startswith('-')))
+        if 'id' not in [name for name, _ in keys]:
+            keys.append(('id', keys[-1][1] if keys else True))
+        return keys
+
+    def cursor_for(self, obj, direction):
+        return encode_cursor([getattr(obj, name) for name, _ in self.keys], direction)
+
+    def _seek(self, queryset, values, reverse):
+        # (a, b, c) after (x, y, z) expands to a > x OR (a = x AND b > y) OR ...
+        condition = Q()
+        for i, (name, descending) in enumerate(self.keys):
+            step = Q(**{f'{name}__{"gt" if descending == reverse else "lt"}': values[i]})
+            for j in range(i):
+                step &= Q(**{self.keys[j][0]: values[j]})
+            condition |= step
+        # ... plus the redundant a >= x, which lets SQLite seek the index to the
+        # cursor instead of walking it from the start and filtering the OR
+        name, descending = self.keys[0]
+        bound = Q(**{f'{name}__{"gte" if descending == reverse else "lte"}': values[0]})
+        return queryset.filter(bound & condition)
+
+    def _order_by(self, reverse):
+        return [f'{"-" if descending != reverse else ""}{name}' for name, descending in self.keys]
+
+    def page(self, token=None):
+        if not token:
+            rows = list(self.queryset.order_by(*self._order_by(False))[:self.per_page + 1])
+            return CursorPage(self, rows[:self.per_page], len(rows) > self.per_page, False)
+
+        values, direction = decode_cursor(token)
+        if len(values) != len(self.keys):
+            raise InvalidCursor(token)
+        reverse = direction == 'p'
+        try:
+            queryset = self._seek(self.queryset, values, reverse).order_by(*self._order_by(reverse))
+            rows = list(queryset[:self.per_page + 1])
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor(token)
+        extra = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return CursorPage(self, rows, True, extra)
+        return CursorPage(self, rows, extra, True)
+
+    @property
+    def count(self):
+        # Exact counts scan the whole filtered set; reuse them for a short while
+        sql, params = self.queryset.query.sql_with_params()
+        key = 'cursor-count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return cache.get_or_set(key, self.queryset.count, self.count_cache_timeout)
+
+
+class CursorPaginationMixin:
+    """Swap ListView's page-number pagination for CursorPaginator."""
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_page_url(self, cursor):
+        params = self.request.GET.copy()
+        params[self.cursor_kwarg] = cursor
+        return '?' + params.urlencode()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is not None:
+            context['next_page_url'] = self.get_page_url(page.next_cursor) if page.has_next() else None
+            context['previous_page_url'] = self.get_page_url(page.previous_cursor) if page.has_previous() else None
+        return context
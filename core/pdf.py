@@ -0,0 +1,469 @@
+import io
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import signatures
+from .models import ServiceReport
+
+logger = logging.getLogger(__name__)
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89  # A4 in points
+MARGIN = 40
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+FONTS = {False: 'F1', True: 'F2'}
+BASE_FONTS = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold'}
+
+# Advance widths (1/1000 em) of the printable ASCII range in the standard
+# Helvetica metrics, used to wrap text without a font library
+HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+
+TEXT = (0.06, 0.09, 0.16)
+MUTED = (0.39, 0.45, 0.55)
+RULE = (0.89, 0.91, 0.94)
+ACCENT = (0.15, 0.39, 0.92)
+
+
+def text_width(value, size, bold=False):
+    widths = HELVETICA_BOLD_WIDTHS if bold else HELVETICA_WIDTHS
+    return sum(widths[ord(c) - 32] if 32 <= ord(c) < 127 else 556 for c in value) * size / 1000
+
+
+def wrap(value, width, size, bold=False):
+    lines = []
+    for paragraph in str(value or '').splitlines() or ['']:
+        line = ''
+        for word in paragraph.split():
+            candidate = f'{line} {word}' if line else word
+            if text_width(candidate, size, bold) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # Words wider than the column are broken wherever they overflow
+            while text_width(word, size, bold) > width:
+                cut = len(word) - 1
+                while cut > 1 and text_width(word[:cut], size, bold) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+def pdf_string(value):
+    # Base-14 fonts only cover WinAnsi; anything else prints as "?"
+    data = str(value).encode('cp1252', 'replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def number(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+def jpeg_image(source, max_size):
+    """Downscale an image file to fit ``max_size`` px and re-encode it as an RGB JPEG."""
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if 'A' in image.getbands() or image.mode == 'P':
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=settings.REPORT_PDF_IMAGE_QUALITY, optimize=True)
+        return buffer.getvalue(), image.width, image.height
+
+
+class PDFDocument:
+    """
+    Just enough of PDF 1.4 to lay out a report: Helvetica text, lines,
+    filled rectangles and JPEG images.
+
+    Coordinates are in points from the top-left corner of the page.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self.images = []
+        self.current = None
+
+    def add_page(self):
+        self.pages.append([])
+        self.current = len(self.pages) - 1
+
+    def emit(self, operation):
+        self.pages[self.current].append(operation.encode() if isinstance(operation, str) else operation)
+
+    def text(self, x, y, value, size=10, bold=False, color=TEXT):
+        baseline = PAGE_HEIGHT - y - size * 0.8
+        self.emit(
+            f'BT /{FONTS[bold]} {number(size)} Tf {" ".join(map(number, color))} rg '
+            f'{number(x)} {number(baseline)} Td '.encode() + pdf_string(value) + b' Tj ET'
+        )
+
+    def line(self, x1, y1, x2, y2, width=0.75, color=RULE):
+        self.emit(
+            f'{number(width)} w {" ".join(map(number, color))} RG '
+            f'{number(x1)} {number(PAGE_HEIGHT - y1)} m {number(x2)} {number(PAGE_HEIGHT - y2)} l S'
+        )
+
+    def polyline(self, points, width=0.75, color=RULE):
+        # Round caps and joins, so a single point still shows as a dot
+        (x, y), rest = points[0], points[1:] or points[:1]
+        self.emit(
+            f'q 1 J 1 j {number(width)} w {" ".join(map(number, color))} RG '
+            f'{number(x)} {number(PAGE_HEIGHT - y)} m '
+            + ' '.join(f'{number(x)} {number(PAGE_HEIGHT - y)} l' for x, y in rest) + ' S Q'
+        )
+
+    def rect(self, x, y, width, height, color):
+        self.emit(
+            f'{" ".join(map(number, color))} rg '
+            f'{number(x)} {number(PAGE_HEIGHT - y - height)} {number(width)} {number(height)} re f'
+        )
+
+    def add_image(self, data, width, height):
+        self.images.append((data, width, height))
+        return len(self.images)
+
+    def image(self, index, x, y, width, height):
+        self.emit(
+            f'q {number(width)} 0 0 {number(height)} {number(x)} {number(PAGE_HEIGHT - y - height)} cm '
+            f'/Im{index} Do Q'
+        )
+
+    def render(self):
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        def stream(header, data):
+            return f'<< {header} /Length {len(data)} >>\nstream\n'.encode() + data + b'\nendstream'
+
+        catalog = add(None)
+        pages = add(None)
+        fonts = {
+            name: add(f'<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>'.encode())
+            for name, base in BASE_FONTS.items()
+        }
+        images = [
+            add(stream(
+                f'/Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                f'/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode', data,
+            ))
+            for data, width, height in self.images
+        ]
+        kids = []
+        for operations in self.pages:
+            content = add(stream('/Filter /FlateDecode', zlib.compress(b'\n'.join(operations))))
+            kids.append(add(
+                f'<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {number(PAGE_WIDTH)} {number(PAGE_HEIGHT)}] '
+                f'/Contents {content} 0 R >>'.encode()
+            ))
+        resources = (
+            '<< /Font << ' + ' '.join(f'/{name} {ref} 0 R' for name, ref in fonts.items()) + ' >> '
+            '/XObject << ' + ' '.join(f'/Im{i} {ref} 0 R' for i, ref in enumerate(images, 1)) + ' >> >>'
+        )
+        objects[catalog - 1] = f'<< /Type /Catalog /Pages {pages} 0 R >>'.encode()
+        objects[pages - 1] = (
+            f'<< /Type /Pages /Kids [{" ".join(f"{kid} 0 R" for kid in kids)}] /Count {len(kids)} '
+            f'/Resources {resources} >>'
+        ).encode()
+
+        output = io.BytesIO()
+        output.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for i, body in enumerate(objects, 1):
+            offsets.append(output.tell())
+            output.write(f'{i} 0 obj\n'.encode() + body + b'\nendobj\n')
+        xref = output.tell()
+        output.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode())
+        output.write(''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode())
+        output.write(f'trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+        return output.getvalue()
+
+
+class ReportLayout:
+    """Flows a service report down A4 pages in the order of the printed letterhead."""
+    line_height = 1.35
+
+    def __init__(self, report):
+        self.report = report
+        self.pdf = PDFDocument()
+        self.y = 0
+
+    def new_page(self):
+        self.pdf.add_page()
+        self.y = MARGIN
+
+    def ensure(self, height):
+        if self.y + height > PAGE_HEIGHT - MARGIN - 20:
+            self.new_page()
+
+    def letterhead(self):
+        for name, align in (('img/medilab_logo.png', 'left'), ('img/iso_logo.png', 'right')):
+            path = finders.find(name)
+            if not path:
+                continue
+            data, width, height = jpeg_image(path, (600, 200))
+            draw_height = 48
+            draw_width = width * draw_height / height
+            left = MARGIN if align == 'left' else PAGE_WIDTH - MARGIN - draw_width
+            self.pdf.image(self.pdf.add_image(data, width, height), left, self.y, draw_width, draw_height)
+        self.y += 60
+        self.pdf.line(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y, width=1.5, color=ACCENT)
+        self.y += 14
+
+    def heading(self, value):
+        self.ensure(40)
+        self.y += 8
+        self.pdf.text(MARGIN, self.y, value.upper(), size=9, bold=True, color=ACCENT)
+        self.y += 13
+        self.pdf.line(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y)
+        self.y += 6
+
+    def paragraph(self, value, size=10, x=MARGIN, width=CONTENT_WIDTH, bold=False, color=TEXT):
+        for line in wrap(value, width, size, bold):
+            self.ensure(size * self.line_height)
+            self.pdf.text(x, self.y, line, size=size, bold=bold, color=color)
+            self.y += size * self.line_height
+
+    def fields(self, pairs, columns=3):
+        """Label/value pairs in a grid, each row as tall as its longest value."""
+        width = CONTENT_WIDTH / columns
+        for start in range(0, len(pairs), columns):
+            row = pairs[start:start + columns]
+            wrapped = [wrap(value or 'N/A', width - 10, 10) for _, value in row]
+            height = 12 + 13.5 * max(len(lines) for lines in wrapped) + 6
+            self.ensure(height)
+            for i, ((label, _), lines) in enumerate(zip(row, wrapped)):
+                x = MARGIN + i * width
+                self.pdf.text(x, self.y, label, size=7.5, bold=True, color=MUTED)
+                for j, line in enumerate(lines):
+                    self.pdf.text(x, self.y + 12 + j * 13.5, line, size=10)
+            self.y += height
+
+    def table(self, headers, rows, widths):
+        x_positions = [MARGIN + sum(widths[:i]) for i in range(len(widths))]
+
+        def header_row():
+            self.pdf.rect(MARGIN, self.y, CONTENT_WIDTH, 18, (0.97, 0.98, 0.99))
+            for x, header in zip(x_positions, headers):
+                self.pdf.text(x + 4, self.y + 5, header, size=8, bold=True, color=MUTED)
+            self.y += 20
+
+        self.ensure(40)
+        header_row()
+        for row in rows:
+            wrapped = [wrap(value or '', width - 8, 9) for value, width in zip(row, widths)]
+            height = 12 * max(len(lines) for lines in wrapped) + 6
+            if self.y + height > PAGE_HEIGHT - MARGIN - 20:
+                self.new_page()
+                header_row()
+            for x, lines in zip(x_positions, wrapped):
+                for j, line in enumerate(lines):
+                    self.pdf.text(x + 4, self.y + 2 + j * 12, line, size=9)
+            self.y += height
+            self.pdf.line(MARGIN, self.y - 3, PAGE_WIDTH - MARGIN, self.y - 3)
+
+    def photos(self, files, columns=3, gap=10, cell_height=125):
+        width = (CONTENT_WIDTH - gap * (columns - 1)) / columns
+        for start in range(0, len(files), columns):
+            self.ensure(cell_height + gap)
+            for i, source in enumerate(files[start:start + columns]):
+                data, image_width, image_height = source
+                scale = min(width / image_width, cell_height / image_height)
+                draw_width, draw_height = image_width * scale, image_height * scale
+                x = MARGIN + i * (width + gap) + (width - draw_width) / 2
+                self.pdf.image(
+                    self.pdf.add_image(data, image_width, image_height),
+                    x, self.y + (cell_height - draw_height) / 2, draw_width, draw_height,
+                )
+            self.y += cell_height + gap
+
+    def footer(self):
+        total = len(self.pdf.pages)
+        for page in range(total):
+            self.pdf.current = page
+            self.pdf.line(MARGIN, PAGE_HEIGHT - MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN)
+            self.pdf.text(MARGIN, PAGE_HEIGHT - MARGIN + 6, f'Service Report SR-{self.report.pk}', size=8, color=MUTED)
+            label = f'Page {page + 1} of {total}'
+            self.pdf.text(PAGE_WIDTH - MARGIN - text_width(label, 8), PAGE_HEIGHT - MARGIN + 6, label, size=8, color=MUTED)
+
+    def render(self):
+        report = self.report
+        service_date = timezone.localtime(report.service_date) if report.service_date else None
+        self.new_page()
+        self.letterhead()
+
+        self.pdf.text(MARGIN, self.y, f'Service Report SR-{report.pk}', size=18, bold=True)
+        status = report.get_status_display()
+        self.pdf.text(PAGE_WIDTH - MARGIN - text_width(status, 10, True), self.y + 5, status, size=10, bold=True, color=ACCENT)
+        self.y += 26
+        meta = [f'Engineer: {report.engineer.get_full_name() or report.engineer.username}']
+        if service_date:
+            meta.append(f'{service_date:%b %d, %Y %H:%M}')
+        if report.maintenance_request_id:
+            meta.append(f'Linked to MR-{report.maintenance_request_id}')
+        self.paragraph('   |   '.join(meta), size=9, color=MUTED)
+
+        self.heading('Client Details')
+        self.fields([
+            ('FACILITY NAME', report.client_name),
+            ('PROJECT REFERENCE', report.project_reference),
+            ('LOCATION / DEPARTMENT', report.location),
+            ('CONTACT PERSON', report.client_representative_name),
+            ('CONTACT PHONE', report.client_phone_number),
+            ('DONOR', report.donor),
+        ])
+
+        self.heading('Service Info')
+        self.fields([
+            ('SERVICE TYPE', str(report.service_type)),
+            ('BILLING CATEGORY', str(report.billing_category)),
+            ('FOLLOW-UP REQUIRED', 'Yes' if report.follow_up_required else 'No'),
+        ])
+
+        self.heading('Equipment Details')
+        items = list(report.items.all())
+        if items:
+            self.table(
+                ['PRODUCT', 'MODEL', 'SERIAL NUMBER', 'NOTE'],
+                [[item.product.name, item.product.model, item.serial_number or item.product.serial_number, item.equipment_note]
+                 for item in items],
+                [150, 100, 100, CONTENT_WIDTH - 350],
+            )
+        else:
+            self.paragraph('No equipment listed.', color=MUTED)
+
+        self.heading('Work Performed & Notes')
+        for label, value in (
+            ('Issue Description', report.issue_description),
+            ('Detailed Work Performed', report.work_performed),
+            ('Parts Replaced / Used', report.parts_used),
+            ('Final Outcome', str(report.final_status) or 'N/A'),
+        ):
+            if value:
+                self.ensure(30)
+                self.paragraph(label, size=9, bold=True, color=MUTED)
+                self.paragraph(value)
+                self.y += 6
+
+        photos = []
+        for report_image in report.images.all():
+            photo = self.load(report_image.image, settings.REPORT_PDF_IMAGE_SIZE)
+            if photo:
+                photos.append(photo)
+        if photos:
+            self.heading(f'Service Attachments ({len(photos)})')
+            self.photos(photos)
+
+        self.heading('Client Validation')
+        signature = self.load(report.client_signature, (600, 300)) if report.client_signature else None
+        self.ensure(120)
+        self.fields([
+            ('SIGNATORY NAME', report.client_representative_name),
+            ('DATE SIGNED', f'{service_date:%b %d, %Y}' if service_date else None),
+        ], columns=2)
+        self.pdf.text(MARGIN, self.y, 'SIGNATURE', size=7.5, bold=True, color=MUTED)
+        self.y += 12
+        if report.signature_digest:
+            self.signature(report.signature_strokes, 220, 80)
+        elif signature:
+            data, width, height = signature
+            scale = min(220 / width, 80 / height)
+            self.pdf.image(self.pdf.add_image(data, width, height), MARGIN, self.y, width * scale, height * scale)
+            self.y += height * scale
+        else:
+            self.paragraph('No signature', color=MUTED)
+
+        self.footer()
+        return self.pdf.render()
+
+    def signature(self, strokes, max_width, max_height):
+        # Drawn signatures go in as vector paths, sharp at any zoom
+        width, height, strokes = signatures.decode(strokes)
+        scale = min(max_width / width, max_height / height)
+        for stroke in strokes:
+            self.pdf.polyline(
+                [(MARGIN + x * scale, self.y + y * scale) for x, y in stroke],
+                width=signatures.PEN_WIDTH * scale, color=TEXT,
+            )
+        self.y += height * scale
+
+    @staticmethod
+    def load(field_file, max_size):
+        try:
+            with field_file.open('rb') as source:
+                return jpeg_image(source, max_size)
+        except (OSError, ValueError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+            logger.warning('Could not embed %s in the report PDF: %s', field_file.name, exc)
+            return None
+
+
+def render_report(report):
+    """Render a ServiceReport, with its items and photos, to PDF bytes."""
+    return ReportLayout(report).render()
+
+
+def cache_path(report):
+    # Any save bumps updated_at, which retires the previous file
+    version = int(report.updated_at.timestamp() * 1_000_000)
+    return Path(settings.REPORT_PDF_CACHE_DIR) / f'{report.pk}-{version}.pdf'
+
+
+def discard_cached(report_id, keep=None):
+    for path in Path(settings.REPORT_PDF_CACHE_DIR).glob(f'{report_id}-*.pdf'):
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def report_pdf(report):
+    """
+    Path of the rendered PDF for ``report``, rendering it on a cache miss.
+
+    Only ``pk`` and ``updated_at`` are needed for a hit, so callers can pass
+    a deferred instance; the full report is loaded only when rendering.
+    """
+    path = cache_path(report)
+    if path.exists():
+        return path
+    full = ServiceReport.objects.select_related('engineer').prefetch_related('items__product', 'images').get(pk=report.pk)
+    data = render_report(full)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per thread too, as threaded workers may render the same report at once
+    temporary = path.with_name(f'{path.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+    discard_cached(report.pk, keep=path)
+    return path
@@ -0,0 +1,275 @@
+import datetime
+import hashlib
+import heapq
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .choices import bump_version
+from .models import MaintenanceRequest, ServiceReport
+from .stats import GOVERNORATES
+
+URGENCY_RANK = {'Emergency': 0, 'High': 1, 'Medium': 2, 'Low': 3}
+URGENT_RANK = URGENCY_RANK['High']  # this urgent or more is dispatched before visits are grouped
+NO_DEADLINE = datetime.date.max
+
+PASSED = 'Availability window has passed'
+BEYOND_HORIZON = 'Available only after the planning horizon'
+NO_SLOT = 'No engineer free within the availability window'
+HORIZON_FULL = 'No engineer free within the planning horizon'
+
+
+def plan_visits(requests, commitments, engineers, days, capacity):
+    """
+    Assign requests to engineers' days.
+
+    ``requests`` are ``(id, urgency, start, end, district)`` with an
+    inclusive availability window whose ends may be None; ``commitments``
+    are the ``(engineer, day, district)`` visits already booked; ``days``
+    are the working days to fill, in order, each engineer making up to
+    ``capacity`` visits a day.
+
+    The days are swept in order. Requests are released into priority
+    queues, keyed by urgency then deadline, on the first day of their
+    window. Each day, Emergency and High requests and those whose window
+    ends that day are placed first. The rest follow in priority order,
+    and an engineer sent to a district then takes that district's next
+    requests too, so visits are grouped instead of spread over the map.
+    Engineers are chosen already working in the district that day, then
+    free for the day, then working in the same governorate; a request
+    that could wait is left for a later day rather than sent across the
+    country, until its last day in the window or the horizon.
+
+    Returns ``({id: (engineer, day)}, {id: reason})``, with a reason for
+    every request left unscheduled. Engineers are picked from per-day
+    indexes in amortized constant time, but a request left for a later
+    day is queued again each day, so this runs in
+    O(days * n log n + days * engineers) at worst.
+    """
+    if not days or not engineers:
+        return {}, {request[0]: NO_SLOT for request in requests}
+
+    load = defaultdict(int)  # (engineer, day) -> visits booked
+    area = {}  # (engineer, day) -> district of the day's first visit
+    for engineer, day, district in commitments:
+        load[engineer, day] += 1
+        if district:
+            area.setdefault((engineer, day), district)
+
+    assignments, unscheduled = {}, {}
+    info = {}
+    releases = []
+    for request_id, urgency, start, end, district in requests:
+        end = end or NO_DEADLINE
+        start = max(start or days[0], days[0])
+        if end < days[0]:
+            unscheduled[request_id] = PASSED
+        elif start > days[-1]:
+            unscheduled[request_id] = BEYOND_HORIZON
+        elif start > end:
+            unscheduled[request_id] = NO_SLOT
+        else:
+            info[request_id] = (URGENCY_RANK.get(urgency, len(URGENCY_RANK)), end, district)
+            releases.append((start, request_id))
+    releases.sort()
+
+    queue = []  # (rank, end, id): every released request
+    deadlines = []  # (end, rank, id)
+    nearby = defaultdict(list)  # district -> (rank, end, id)
+    released = 0
+
+    def settled(request_id):
+        return request_id in assignments or request_id in unscheduled
+
+    def pop_valid(heap, day):
+        # Drop entries already placed, or whose window closed before ``day``
+        while heap:
+            request_id = heap[0][-1]
+            if settled(request_id):
+                heapq.heappop(heap)
+            elif info[request_id][1] < day:
+                heapq.heappop(heap)
+                unscheduled[request_id] = NO_SLOT
+            else:
+                return request_id
+        return None
+
+    for day in days:
+        while released < len(releases) and releases[released][0] <= day:
+            request_id = releases[released][1]
+            rank, end, district = info[request_id]
+            heapq.heappush(queue, (rank, end, request_id))
+            heapq.heappush(deadlines, (end, rank, request_id))
+            if district:
+                heapq.heappush(nearby[district], (rank, end, request_id))
+            released += 1
+
+        # Engineers with visits left today, and indexes into them; engineers
+        # who fill up are dropped from ``free`` and lazily from the queues
+        free = {engineer: capacity - load[engineer, day] for engineer in engineers if load[engineer, day] < capacity}
+        idle = {engineer: None for engineer in free if (engineer, day) not in area}  # ordered set
+        there = defaultdict(deque)  # district -> engineers working there today
+        region = defaultdict(deque)  # governorate -> engineers working there today
+        for engineer in free:
+            if (engineer, day) in area:
+                there[area[engineer, day]].append(engineer)
+                region[GOVERNORATES.get(area[engineer, day])].append(engineer)
+
+        def first_free(engineers):
+            while engineers and engineers[0] not in free:
+                engineers.popleft()
+            return engineers[0] if engineers else None
+
+        def pick(district, must_go):
+            engineer = first_free(there[district]) if district in there else None
+            if engineer is None:
+                engineer = next(iter(idle), None)
+            governorate = GOVERNORATES.get(district)
+            if engineer is None and governorate and governorate in region:
+                engineer = first_free(region[governorate])
+            if engineer is None and must_go:
+                engineer = next(iter(free), None)
+            return engineer
+
+        def place(request_id, engineer):
+            district = info[request_id][2]
+            assignments[request_id] = (engineer, day)
+            free[engineer] -= 1
+            if not free[engineer]:
+                del free[engineer]
+                idle.pop(engineer, None)
+            if district and (engineer, day) not in area:
+                area[engineer, day] = district
+                there[district].append(engineer)
+                region[GOVERNORATES.get(district)].append(engineer)
+                idle.pop(engineer, None)
+
+        # Urgent requests and those that can't wait past today
+        for heap, urgent in ((queue, lambda entry: entry[0] <= URGENT_RANK), (deadlines, lambda entry: entry[0] == day)):
+            while free and pop_valid(heap, day) is not None and urgent(heap[0]):
+                request_id = heapq.heappop(heap)[-1]
+                engineer = pick(info[request_id][2], must_go=True)
+                if engineer is None:
+                    break
+                place(request_id, engineer)
+
+        # The rest, filling each engineer's day within one district
+        waiting = []
+        while free:
+            request_id = pop_valid(queue, day)
+            if request_id is None:
+                break
+            entry = heapq.heappop(queue)
+            district = info[request_id][2]
+            engineer = pick(district, must_go=info[request_id][1] == day or day == days[-1])
+            if engineer is None:
+                waiting.append(entry)
+                continue
+            place(request_id, engineer)
+            while district and engineer in free and pop_valid(nearby[district], day) is not None:
+                place(heapq.heappop(nearby[district])[-1], engineer)
+        for entry in waiting:
+            heapq.heappush(queue, entry)
+
+    for request_id in info:
+        if not settled(request_id):
+            unscheduled[request_id] = NO_SLOT if info[request_id][1] <= days[-1] else HORIZON_FULL
+    return assignments, unscheduled
+
+
+def working_days(start, horizon):
+    workdays = set(settings.SCHEDULE_WORKDAYS)
+    days = (start + datetime.timedelta(days=offset) for offset in range(horizon))
+    return [day for day in days if day.weekday() in workdays]
+
+
+def engineers():
+    """Active users who have filed a service report, as {id: username}."""
+    return dict(
+        User.objects.filter(is_active=True, pk__in=ServiceReport.objects.values('engineer_id'))
+        .order_by('username').values_list('pk', 'username')
+    )
+
+
+class Plan:
+    """A proposed schedule for the open requests, read with a handful of queries."""
+
+    def __init__(self, start=None, horizon=None, capacity=None):
+        self.start = start or timezone.localdate()
+        self.days = working_days(self.start, horizon or settings.SCHEDULE_HORIZON_DAYS)
+        self.capacity = capacity or settings.SCHEDULE_VISITS_PER_DAY
+        self.engineers = engineers()
+
+        self.requests = {
+            row['pk']: row for row in MaintenanceRequest.objects.filter(status='Open').values(
+                'pk', 'urgency', 'availability_start', 'availability_end', 'location', 'facility_name',
+            )
+        }
+        self.assignments, self.unscheduled = plan_visits(
+            [
+                (row['pk'], row['urgency'], row['availability_start'], row['availability_end'], row['location'])
+                for row in self.requests.values()
+            ],
+            self.commitments(), list(self.engineers), self.days, self.capacity,
+        )
+
+    def commitments(self):
+        if not self.days:
+            return []
+        first, last = self.days[0], self.days[-1]
+        booked = []
+        # Reports are dated visits; their district is the linked request's
+        # location, or the report's own when it names a district
+        reports = ServiceReport.objects.filter(
+            engineer__in=self.engineers,
+            service_date__date__gte=first, service_date__date__lte=last,
+        ).values_list('engineer_id', 'service_date', 'maintenance_request__location', 'location')
+        for engineer, service_date, request_location, location in reports:
+            district = request_location or (location if location in GOVERNORATES else None)
+            booked.append((engineer, timezone.localtime(service_date).date(), district))
+        scheduled = MaintenanceRequest.objects.filter(
+            status='Scheduled', assigned_engineer__in=self.engineers,
+            scheduled_date__gte=first, scheduled_date__lte=last,
+        ).values_list('assigned_engineer_id', 'scheduled_date', 'location')
+        booked.extend(scheduled)
+        return booked
+
+    def day_plans(self):
+        """``[(engineer username, day, [request values])]``, visits ordered by governorate and district."""
+        visits = defaultdict(list)
+        for request_id, (engineer, day) in self.assignments.items():
+            visits[engineer, day].append(self.requests[request_id])
+        return [
+            (self.engineers[engineer], day, sorted(rows, key=lambda row: (
+                GOVERNORATES.get(row['location'], ''), row['location'] or '', URGENCY_RANK.get(row['urgency'], 0), row['pk'],
+            )))
+            for (engineer, day), rows in sorted(visits.items(), key=lambda item: (item[0][1], self.engineers[item[0][0]]))
+        ]
+
+    def unscheduled_rows(self):
+        return [(self.requests[request_id], reason) for request_id, reason in sorted(self.unscheduled.items())]
+
+    def digest(self):
+        """Fingerprint of the assignments, so a previewed plan can be told apart from a recomputed one."""
+        lines = (f'{request_id}:{engineer}:{day:%Y-%m-%d}' for request_id, (engineer, day) in sorted(self.assignments.items()))
+        return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+    @transaction.atomic
+    def apply(self):
+        """Mark the planned requests Scheduled; returns how many were still open to schedule."""
+        rows = MaintenanceRequest.objects.filter(pk__in=self.assignments, status='Open').only('pk').in_bulk()
+        now = timezone.now()
+        for request_id, row in rows.items():
+            row.assigned_engineer_id, row.scheduled_date = self.assignments[request_id]
+            row.status = 'Scheduled'
+            row.updated_at = now
+        MaintenanceRequest.objects.bulk_update(
+            rows.values(), ['assigned_engineer', 'scheduled_date', 'status', 'updated_at'], batch_size=500,
+        )
+        # Saves are bypassed, so refresh what their signals would have
+        # (Open and Scheduled count alike in the dashboard stats)
+        transaction.on_commit(lambda: bump_version(MaintenanceRequest))
+        return len(rows)
@@ -0,0 +1,134 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import ServiceReport, ReportItem
+
+FTS_TABLE = 'core_servicereport_fts'
+
+REPORT_FIELDS = ['client_name', 'location', 'donor', 'issue_description', 'work_performed', 'parts_used']
+FTS_COLUMNS = REPORT_FIELDS + ['products']
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def recreate_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"{', '.join(FTS_COLUMNS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+
+def _product_text(report_ids):
+    text = {}
+    rows = ReportItem.objects.filter(report_id__in=report_ids).values_list(
+        'report_id', 'product__name', 'product__model', 'product__serial_number', 'serial_number'
+    )
+    for report_id, *values in rows:
+        text.setdefault(report_id, []).extend(v for v in values if v)
+    return {report_id: ' '.join(values) for report_id, values in text.items()}
+
+
+def _write_rows(cursor, reports):
+    reports = list(reports)
+    if not reports:
+        return
+    products = _product_text([r['id'] for r in reports])
+    placeholders = ', '.join(['%s'] * (len(FTS_COLUMNS) + 1))
+    cursor.executemany(
+        f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})",
+        [
+            [r['id']] + [r[f] or '' for f in REPORT_FIELDS] + [products.get(r['id'], '')]
+            for r in reports
+        ],
+    )
+
+
+def index_reports(report_ids):
+    """Refresh the index rows for the given reports, dropping rows for deleted ones."""
+    if not fts_enabled():
+        return
+    report_ids = list(report_ids)
+    if not report_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(report_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", report_ids)
+        _write_rows(cursor, ServiceReport.objects.filter(pk__in=report_ids).values('id', *REPORT_FIELDS))
+
+
+def remove_reports(report_ids):
+    if not fts_enabled():
+        return
+    report_ids = list(report_ids)
+    if not report_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(report_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", report_ids)
+
+
+def rebuild_index(batch_size=500):
+    if not fts_enabled():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        batch = []
+        for row in ServiceReport.objects.order_by('pk').values('id', *REPORT_FIELDS).iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _write_rows(cursor, batch)
+                total += len(batch)
+                batch = []
+        _write_rows(cursor, batch)
+        total += len(batch)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def build_match(query):
+    # Every term must match, each one as a prefix: "cent beir" -> "cent"* "beir"*
+    tokens = TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_reports(queryset, query, ranked=False):
+    """
+    Restrict a ServiceReport queryset to reports matching ``query``.
+
+    On SQLite the FTS5 index is used and each row is annotated with
+    ``search_rank`` (bm25, lower is better); ``ranked`` puts the best
+    matches first, keeping the existing ordering as a tie-breaker.
+    Other backends get the original icontains filter.
+    """
+    match = build_match(query) if fts_enabled() else ''
+    if not match:
+        return queryset.filter(
+            Q(client_name__icontains=query) |
+            Q(location__icontains=query) |
+            Q(items__product__name__icontains=query)
+        ).distinct()
+
+    table = ServiceReport._meta.db_table
+    queryset = queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+    )
+    if ranked:
+        queryset = queryset.order_by('search_rank', *queryset.query.order_by)
+    return queryset
@@ -0,0 +1,114 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import pdf, search, stats, tasks
+from .choices import bump_version
+from .storage import adjust_references, file_field_names
+from .models import MaintenanceRequest, Product, ServiceReport, ReportItem, ReportImage
+
+
+@receiver(post_save, sender=ServiceReport)
+def index_saved_report(sender, instance, **kwargs):
+    search.index_reports([instance.pk])
+
+
+@receiver(post_delete, sender=ServiceReport)
+def unindex_deleted_report(sender, instance, **kwargs):
+    search.remove_reports([instance.pk])
+
+
+@receiver(post_delete, sender=ServiceReport)
+def discard_report_pdfs(sender, instance, **kwargs):
+    pdf.discard_cached(instance.pk)
+
+
+@receiver(post_save, sender=ReportItem)
+@receiver(post_delete, sender=ReportItem)
+def index_item_report(sender, instance, **kwargs):
+    search.index_reports([instance.report_id])
+
+
+@receiver(post_save, sender=Product)
+def index_product_reports(sender, instance, created, **kwargs):
+    # A rename can touch many reports; only a few are reindexed on the spot
+    if created:
+        return
+    limit = settings.SEARCH_INLINE_REINDEX_LIMIT
+    report_ids = list(
+        ReportItem.objects.filter(product=instance).values_list('report_id', flat=True).distinct()[:limit + 1]
+    )
+    if len(report_ids) <= limit:
+        transaction.on_commit(lambda: search.index_reports(report_ids))
+    else:
+        tasks.enqueue('search.index_product_reports', {'product_id': instance.pk}, key=f'product-index:{instance.pk}')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=MaintenanceRequest)
+@receiver(post_delete, sender=MaintenanceRequest)
+def invalidate_choices(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(post_init, sender=ServiceReport)
+@receiver(post_init, sender=ReportImage)
+def snapshot_media_names(sender, instance, **kwargs):
+    instance._media_names = file_field_names(instance)
+
+
+@receiver(post_save, sender=ServiceReport)
+@receiver(post_save, sender=ReportImage)
+def track_media_references(sender, instance, created, **kwargs):
+    previous = {} if created else instance._media_names
+    deltas = Counter()
+    for attname, name in file_field_names(instance).items():
+        if not created and attname not in previous:
+            continue  # was deferred, the old value is unknown
+        old = previous.get(attname, '')
+        if old != name:
+            deltas[name] += 1
+            deltas[old] -= 1
+    adjust_references(deltas)
+    instance._media_names = file_field_names(instance)
+
+
+@receiver(post_delete, sender=ServiceReport)
+@receiver(post_delete, sender=ReportImage)
+def release_media_references(sender, instance, **kwargs):
+    deltas = Counter()
+    for name in instance._media_names.values():
+        deltas[name] -= 1
+    adjust_references(deltas)
+    instance._media_names = {}
+
+
+@receiver(post_save, sender=ReportImage)
+def build_image_derivatives(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.enqueue('images.build_derivatives', {'image_id': instance.pk}, key=f'derivatives:{instance.pk}')
+
+
+@receiver(post_init, sender=ServiceReport)
+@receiver(post_init, sender=MaintenanceRequest)
+def snapshot_stat_values(sender, instance, **kwargs):
+    instance._stat_values = stats.tracked_values(instance)
+
+
+@receiver(post_save, sender=ServiceReport)
+@receiver(post_save, sender=MaintenanceRequest)
+def update_dashboard_stats(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.track_change(instance, instance._stat_values, created)
+    instance._stat_values = stats.tracked_values(instance)
+
+
+@receiver(post_delete, sender=ServiceReport)
+@receiver(post_delete, sender=MaintenanceRequest)
+def release_dashboard_stats(sender, instance, **kwargs):
+    stats.track_delete(instance, instance._stat_values)
+    instance._stat_values = None
@@ -0,0 +1,191 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image, ImageDraw
+
+FORMAT_VERSION = 1
+INK = (15, 23, 42)  # #0f172a, the pen colour of the signature pad
+PEN_WIDTH = 2.5  # in pad pixels
+MAX_SIZE = 4000
+MAX_ASPECT = 8  # longest pad side over shortest; real pads are a few times wider than tall
+MAX_POINTS = 20000
+SUPERSAMPLE = 4
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode(width, height, strokes):
+    """
+    Pack a signature into bytes: a version byte, the pad size, then each
+    stroke's point count and its points as zigzag varint deltas from the
+    previous point. A typical signature takes a few hundred bytes.
+    """
+    out = bytearray([FORMAT_VERSION])
+    for value in (width, height, len(strokes)):
+        write_varint(out, value)
+    for stroke in strokes:
+        write_varint(out, len(stroke))
+        last_x = last_y = 0
+        for x, y in stroke:
+            for delta in (x - last_x, y - last_y):
+                write_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+            last_x, last_y = x, y
+    return bytes(out)
+
+
+def decode(data):
+    """Unpack ``encode``'s bytes into ``(width, height, strokes)``."""
+    data = bytes(data)
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError('Unknown signature format.')
+    offset = 1
+    width, offset = read_varint(data, offset)
+    height, offset = read_varint(data, offset)
+    count, offset = read_varint(data, offset)
+    strokes = []
+    for _ in range(count):
+        length, offset = read_varint(data, offset)
+        stroke, x, y = [], 0, 0
+        for _ in range(length):
+            dx, offset = read_varint(data, offset)
+            dy, offset = read_varint(data, offset)
+            x += (dx >> 1) ^ -(dx & 1)
+            y += (dy >> 1) ^ -(dy & 1)
+            stroke.append((x, y))
+        strokes.append(stroke)
+    return width, height, strokes
+
+
+def digest(data):
+    return hashlib.sha256(bytes(data)).hexdigest()
+
+
+def parse(value):
+    """
+    Turn the signature pad's JSON, ``{"width": w, "height": h, "strokes":
+    [[x0, y0, x1, y1, ...], ...]}`` in pad pixels, into encoded bytes.
+    Returns None for an empty pad.
+    """
+    try:
+        payload = json.loads(value)
+        width, height = int(payload['width']), int(payload['height'])
+        strokes = [
+            [(round(float(flat[i])), round(float(flat[i + 1]))) for i in range(0, len(flat) - 1, 2)]
+            for flat in payload['strokes']
+        ]
+    except (ValueError, TypeError, KeyError, OverflowError):
+        # OverflowError: an infinite number, which JSON allows as 1e999
+        raise ValidationError('The client signature could not be read.')
+    if not (0 < width <= MAX_SIZE and 0 < height <= MAX_SIZE):
+        raise ValidationError('The client signature could not be read.')
+    if max(width, height) > MAX_ASPECT * min(width, height):
+        raise ValidationError('The client signature could not be read.')
+    if sum(len(stroke) for stroke in strokes) > MAX_POINTS:
+        raise ValidationError('The client signature is too detailed to store.')
+
+    cleaned = []
+    for stroke in strokes:
+        points = []
+        for x, y in stroke:
+            point = (min(max(x, 0), width), min(max(y, 0), height))
+            if not points or point != points[-1]:
+                points.append(point)
+        if points:
+            cleaned.append(points)
+    return encode(width, height, cleaned) if cleaned else None
+
+
+def rendered_size(pad_width, pad_height, width):
+    """
+    Output size for a pad drawn ``width`` px wide. The height is capped at
+    MAX_ASPECT times the width, shrinking both sides, so a degenerate pad
+    stored before parse() checked the ratio can't ask for a huge image.
+    """
+    scale = min(width / pad_width, width * MAX_ASPECT / pad_height)
+    return max(round(pad_width * scale), 1), max(round(pad_height * scale), 1)
+
+
+def render_svg(data, width):
+    pad_width, pad_height, strokes = decode(data)
+    width, height = rendered_size(pad_width, pad_height, width)
+    path = ' '.join(
+        # A lone point still shows as a dot thanks to the round caps
+        'M' + ' L'.join(f'{x} {y}' for x, y in stroke) + (' l0 0' if len(stroke) == 1 else '')
+        for stroke in strokes
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {pad_width} {pad_height}"><path d="{path}" fill="none" stroke="#0f172a" '
+        f'stroke-width="{PEN_WIDTH}" stroke-linecap="round" stroke-linejoin="round"/></svg>'
+    ).encode()
+
+
+def render_png(data, width):
+    """Rasterize at ``width`` px on a transparent background, antialiased by supersampling."""
+    pad_width, pad_height, strokes = decode(data)
+    width, height = rendered_size(pad_width, pad_height, width)
+    scale = width * SUPERSAMPLE / pad_width
+    pen = max(round(PEN_WIDTH * scale), 1)
+    mask = Image.new('L', (width * SUPERSAMPLE, height * SUPERSAMPLE), 0)
+    draw = ImageDraw.Draw(mask)
+    for stroke in strokes:
+        points = [(x * scale, y * scale) for x, y in stroke]
+        if len(points) > 1:
+            draw.line(points, fill=255, width=pen, joint='curve')
+        for x, y in (points[0], points[-1]):
+            draw.ellipse((x - pen / 2, y - pen / 2, x + pen / 2, y + pen / 2), fill=255)
+    image = Image.new('RGBA', (width, height), INK + (0,))
+    image.putalpha(mask.resize((width, height), Image.Resampling.LANCZOS))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+RENDERERS = {'png': render_png, 'svg': render_svg}
+
+
+def render_width(requested):
+    """The smallest configured width at least ``requested`` px, so the cache stays bounded."""
+    sizes = sorted(settings.REPORT_SIGNATURE_WIDTHS)
+    return next((size for size in sizes if size >= requested), sizes[-1])
+
+
+def signature_file(report, image_format, width):
+    """
+    Path of ``report``'s signature rendered as ``image_format`` at ``width``
+    px, rendering it on a cache miss. Files are named by the strokes' digest,
+    so an edited signature gets new files and identical ones share them; a
+    hit only needs ``signature_digest``, so the strokes may be deferred.
+    """
+    path = Path(settings.REPORT_SIGNATURE_CACHE_DIR) / f'{report.signature_digest}-{width}.{image_format}'
+    if path.exists():
+        return path
+    rendered = RENDERERS[image_format](report.signature_strokes, width)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+    temporary.write_bytes(rendered)
+    os.replace(temporary, path)
+    return path
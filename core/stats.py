@@ -0,0 +1,177 @@
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import DashboardStat, MaintenanceRequest, ServiceReport
+
+REPORT_STATUS = 'report_status'
+ENGINEER_MONTH = 'engineer_month'
+OPEN_REQUEST_URGENCY = 'open_request_urgency'
+REQUEST_GOVERNORATE = 'request_governorate'
+
+GOVERNORATES = {
+    town: governorate
+    for governorate, towns in MaintenanceRequest.LEBANON_LOCATIONS
+    for town, _ in towns
+}
+UNSPECIFIED = 'Unspecified'
+
+# Fields whose values decide which counters a row contributes to
+TRACKED_FIELDS = {
+    ServiceReport: ['status', 'created_at', 'engineer_id'],
+    MaintenanceRequest: ['status', 'urgency', 'location'],
+}
+
+
+def month_key(value):
+    return f'{timezone.localtime(value):%Y-%m}' if timezone.is_aware(value) else f'{value:%Y-%m}'
+
+
+def tracked_values(instance):
+    # None when a tracked field is deferred, so the row's counters are unknown
+    fields = TRACKED_FIELDS[type(instance)]
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return {field: instance.__dict__[field] for field in fields}
+
+
+def contributions(model, values):
+    """The (metric, key) counters a row with these field values adds one to."""
+    if model is ServiceReport:
+        keys = [(REPORT_STATUS, values['status'])]
+        if values['created_at'] and values['engineer_id']:
+            keys.append((ENGINEER_MONTH, f"{month_key(values['created_at'])}:{values['engineer_id']}"))
+    else:
+        keys = [(REQUEST_GOVERNORATE, GOVERNORATES.get(values['location'], UNSPECIFIED))]
+        if values['status'] not in MaintenanceRequest.CLOSED_STATUSES:
+            keys.append((OPEN_REQUEST_URGENCY, values['urgency']))
+    return Counter(keys)
+
+
+def label_for(metric, key):
+    if metric == REPORT_STATUS:
+        return dict(ServiceReport.STATUS_CHOICES).get(key, key)
+    if metric == ENGINEER_MONTH:
+        username = User.objects.filter(pk=key.split(':')[1]).values_list('username', flat=True).first()
+        return username or key
+    return key
+
+
+def apply(deltas):
+    now = timezone.now()
+    for (metric, key), delta in deltas.items():
+        if not delta:
+            continue
+        counter = DashboardStat.objects.filter(metric=metric, key=key)
+        if counter.update(value=F('value') + delta, updated_at=now):
+            continue
+        if delta < 0:
+            continue  # nothing counted to take from; recompute_dashboard_stats settles it
+        label = label_for(metric, key)
+        try:
+            with transaction.atomic():
+                DashboardStat.objects.create(metric=metric, key=key, label=label, value=delta)
+        except IntegrityError:
+            # A concurrent transaction created the row since the update missed
+            counter.update(value=F('value') + delta, updated_at=now)
+
+
+def track_change(instance, previous, created):
+    """Move a saved row's counts from its previous values to its current ones."""
+    current = tracked_values(instance)
+    if current is None or (previous is None and not created):
+        return  # deferred fields; recompute_dashboard_stats corrects the drift
+    deltas = contributions(type(instance), current)
+    if not created:
+        deltas.subtract(contributions(type(instance), previous))
+    apply(deltas)
+
+
+def track_delete(instance, previous):
+    if previous is not None:
+        deltas = Counter()
+        deltas.subtract(contributions(type(instance), previous))
+        apply(deltas)
+
+
+def compute():
+    """Every counter recomputed from scratch, as {(metric, key): (label, value)}."""
+    stats = {}
+    for row in ServiceReport.objects.order_by().values('status').annotate(total=Count('pk')):
+        stats[(REPORT_STATUS, row['status'])] = row['total']
+    months = ServiceReport.objects.order_by().values('engineer_id', month=TruncMonth('created_at')).annotate(total=Count('pk'))
+    for row in months:
+        stats[(ENGINEER_MONTH, f"{row['month']:%Y-%m}:{row['engineer_id']}")] = row['total']
+    open_requests = MaintenanceRequest.objects.exclude(status__in=MaintenanceRequest.CLOSED_STATUSES)
+    for row in open_requests.order_by().values('urgency').annotate(total=Count('pk')):
+        stats[(OPEN_REQUEST_URGENCY, row['urgency'])] = row['total']
+    governorates = Counter()
+    for row in MaintenanceRequest.objects.order_by().values('location').annotate(total=Count('pk')):
+        governorates[GOVERNORATES.get(row['location'], UNSPECIFIED)] += row['total']
+    for governorate, total in governorates.items():
+        stats[(REQUEST_GOVERNORATE, governorate)] = total
+
+    usernames = dict(User.objects.filter(
+        pk__in={key.split(':')[1] for metric, key in stats if metric == ENGINEER_MONTH}
+    ).values_list('pk', 'username'))
+    labels = {}
+    for metric, key in stats:
+        if metric == ENGINEER_MONTH:
+            labels[(metric, key)] = usernames.get(int(key.split(':')[1]), key)
+        else:
+            labels[(metric, key)] = label_for(metric, key)
+    return {stat: (labels[stat], value) for stat, value in stats.items()}
+
+
+def recompute():
+    """Rebuild the summary table; returns the counters that had drifted."""
+    with transaction.atomic():
+        fresh = compute()
+        current = {(s.metric, s.key): s.value for s in DashboardStat.objects.all()}
+        drifted = {
+            stat: (current.get(stat, 0), fresh.get(stat, (None, 0))[1])
+            for stat in current.keys() | fresh.keys()
+            if current.get(stat, 0) != fresh.get(stat, (None, 0))[1]
+        }
+        DashboardStat.objects.all().delete()
+        DashboardStat.objects.bulk_create([
+            DashboardStat(metric=metric, key=key, label=label, value=value)
+            for (metric, key), (label, value) in fresh.items() if value
+        ])
+    return drifted
+
+
+def dashboard_summary():
+    """Everything the dashboard sidebar shows, read in one query."""
+    # Engineer keys are "YYYY-MM:id", so this month's rows are a key range
+    # that the (metric, key) unique index can seek to
+    this_month = month_key(timezone.now())
+    rows = DashboardStat.objects.filter(
+        Q(metric__in=[REPORT_STATUS, OPEN_REQUEST_URGENCY, REQUEST_GOVERNORATE]) |
+        Q(metric=ENGINEER_MONTH, key__gt=f'{this_month}:', key__lt=f'{this_month};')
+    )
+    by_metric = {}
+    for row in rows:
+        if row.value > 0:
+            by_metric.setdefault(row.metric, {})[row.key] = (row.label, row.value)
+
+    def ranked(metric, limit=None):
+        return sorted(by_metric.get(metric, {}).values(), key=lambda item: -item[1])[:limit]
+
+    statuses = by_metric.get(REPORT_STATUS, {})
+    urgencies = by_metric.get(OPEN_REQUEST_URGENCY, {})
+    return {
+        'report_statuses': [
+            (key, label, statuses.get(key, (label, 0))[1]) for key, label in ServiceReport.STATUS_CHOICES
+        ],
+        'total_reports': sum(value for _, value in statuses.values()),
+        'engineers_this_month': ranked(ENGINEER_MONTH, limit=5),
+        'open_requests_by_urgency': [
+            (label, urgencies.get(key, (label, 0))[1]) for key, label in MaintenanceRequest.URGENCY_CHOICES
+        ],
+        'requests_by_governorate': ranked(REQUEST_GOVERNORATE),
+    }
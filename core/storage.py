@@ -0,0 +1,128 @@
+import hashlib
+import os
+import posixpath
+import threading
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+# Images are named by the format Pillow reads, so .jpg and .jpeg copies of one photo share a blob
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_extension(name, content):
+    """The extension of the image format in ``content``, or else ``name``'s own, lower-cased."""
+    try:
+        content.seek(0)
+        with Image.open(content) as image:
+            extension = IMAGE_EXTENSIONS.get(image.format)
+    except (AttributeError, OSError, ValueError):
+        # Not seekable, or not an image Pillow can identify
+        extension = None
+    finally:
+        if hasattr(content, 'seek'):
+            content.seek(0)
+    return extension or os.path.splitext(name)[1].lower()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files by the SHA-256 of their content.
+
+    ``report_photos/IMG_001.jpg`` is stored as ``report_photos/ab/ab12...ef.jpg``
+    so byte-identical uploads share one blob. Every blob gets a MediaBlob row;
+    its ref_count is kept up to date by signals and recomputed by the
+    ``gc_media`` command, which is the only thing that removes blobs.
+    """
+
+    def hashed_name(self, name, digest, ext=None):
+        directory = posixpath.dirname(name)
+        ext = os.path.splitext(name)[1].lower() if ext is None else ext
+        return posixpath.join(directory, digest[:2], f'{digest}{ext}')
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        target = self.hashed_name(name, content_digest(content), content_extension(name, content))
+        if not self.exists(target):
+            self.write_blob(target, content)
+        MediaBlob.objects.get_or_create(name=target, defaults={'size': content.size})
+        return target
+
+    def write_blob(self, name, content):
+        # Written under a private name, then renamed over ``name``: a
+        # concurrent upload of the same bytes ends at the same complete file
+        # instead of FileSystemStorage's suffixed, untracked copy
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), mode=self.directory_permissions_mode or 0o777, exist_ok=True)
+        temporary = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+        try:
+            with open(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), 'wb') as fh:
+                content.seek(0)
+                for chunk in content.chunks():
+                    fh.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+
+    def is_hashed(self, name):
+        stem = os.path.splitext(posixpath.basename(name))[0]
+        return len(stem) == 64 and posixpath.basename(posixpath.dirname(name)) == stem[:2]
+
+
+def adjust_references(deltas):
+    """Apply {name: delta} changes to MediaBlob.ref_count, never going below zero."""
+    from .models import MediaBlob
+
+    by_delta = {}
+    for name, delta in deltas.items():
+        if name and delta:
+            by_delta.setdefault(delta, []).append(name)
+    for delta, names in by_delta.items():
+        blobs = MediaBlob.objects.filter(name__in=names)
+        if delta < 0:
+            blobs = blobs.filter(ref_count__gte=-delta)
+        blobs.update(ref_count=F('ref_count') + delta)
+
+
+def file_field_names(instance):
+    # Names of the content-addressed files an instance currently points at,
+    # skipping deferred fields so this never triggers a query.
+    names = {}
+    for field in instance._meta.concrete_fields:
+        if isinstance(getattr(field, 'storage', None), ContentAddressedStorage) and field.attname in instance.__dict__:
+            value = instance.__dict__[field.attname]
+            names[field.attname] = getattr(value, 'name', value) or ''
+    return names
+
+
+def referenced_names():
+    """Every content-addressed file name referenced by any model row, with its count."""
+    from django.apps import apps
+
+    counts = {}
+    for model in apps.get_app_config('core').get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(getattr(field, 'storage', None), ContentAddressedStorage):
+                values = model.objects.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+                for name in values.values_list(field.attname, flat=True).iterator():
+                    counts[name] = counts.get(name, 0) + 1
+    return counts
@@ -0,0 +1,171 @@
+import datetime
+import logging
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import search
+from .images import generate_derivatives
+from .models import Job, ReportImage, ReportItem
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name):
+    """Register a function as a background task under ``name``."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=3):
+    """
+    Queue a job in the current transaction.
+
+    A job is only visible to workers once the surrounding transaction
+    commits, so it never runs against rows that were rolled back. With an
+    idempotency ``key``, enqueueing again while an identical job is still
+    pending returns the existing job instead of adding a duplicate.
+    """
+    if name not in registry:
+        raise KeyError(f'Unknown task {name!r}')
+    job = None
+    if key:
+        job = Job.objects.filter(idempotency_key=key, status=Job.PENDING).first()
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(
+                    name=name, payload=payload or {}, idempotency_key=key, max_attempts=max_attempts,
+                    run_after=timezone.now() + datetime.timedelta(seconds=delay),
+                )
+        except IntegrityError:
+            job = Job.objects.get(idempotency_key=key, status=Job.PENDING)
+    transaction.on_commit(dispatch)
+    return job
+
+
+def dispatch():
+    mode = settings.TASKS_MODE
+    if mode == 'eager':
+        run_pending()
+    elif mode == 'thread':
+        _start_thread()
+        _wakeup.set()
+
+
+def claim_next():
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.PENDING, run_after__lte=now).order_by('run_after', 'pk')
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        # Compare-and-set, so concurrent workers never run the same job twice
+        claimed = Job.objects.filter(pk=pk, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    return datetime.timedelta(seconds=settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def execute(job):
+    try:
+        registry[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + backoff(job.attempts)
+            logger.warning('Job %s failed (attempt %s), retrying', job, job.attempts)
+        else:
+            job.status = Job.FAILED
+            logger.error('Job %s failed permanently', job)
+    else:
+        job.status = Job.DONE
+        job.last_error = None
+    job.locked_at = None
+    try:
+        job.save(update_fields=['status', 'run_after', 'last_error', 'locked_at', 'updated_at'])
+    except IntegrityError:
+        # A fresh job with the same key was queued meanwhile and will redo the work
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, locked_at=None, last_error='Superseded by a newer pending job')
+    return job.status == Job.DONE
+
+
+def run_pending(limit=None):
+    """Run due jobs until the queue is empty (or ``limit`` jobs ran). Returns the number run."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        execute(job)
+        count += 1
+    return count
+
+
+def requeue_stale():
+    """Put jobs whose worker died mid-run back in the queue."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    requeued = 0
+    for job in Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff):
+        job.status = Job.PENDING if job.attempts < job.max_attempts else Job.FAILED
+        job.locked_at = None
+        try:
+            job.save(update_fields=['status', 'locked_at', 'updated_at'])
+        except IntegrityError:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, locked_at=None, last_error='Superseded by a newer pending job')
+        requeued += 1
+    return requeued
+
+
+# In-process worker: a daemon thread per web process, woken after each commit
+_wakeup = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _start_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_thread_loop, name='core-tasks', daemon=True)
+            _thread.start()
+
+
+def _thread_loop():
+    while True:
+        _wakeup.wait(timeout=settings.TASKS_POLL_INTERVAL)
+        _wakeup.clear()
+        close_old_connections()
+        try:
+            requeue_stale()
+            run_pending()
+        except Exception:
+            logger.exception('Background task loop crashed')
+        finally:
+            close_old_connections()
+
+
+@task('images.build_derivatives')
+def build_derivatives(image_id):
+    report_image = ReportImage.objects.filter(pk=image_id).first()
+    if report_image is not None:
+        generate_derivatives(report_image)
+
+
+@task('search.index_product_reports')
+def index_product_reports(product_id):
+    search.index_reports(
+        ReportItem.objects.filter(product_id=product_id).values_list('report_id', flat=True).distinct()
+    )
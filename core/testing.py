@@ -0,0 +1,40 @@
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    The project's test runner: views over their query budget fail the test,
+    the per-request metrics log only warnings, and static files use the
+    plain storage, since the suite doesn't run collectstatic first.
+
+    Tests tagged ``slow``, such as those spawning processes, are skipped
+    unless asked for with ``--tag slow``.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if not tags:
+            exclude_tags = {*(exclude_tags or ()), 'slow'}
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.overrides = override_settings(
+            VIEW_BUDGETS_STRICT=True,
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        )
+        self.overrides.enable()
+        self.metrics_logger = logging.getLogger('core.metrics')
+        self.metrics_level = self.metrics_logger.level
+        self.metrics_logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        self.metrics_logger.setLevel(self.metrics_level)
+        self.overrides.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1591 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import gzip
+import json
+import posixpath
+import shutil
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from PIL import Image
+
+from . import assets, choices, pdf, scheduling, search, signatures, stats, tasks
+from .forms import ReportItemFormSet
+from .instrumentation import BudgetExceeded, view_budget
+from .models import (
+    Product, ServiceReport, ReportItem, ReportImage, MaintenanceRequest, MaintenanceRequestEquipment,
+    MediaBlob, DashboardStat, Job, ChoiceVersion,
+)
+from .pagination import CursorPaginator, InvalidCursor
+from .storage import referenced_names
+
+
+class DashboardQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.product = Product.objects.create(name='Centrifuge', category='Lab', manufacturer='Acme', model='C1')
+        self.client.force_login(self.user)
+
+    def make_reports(self, count):
+        for i in range(count):
+            report = ServiceReport.objects.create(client_name=f'Client {i}', location='Beirut', engineer=self.user)
+            ReportItem.objects.create(report=report, product=self.product)
+            ReportItem.objects.create(report=report, product=self.product, serial_number='SN-2')
+            # bulk_create skips the derivative signal; these files don't exist on disk
+            ReportImage.objects.bulk_create([ReportImage(report=report, image=f'report_photos/photo_{i}.jpg')])
+
+    def dashboard_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        self.make_reports(1)
+        single, _ = self.dashboard_queries()
+        self.make_reports(15)
+        many, response = self.dashboard_queries()
+        self.assertEqual(single, many)
+        self.assertEqual(len(response.context['reports']), 16)
+
+    def test_card_projection(self):
+        self.make_reports(1)
+        report = ServiceReport.objects.cards().get()
+        self.assertEqual(report.first_product_name, 'Centrifuge')
+        self.assertEqual(report.item_count, 2)
+        self.assertTrue(report.first_image_url.endswith('report_photos/photo_0.jpg'))
+        with self.assertNumQueries(0):
+            report.engineer.username
+
+    def test_search_keeps_projection(self):
+        self.make_reports(3)
+        response = self.client.get(reverse('dashboard'), {'q': 'centri'})
+        reports = list(response.context['reports'])
+        self.assertEqual(len(reports), 3)
+        self.assertEqual({r.item_count for r in reports}, {2})
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.product = Product.objects.create(name='Centrifuge', category='Lab', manufacturer='Acme', model='C1')
+        self.report = ServiceReport.objects.create(
+            client_name='Rafik Hariri Hospital', location='Beirut', engineer=self.user,
+            work_performed='Replaced the rotor bearing',
+        )
+        ReportItem.objects.create(report=self.report, product=self.product, serial_number='SN-4471')
+        self.other = ServiceReport.objects.create(client_name='Tripoli Clinic', location='Tripoli', engineer=self.user)
+
+    def matches(self, query):
+        return list(search.search_reports(ServiceReport.objects.all(), query).values_list('pk', flat=True))
+
+    def test_prefix_matching_across_fields(self):
+        self.assertEqual(self.matches('hosp'), [self.report.pk])
+        self.assertEqual(self.matches('bear'), [self.report.pk])
+        self.assertEqual(self.matches('SN 4471'), [self.report.pk])
+        self.assertEqual(self.matches('centrifuge beirut'), [self.report.pk])
+        self.assertEqual(self.matches('centrifuge tripoli'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.product.name = 'Spectrophotometer'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(self.matches('spectro'), [self.report.pk])
+        self.assertEqual(self.matches('centrifuge'), [])
+
+        self.other.donor = 'World Bank'
+        self.other.save()
+        self.assertEqual(self.matches('world'), [self.other.pk])
+
+        self.report.items.all().delete()
+        self.assertEqual(self.matches('spectro'), [])
+        self.other.delete()
+        self.assertEqual(self.matches('world'), [])
+
+    def test_ranked_results(self):
+        best = ServiceReport.objects.create(
+            client_name='Beirut Beirut Center', location='Beirut', engineer=self.user,
+        )
+        ranked = search.search_reports(ServiceReport.objects.order_by('-created_at'), 'beirut', ranked=True)
+        self.assertEqual([r.pk for r in ranked], [best.pk, self.report.pk])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        self.assertEqual(self.matches('hosp'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.matches('hosp'), [self.report.pk])
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+        for i in range(45):
+            ServiceReport.objects.create(client_name=f'Client {i}', engineer=self.user, status='Draft' if i % 3 else 'Completed')
+        # Force ties on created_at so the id tie-breaker is exercised
+        ServiceReport.objects.filter(pk__in=ServiceReport.objects.order_by('pk').values('pk')[10:30]).update(
+            created_at=ServiceReport.objects.order_by('pk')[10].created_at
+        )
+        self.expected = list(ServiceReport.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_walk_forward_and_back(self):
+        paginator = CursorPaginator(ServiceReport.objects.order_by('-created_at'), 20)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([len(p) for p in pages], [20, 20, 5])
+        self.assertEqual([r.pk for p in pages for r in p], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([r.pk for r in back], self.expected[20:40])
+        first = paginator.page(back.previous_cursor)
+        self.assertEqual([r.pk for r in first], self.expected[:20])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+    def test_invalid_cursor(self):
+        paginator = CursorPaginator(ServiceReport.objects.order_by('-created_at'), 20)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+        response = self.client.get(reverse('dashboard'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_dashboard_links_keep_filters(self):
+        response = self.client.get(reverse('dashboard'), {'status': 'Draft'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 30)
+        next_url = response.context['next_page_url']
+        self.assertIn('status=Draft', next_url)
+        response = self.client.get(reverse('dashboard') + next_url)
+        self.assertEqual(len(response.context['reports']), 10)
+        self.assertTrue(all(r.status == 'Draft' for r in response.context['reports']))
+        self.assertIsNone(response.context['next_page_url'])
+
+    def test_request_list_pages(self):
+        for i in range(25):
+            MaintenanceRequest.objects.create(facility_name=f'Facility {i}', created_by=self.user)
+        response = self.client.get(reverse('request_list'))
+        self.assertEqual(len(response.context['requests']), 20)
+        response = self.client.get(reverse('request_list') + response.context['next_page_url'])
+        self.assertEqual(len(response.context['requests']), 5)
+        self.assertIsNotNone(response.context['previous_page_url'])
+
+    def test_ranked_search_pages(self):
+        seen = []
+        url = reverse('dashboard') + '?q=client'
+        while url:
+            response = self.client.get(url)
+            seen.extend(r.pk for r in response.context['reports'])
+            next_url = response.context['next_page_url']
+            url = reverse('dashboard') + next_url if next_url else None
+        self.assertEqual(sorted(seen), sorted(self.expected))
+
+
+def make_jpeg(size=(2000, 1000), orientation=None, name='photo.jpg'):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    if orientation:
+        exif[0x0112] = orientation
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.report = ServiceReport.objects.create(client_name='AUB', engineer=self.user)
+
+    def add_image(self, photo):
+        report_image = ReportImage.objects.create(report=self.report, image=photo)
+        tasks.run_pending()
+        report_image.refresh_from_db()
+        return report_image
+
+
+class ImageDerivativeTests(MediaTestCase):
+    def test_derivatives_built_on_upload(self):
+        report_image = self.add_image(make_jpeg(orientation=6))
+        self.assertTrue(report_image.thumbnail.name.startswith('report_photos/'))
+        self.assertTrue(report_image.thumbnail.name.endswith('.webp'))
+
+        with Image.open(report_image.thumbnail.path) as thumb:
+            # Orientation 6 rotates the 2:1 landscape original into portrait
+            self.assertEqual(thumb.size, (240, 480))
+            self.assertEqual(thumb.format, 'WEBP')
+            self.assertEqual(len(thumb.getexif()), 0)
+        with Image.open(report_image.medium.path) as medium:
+            self.assertEqual(medium.size, (640, 1280))
+        self.assertIn(' 480w', report_image.srcset)
+        self.assertIn(' 1280w', report_image.srcset)
+
+    @override_settings(REPORT_IMAGE_FORMAT='JPEG')
+    def test_jpeg_output(self):
+        report_image = self.add_image(make_jpeg(size=(300, 200)))
+        with Image.open(report_image.thumbnail.path) as thumb:
+            self.assertEqual(thumb.format, 'JPEG')
+            self.assertEqual(thumb.size, (300, 200))
+
+    def test_unreadable_upload_is_skipped(self):
+        bogus = SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg')
+        with self.assertLogs('core.images', 'WARNING'):
+            report_image = self.add_image(bogus)
+        self.assertFalse(report_image.thumbnail)
+        self.assertEqual(report_image.thumbnail_url, report_image.image.url)
+
+    def test_backfill_command(self):
+        report_image = self.add_image(make_jpeg())
+        ReportImage.objects.filter(pk=report_image.pk).update(thumbnail='', medium=None)
+        call_command('backfill_image_derivatives', stdout=StringIO())
+        report_image.refresh_from_db()
+        self.assertTrue(report_image.thumbnail)
+        self.assertTrue(report_image.medium)
+
+    def test_dashboard_uses_thumbnail(self):
+        self.client.force_login(self.user)
+        report_image = self.add_image(make_jpeg())
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, report_image.thumbnail.url)
+        self.assertContains(response, 'srcset=')
+
+
+class ContentAddressedMediaTests(MediaTestCase):
+    def upload(self, name):
+        photo = make_jpeg(size=(600, 400), name=name)
+        return self.add_image(photo)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload('WhatsApp Image.jpeg')
+        second = self.upload('WhatsApp Image copy.jpeg')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^report_photos/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        # The extension follows the content, not the upload's name
+        third = self.upload('IMG_0001.JPG')
+        self.assertEqual(third.image.name, first.image.name)
+        self.assertEqual(len(list(Path(self.media_root, 'report_photos').rglob('*.jp*g'))), 1)
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).ref_count, 3)
+        third.delete()
+
+        first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=second.image.name).ref_count, 1)
+
+    def test_racing_uploads_share_one_blob(self):
+        storage = ReportImage._meta.get_field('image').storage
+        first = storage.save('report_photos/a.jpg', ContentFile(b'same bytes'))
+        # The other upload checked before this one's file existed
+        with mock.patch.object(storage, 'exists', return_value=False):
+            second = storage.save('report_photos/b.jpg', ContentFile(b'same bytes'))
+        self.assertEqual(second, first)
+        self.assertEqual([p.name for p in Path(storage.path(first)).parent.iterdir()], [posixpath.basename(first)])
+        self.assertEqual(MediaBlob.objects.filter(name=first).count(), 1)
+
+    def test_signature_resave_reuses_blob(self):
+        data = b'\x89PNG signature bytes'
+        self.report.client_signature = ContentFile(data, name='signature_AUB_2026-01-13.png')
+        self.report.save()
+        first_name = self.report.client_signature.name
+        self.report.client_signature = ContentFile(data, name='signature_AUB_2026-01-13.png')
+        self.report.save()
+        self.assertEqual(self.report.client_signature.name, first_name)
+        self.assertEqual(MediaBlob.objects.get(name=first_name).ref_count, 1)
+
+    def test_gc_removes_orphans(self):
+        report_image = self.upload('photo.jpg')
+        names = [report_image.image.name, report_image.thumbnail.name, report_image.medium.name]
+        kept = self.upload('photo.jpg')
+        kept.delete()
+        # Refs drift when rows are removed without signals; gc recounts from the tables
+        ReportImage.objects.filter(pk=report_image.pk).delete()
+        MediaBlob.objects.update(ref_count=5)
+
+        call_command('gc_media', '--grace-minutes=0', '--dry-run', stdout=StringIO())
+        self.assertTrue(all(report_image.image.storage.exists(name) for name in names))
+
+        call_command('gc_media', '--grace-minutes=0', stdout=StringIO())
+        self.assertFalse(any(report_image.image.storage.exists(name) for name in names))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_gc_keeps_young_and_referenced_blobs(self):
+        report_image = self.upload('photo.jpg')
+        orphan = report_image.image.storage.save('report_photos/unused.jpg', ContentFile(b'unused'))
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(report_image.image.storage.exists(orphan))
+        call_command('gc_media', '--grace-minutes=0', stdout=StringIO())
+        self.assertFalse(report_image.image.storage.exists(orphan))
+        self.assertTrue(report_image.image.storage.exists(report_image.image.name))
+        self.assertEqual(MediaBlob.objects.get(name=report_image.image.name).ref_count, 1)
+
+    def test_adopt_legacy_files(self):
+        legacy = FileSystemStorage(location=self.media_root)
+        content = make_jpeg(size=(50, 50)).read()
+        names = [legacy.save('report_photos/WhatsApp_Image.jpeg', ContentFile(content)) for _ in range(3)]
+        self.assertEqual(len(set(names)), 3)
+        report_image = self.upload('photo.jpg')
+        for name in names:
+            ReportImage.objects.bulk_create([ReportImage(report=self.report, image=name)])
+
+        call_command('gc_media', '--adopt-legacy', '--grace-minutes=0', stdout=StringIO())
+        adopted = set(ReportImage.objects.exclude(pk=report_image.pk).values_list('image', flat=True))
+        self.assertEqual(len(adopted), 1)
+        self.assertFalse(any(legacy.exists(name) for name in names))
+        self.assertEqual(MediaBlob.objects.get(name=adopted.pop()).ref_count, 3)
+
+
+class ReportUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def report_data(self, **extra):
+        data = {
+            'client_name': 'AUB Medical Center',
+            'status': 'Draft',
+            'items-TOTAL_FORMS': '0',
+            'items-INITIAL_FORMS': '0',
+            'items-MIN_NUM_FORMS': '0',
+            'items-MAX_NUM_FORMS': '1000',
+        }
+        data.update(extra)
+        return data
+
+    def test_photos_inserted_in_one_query(self):
+        photos = [make_jpeg(size=(300 + i, 200), name=f'photo_{i}.jpg') for i in range(3)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('report_create'), self.report_data(images=photos))
+        self.assertEqual(Job.objects.filter(name='images.build_derivatives', status=Job.PENDING).count(), 3)
+        tasks.run_pending()
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "core_reportimage"')]
+        self.assertEqual(len(inserts), 1)
+
+        report = ServiceReport.objects.get(client_name='AUB Medical Center')
+        self.assertEqual(report.images.count(), 3)
+        self.assertTrue(all(image.thumbnail for image in report.images.all()))
+        self.assertEqual(MediaBlob.objects.get(name=report.images.first().image.name).ref_count, 1)
+
+    def test_rejects_non_images(self):
+        fake = SimpleUploadedFile('notes.jpg', b'plain text', content_type='image/jpeg')
+        response = self.client.post(reverse('report_create'), self.report_data(images=[fake]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('only JPEG and PNG', str(response.context['form'].non_field_errors()))
+        self.assertFalse(ServiceReport.objects.filter(client_name='AUB Medical Center').exists())
+
+    def test_rejects_wrong_content_type_while_streaming(self):
+        doc = SimpleUploadedFile('scan.pdf', b'%PDF-1.4', content_type='application/pdf')
+        response = self.client.post(reverse('report_create'), self.report_data(images=[doc]))
+        self.assertIn('scan.pdf', str(response.context['form'].non_field_errors()))
+        self.assertFalse(ReportImage.objects.exists())
+
+    @override_settings(REPORT_IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_rejects_oversized_photos(self):
+        response = self.client.post(reverse('report_create'), self.report_data(images=[make_jpeg()]))
+        self.assertIn('smaller than', str(response.context['form'].non_field_errors()))
+        self.assertFalse(ReportImage.objects.exists())
+
+    def test_signature_stored_as_strokes(self):
+        strokes = json.dumps({'width': 400, 'height': 200, 'strokes': [[10, 20, 30, 40, 30, 40, 55, 41], [90, 90]]})
+        self.client.post(reverse('report_create'), self.report_data(signature_strokes=strokes))
+        report = ServiceReport.objects.get(client_name='AUB Medical Center')
+        self.assertFalse(report.client_signature)
+        self.assertFalse(MediaBlob.objects.filter(name__startswith='signatures/').exists())
+        self.assertEqual(signatures.decode(report.signature_strokes), (400, 200, [[(10, 20), (30, 40), (55, 41)], [(90, 90)]]))
+        self.assertEqual(report.signature_digest, signatures.digest(report.signature_strokes))
+
+
+class ProductAutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+        self.products = [
+            Product.objects.create(name=name, category='Lab', manufacturer='Acme', model=f'M{i}')
+            for i, name in enumerate(['Centrifuge', 'centrifuge mini', 'Incubator', 'Cell Counter'])
+        ]
+        Product.objects.create(name='Centrifuge XL', category='Lab', manufacturer='Acme', model='X', is_active=False)
+
+    def formset_data(self, product_ids):
+        data = {
+            'items-TOTAL_FORMS': str(len(product_ids)),
+            'items-INITIAL_FORMS': '0',
+            'items-MIN_NUM_FORMS': '0',
+            'items-MAX_NUM_FORMS': '1000',
+        }
+        for i, product_id in enumerate(product_ids):
+            data[f'items-{i}-product'] = str(product_id)
+            data[f'items-{i}-serial_number'] = f'SN-{i}'
+        return data
+
+    def test_search_matches_prefix_case_insensitively(self):
+        response = self.client.get(reverse('product_search'), {'q': 'CENT'})
+        results = response.json()['results']
+        self.assertEqual([r['name'] for r in results], ['Centrifuge', 'centrifuge mini'])
+        self.assertEqual(results[0]['label'], 'Centrifuge (M0)')
+        self.assertIsNone(response.json()['next'])
+
+    def test_search_pages(self):
+        for i in range(25):
+            Product.objects.create(name=f'Pipette {i:02d}', category='Lab', manufacturer='Acme', model='P')
+        first = self.client.get(reverse('product_search'), {'q': 'pip'}).json()
+        self.assertEqual(len(first['results']), 20)
+        second = self.client.get(reverse('product_search'), {'q': 'pip', 'cursor': first['next']}).json()
+        self.assertEqual([r['name'] for r in second['results']], [f'Pipette {i}' for i in range(20, 25)])
+        self.assertEqual(self.client.get(reverse('product_search'), {'cursor': '!!'}).status_code, 400)
+
+    def test_formset_validates_products_in_one_query(self):
+        report = ServiceReport.objects.create(client_name='Client', engineer=self.user)
+        ids = [p.pk for p in self.products] * 3
+        formset = ReportItemFormSet(self.formset_data(ids), instance=report)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(formset.is_valid())
+        product_queries = [q for q in ctx.captured_queries if 'FROM "core_product"' in q['sql']]
+        self.assertEqual(len(product_queries), 1)
+        self.assertEqual([f.cleaned_data['product'] for f in formset.forms], self.products * 3)
+
+    def test_unknown_product_is_rejected(self):
+        report = ServiceReport.objects.create(client_name='Client', engineer=self.user)
+        formset = ReportItemFormSet(self.formset_data([self.products[0].pk, 9999]), instance=report)
+        self.assertFalse(formset.is_valid())
+        self.assertIn('product', formset.forms[1].errors)
+
+    def test_edit_form_renders_labels_without_product_list(self):
+        report = ServiceReport.objects.create(client_name='Client', engineer=self.user)
+        for product in self.products:
+            ReportItem.objects.create(report=report, product=product)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('report_update', args=[report.pk]))
+        product_queries = [q for q in ctx.captured_queries if 'FROM "core_product"' in q['sql']]
+        self.assertEqual(len(product_queries), 1)
+        self.assertContains(response, 'Cell Counter (M3)')
+        self.assertNotContains(response, 'Centrifuge XL')
+
+
+class ChoiceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name='Centrifuge', category='Lab', manufacturer='Acme', model='C1')
+        self.open = MaintenanceRequest.objects.create(facility_name='Open Facility', created_by=self.user)
+        MaintenanceRequest.objects.create(facility_name='Closed Facility', status='Completed', created_by=self.user)
+
+    def table_queries(self, url, table, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, data) if data is not None else self.client.get(url)
+        return response, [q for q in ctx.captured_queries if f'FROM "{table}"' in q['sql']]
+
+    def test_request_choices_cached_until_a_request_changes(self):
+        response, queries = self.table_queries(reverse('report_create'), 'core_maintenancerequest')
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'Open Facility')
+        self.assertNotContains(response, 'Closed Facility')
+
+        response, queries = self.table_queries(reverse('report_create'), 'core_maintenancerequest')
+        self.assertEqual(queries, [])
+
+        MaintenanceRequest.objects.create(facility_name='New Facility', created_by=self.user)
+        response, queries = self.table_queries(reverse('report_create'), 'core_maintenancerequest')
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'New Facility')
+
+    def test_item_labels_follow_product_renames(self):
+        report = ServiceReport.objects.create(client_name='Client', engineer=self.user)
+        ReportItem.objects.create(report=report, product=self.product)
+        url = reverse('report_update', args=[report.pk])
+        self.client.get(url)
+        response, queries = self.table_queries(url, 'core_product')
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Centrifuge (C1)')
+
+        self.product.name = 'Microcentrifuge'
+        self.product.save()
+        self.assertContains(self.client.get(url), 'Microcentrifuge (C1)')
+
+    def test_invalid_post_validates_items_once(self):
+        data = {
+            'client_name': '',
+            'status': 'Completed',
+            'items-TOTAL_FORMS': '1',
+            'items-INITIAL_FORMS': '0',
+            'items-MIN_NUM_FORMS': '0',
+            'items-MAX_NUM_FORMS': '1000',
+            'items-0-product': str(self.product.pk),
+        }
+        response, queries = self.table_queries(reverse('report_create'), 'core_product', data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'Centrifuge (C1)')
+
+    def test_choices_shared_within_a_request(self):
+        request = RequestFactory().get('/')
+        first = choices.get_choices('open_requests', request)
+        MaintenanceRequest.objects.create(facility_name='Later Facility', created_by=self.user)
+        self.assertIs(choices.get_choices('open_requests', request), first)
+        self.assertIn('Later Facility', str(choices.get_choices('open_requests')))
+
+    def test_versions_are_shared_between_workers(self):
+        choices.get_choices('products')
+        # Another worker renames the product: its save changes the database
+        # row but nothing in this process's cache
+        Product.objects.filter(pk=self.product.pk).update(name='Microcentrifuge')
+        ChoiceVersion.objects.update_or_create(model='core.product', defaults={'token': 'elsewhere'})
+        self.assertEqual(choices.get_choices('products'), [(self.product.pk, 'Microcentrifuge (C1)')])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn('view=dashboard method=GET status=200', logs.output[0])
+        self.assertIn(f'bytes={len(response.content)}', logs.output[0])
+
+    def test_view_budgets_are_declared(self):
+        self.assertEqual(view_budget(resolve(reverse('dashboard')).func, 'dashboard'), {'queries': 6})
+        self.assertEqual(view_budget(resolve(reverse('product_search')).func, 'product_search'), {'queries': 4})
+
+    @override_settings(VIEW_BUDGETS={'dashboard': {'queries': 1}})
+    def test_budget_fails_under_tests(self):
+        with self.assertRaisesMessage(BudgetExceeded, 'dashboard over budget: queries='):
+            self.client.get(reverse('dashboard'))
+
+    @override_settings(VIEW_BUDGETS={'dashboard': {'queries': 1}}, VIEW_BUDGETS_STRICT=False)
+    def test_budget_only_warns_in_production(self):
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('limit 1', logs.output[-1])
+
+
+class BenchmarkCommandTests(MediaTestCase):
+    def generate(self):
+        call_command(
+            'generate_synthetic_data', users=2, products=5, requests=4, reports=12, photo_pool=2,
+            images_per_report=2, stdout=StringIO(),
+        )
+
+    def test_generated_data_is_consistent(self):
+        self.generate()
+        self.assertEqual(ServiceReport.objects.filter(engineer__username__startswith='synthetic_').count(), 12)
+        self.assertTrue(User.objects.filter(username='synthetic_0000', is_staff=True).exists())
+        self.assertTrue(ReportItem.objects.exists())
+        report = ServiceReport.objects.filter(engineer__username__startswith='synthetic_').first()
+        self.assertIn(report, search.search_reports(ServiceReport.objects.all(), report.issue_description))
+        # Reference counts match what gc_media would recompute
+        references = referenced_names()
+        for blob in MediaBlob.objects.all():
+            self.assertTrue(Path(self.media_root, blob.name).exists())
+            self.assertEqual(blob.ref_count, references.get(blob.name, 0))
+
+    def test_benchmark_saves_and_compares_baselines(self):
+        self.generate()
+        baseline = Path(self.media_root, 'baseline.json')
+        call_command('benchmark_views', iterations=2, warmup=0, save=str(baseline), stdout=StringIO())
+        data = json.loads(baseline.read_text())
+        self.assertEqual(data['rows']['reports'], ServiceReport.objects.count())
+        self.assertEqual(set(data['results']), {
+            'dashboard', 'dashboard_search', 'report_detail', 'request_list', 'request_detail',
+            'report_create_form', 'report_create_submit', 'report_update_form', 'report_update_submit',
+        })
+        self.assertGreater(data['results']['dashboard']['queries'], 0)
+        # Submissions are rolled back
+        self.assertFalse(ServiceReport.objects.filter(client_name='Benchmark Facility').exists())
+
+        data['results']['dashboard']['queries'] = 0
+        baseline.write_text(json.dumps(data))
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, 'dashboard'):
+            call_command(
+                'benchmark_views', iterations=1, warmup=0, scenario=['dashboard'], compare=str(baseline),
+                fail_on_regression=True, stdout=out,
+            )
+        self.assertIn('REGRESSION', out.getvalue())
+
+
+class SQLiteProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    @tag('slow')
+    def test_stress_command(self):
+        # Runs real processes for a while; lock counts depend on the machine
+        out = StringIO()
+        call_command('stress_sqlite_writers', writers=2, readers=1, seconds=0.5, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith('stock'))
+        self.assertTrue(lines[2].startswith('tuned'))
+
+
+class CategoryFlagsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+
+    def raw(self, report, column):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {column} FROM core_servicereport WHERE id = %s', [report.pk])
+            return cursor.fetchone()[0]
+
+    def test_stored_as_bitmask(self):
+        report = ServiceReport.objects.create(engineer=self.user, service_type=['Repair', 'Training'], billing_category='Warranty')
+        self.assertEqual(self.raw(report, 'service_type'), 2 | 8)
+        self.assertEqual(self.raw(report, 'billing_category'), 4)
+        report.refresh_from_db()
+        self.assertEqual(report.service_type, ['Training', 'Repair'])
+        self.assertEqual(str(report.service_type), 'Training, Repair')
+        self.assertEqual(report.final_status, [])
+
+    def test_has_lookup_uses_index(self):
+        repair = ServiceReport.objects.create(engineer=self.user, service_type=['Repair', 'Installation'])
+        ServiceReport.objects.create(engineer=self.user, service_type=['Training'])
+        self.assertEqual(list(ServiceReport.objects.filter(service_type__has='Repair')), [repair])
+        self.assertFalse(ServiceReport.objects.filter(service_type__has='Unknown').exists())
+        plan = ServiceReport.objects.filter(service_type__has='Repair').explain()
+        self.assertIn('USING INDEX', plan)
+
+    def test_unknown_flag_rejected(self):
+        with self.assertRaises(ValidationError):
+            ServiceReport(engineer=self.user, service_type=['Demolition'])
+
+    def test_form_keeps_checkboxes(self):
+        data = {
+            'client_name': 'AUB', 'status': 'Draft',
+            'service_type': ['Repair', 'Commissioning'], 'billing_category': ['Contract'],
+            'items-TOTAL_FORMS': '0', 'items-INITIAL_FORMS': '0',
+            'items-MIN_NUM_FORMS': '0', 'items-MAX_NUM_FORMS': '1000',
+        }
+        self.client.post(reverse('report_create'), data)
+        report = ServiceReport.objects.get(client_name='AUB')
+        self.assertEqual(report.service_type, ['Repair', 'Commissioning'])
+        response = self.client.get(reverse('report_update', args=[report.pk]))
+        self.assertContains(response, 'type="checkbox" name="service_type" value="Repair"', html=False)
+        self.assertEqual(response.context['form']['service_type'].value(), ['Repair', 'Commissioning'])
+        self.assertContains(self.client.get(reverse('report_detail', args=[report.pk])), 'Repair, Commissioning')
+
+    def test_dashboard_filters(self):
+        ServiceReport.objects.create(engineer=self.user, client_name='Fixed', service_type=['Repair'], billing_category=['Warranty'])
+        ServiceReport.objects.create(engineer=self.user, client_name='Trained', service_type=['Training'], billing_category=['Warranty'])
+        response = self.client.get(reverse('dashboard'), {'service_type': 'Repair', 'billing_category': 'Warranty'})
+        self.assertEqual([r.client_name for r in response.context['reports']], ['Fixed'])
+        self.assertEqual(len(self.client.get(reverse('dashboard'), {'billing_category': 'Warranty'}).context['reports']), 2)
+        self.assertContains(response, 'href="?billing_category=Warranty"')
+
+
+class QueryPlanTests(TestCase):
+    """Every list query must be answered from an index, not a table scan."""
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser('admin', password='secret')
+        self.engineer = User.objects.create_user('engineer', password='secret')
+        for i in range(25):
+            ServiceReport.objects.create(client_name=f'Client {i}', engineer=self.engineer, service_type=['Repair'])
+            MaintenanceRequest.objects.create(facility_name=f'Facility {i}', created_by=self.engineer)
+
+    def plans(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if sql.startswith('SELECT') and '"core_' in sql:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans[sql] = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(plans)
+        return response, plans
+
+    def assert_indexed(self, url, params=None, sorted_by_index=True):
+        response, plans = self.plans(url, params)
+        for sql, plan in plans.items():
+            for step in plan:
+                table_scan = step.startswith('SCAN ') and ' USING ' not in step and 'VIRTUAL TABLE' not in step
+                self.assertFalse(table_scan, f'{step}\n  in {sql}')
+                if sorted_by_index:
+                    self.assertNotIn('TEMP B-TREE', step, sql)
+        return response
+
+    def test_dashboard(self):
+        self.client.force_login(self.staff)
+        response = self.assert_indexed(reverse('dashboard'))
+        self.assert_indexed(reverse('dashboard') + response.context['next_page_url'])
+        self.assert_indexed(reverse('dashboard'), {'status': 'Draft'})
+        # Flag filters seek the flag index, then sort the matches
+        self.assert_indexed(reverse('dashboard'), {'service_type': 'Repair'}, sorted_by_index=False)
+
+    def test_request_list(self):
+        self.client.force_login(self.staff)
+        response = self.assert_indexed(reverse('request_list'))
+        self.assert_indexed(reverse('request_list') + response.context['next_page_url'])
+        self.assert_indexed(reverse('request_list'), {'status': 'Open'})
+        self.client.force_login(self.engineer)
+        self.assert_indexed(reverse('request_list'))
+        self.assert_indexed(reverse('request_list'), {'status': 'Open'})
+
+    def test_report_form_request_choices(self):
+        cache.clear()
+        self.client.force_login(self.engineer)
+        self.assert_indexed(reverse('report_create'))
+
+    def test_admin_filters(self):
+        self.client.force_login(self.staff)
+        url = reverse('admin:core_servicereport_changelist')
+        self.assert_indexed(url)
+        self.assert_indexed(url, {'service_date__gte': '2025-01-01 00:00:00+00:00', 'service_date__lt': '2025-02-01 00:00:00+00:00'})
+        self.assert_indexed(url, {'engineer__id__exact': self.engineer.pk})
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+
+    def value(self, metric, key):
+        stat = DashboardStat.objects.filter(metric=metric, key=key).first()
+        return stat.value if stat else 0
+
+    def test_counters_follow_saves_and_deletes(self):
+        report = ServiceReport.objects.create(engineer=self.user, status='Draft')
+        ServiceReport.objects.create(engineer=self.user, status='Draft')
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Draft'), 2)
+        month = f'{stats.month_key(report.created_at)}:{self.user.pk}'
+        self.assertEqual(self.value(stats.ENGINEER_MONTH, month), 2)
+        self.assertEqual(DashboardStat.objects.get(metric=stats.ENGINEER_MONTH, key=month).label, 'engineer')
+
+        report.status = 'Completed'
+        report.save()
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Draft'), 1)
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Completed'), 1)
+
+        report.delete()
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Completed'), 0)
+        self.assertEqual(self.value(stats.ENGINEER_MONTH, month), 1)
+
+    def test_open_requests_by_urgency_and_governorate(self):
+        request = MaintenanceRequest.objects.create(urgency='High', location='Baabda')
+        MaintenanceRequest.objects.create(urgency='High')
+        self.assertEqual(self.value(stats.OPEN_REQUEST_URGENCY, 'High'), 2)
+        self.assertEqual(self.value(stats.REQUEST_GOVERNORATE, 'Mount Lebanon'), 1)
+        self.assertEqual(self.value(stats.REQUEST_GOVERNORATE, stats.UNSPECIFIED), 1)
+
+        request.status = 'Completed'
+        request.save()
+        self.assertEqual(self.value(stats.OPEN_REQUEST_URGENCY, 'High'), 1)
+        self.assertEqual(self.value(stats.REQUEST_GOVERNORATE, 'Mount Lebanon'), 1)
+
+    def test_deferred_save_leaves_counters_alone(self):
+        report = ServiceReport.objects.create(engineer=self.user, status='Draft')
+        deferred = ServiceReport.objects.only('id', 'client_name').get(pk=report.pk)
+        deferred.client_name = 'AUB'
+        deferred.save(update_fields=['client_name'])
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Draft'), 1)
+
+    def test_recompute_fixes_drift(self):
+        ServiceReport.objects.create(engineer=self.user, status='Draft')
+        MaintenanceRequest.objects.create(urgency='Low', location='Beirut')
+        ServiceReport.objects.update(status='Pending')  # bypasses the signals
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Draft'), 1)
+
+        out = StringIO()
+        call_command('recompute_dashboard_stats', stdout=out)
+        self.assertIn('report_status[Draft]: 1 -> 0', out.getvalue())
+        self.assertFalse(DashboardStat.objects.filter(metric=stats.REPORT_STATUS, key='Draft').exists())
+        self.assertEqual(self.value(stats.REPORT_STATUS, 'Pending'), 1)
+        self.assertEqual(self.value(stats.REQUEST_GOVERNORATE, 'Beirut'), 1)
+        self.assertEqual(stats.recompute(), {})
+
+    def test_missing_counter_is_created_once(self):
+        key = (stats.REPORT_STATUS, 'Draft')
+        stats.apply(Counter({key: -1}))
+        self.assertFalse(DashboardStat.objects.exists())
+
+        def rival(metric, key):
+            # Another transaction inserts the counter between our update and insert
+            DashboardStat.objects.create(metric=metric, key=key, value=5)
+            return key
+        with mock.patch.object(stats, 'label_for', rival):
+            stats.apply(Counter({key: 2}))
+        self.assertEqual(self.value(*key), 7)
+
+    def test_dashboard_reads_summary_in_one_query(self):
+        for status in ['Draft', 'Draft', 'Completed']:
+            ServiceReport.objects.create(engineer=self.user, status=status)
+        MaintenanceRequest.objects.create(urgency='Emergency', location='Tyre')
+        with CaptureQueriesContext(connection) as queries:
+            summary = stats.dashboard_summary()
+        self.assertEqual(len(queries), 1)
+        self.assertIn(('Draft', 'Draft', 2), summary['report_statuses'])
+        self.assertEqual(summary['total_reports'], 3)
+        self.assertEqual(summary['engineers_this_month'], [('engineer', 3)])
+        self.assertIn(('Emergency', 1), summary['open_requests_by_urgency'])
+        self.assertEqual(summary['requests_by_governorate'], [('South Lebanon', 1)])
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['stats'], summary)
+        self.assertContains(response, 'Engineers This Month')
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name='Centrifuge', model='C-100')
+        self.repair = ServiceReport.objects.create(
+            engineer=self.user, client_name='AUB Medical', status='Completed', service_type=['Repair'],
+        )
+        ReportItem.objects.create(report=self.repair, product=self.product, serial_number='SN-1')
+        ReportItem.objects.create(report=self.repair, product=self.product, serial_number='SN-2')
+        ServiceReport.objects.create(engineer=self.user, client_name='LAU <Byblos> & co', status='Draft')
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        text = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(text.splitlines()))
+
+    def test_reports_csv_flattens_items(self):
+        response = self.client.get(reverse('report_export'), {'format': 'csv'})
+        self.assertIn('attachment; filename="service-reports-', response['Content-Disposition'])
+        rows = self.read_csv(response)
+        header = rows[0]
+        self.assertEqual(header[:2], ['Report', 'Service date'])
+        serials = [(row[header.index('Client')], row[header.index('Serial number')]) for row in rows[1:]]
+        self.assertEqual(serials, [('LAU <Byblos> & co', ''), ('AUB Medical', 'SN-1'), ('AUB Medical', 'SN-2')])
+        self.assertEqual(rows[2][header.index('Service type')], 'Repair')
+
+    def test_reports_use_dashboard_filters(self):
+        rows = self.read_csv(self.client.get(reverse('report_export'), {'service_type': 'Repair', 'status': 'Completed'}))
+        self.assertEqual({row[0] for row in rows[1:]}, {f'SR-{self.repair.pk}'})
+        rows = self.read_csv(self.client.get(reverse('report_export'), {'q': 'byblos'}))
+        self.assertEqual(len(rows), 2)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def count_queries():
+            response = self.client.get(reverse('report_export'))
+            with CaptureQueriesContext(connection) as queries:
+                b''.join(response.streaming_content)
+            return len(queries)
+
+        baseline = count_queries()
+        for i in range(20):
+            report = ServiceReport.objects.create(engineer=self.user, client_name=f'Client {i}')
+            ReportItem.objects.create(report=report, product=self.product)
+        self.assertEqual(count_queries(), baseline)
+
+    def test_reports_xlsx_is_a_workbook(self):
+        response = self.client.get(reverse('report_export'), {'format': 'xlsx'})
+        self.assertTrue(response['Content-Disposition'].endswith('.xlsx"'))
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('LAU &lt;Byblos&gt; &amp; co', sheet)
+
+    def test_formulas_are_neutralised(self):
+        self.repair.client_name = '=HYPERLINK("http://example.com","x")'
+        self.repair.issue_description = '@SUM(1+1)'
+        self.repair.save()
+        ReportItem.objects.filter(serial_number='SN-1').update(serial_number='-2+3')
+
+        rows = self.read_csv(self.client.get(reverse('report_export')))
+        header = rows[0]
+        row = rows[2]
+        self.assertEqual(row[header.index('Client')], '\'=HYPERLINK("http://example.com","x")')
+        self.assertEqual(row[header.index('Issue')], "'@SUM(1+1)")
+        self.assertEqual(row[header.index('Serial number')], "'-2+3")
+
+        response = self.client.get(reverse('report_export'), {'format': 'xlsx'})
+        sheet = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))).read('xl/worksheets/sheet1.xml').decode()
+        # Inline strings are never evaluated, so XLSX shows the text as entered
+        self.assertIn('<t xml:space="preserve">=HYPERLINK(', sheet)
+        self.assertIn(">@SUM(1+1)<", sheet)
+        self.assertNotIn("'", sheet)
+        self.assertNotIn('<f>', sheet)
+
+    def test_requests_follow_list_visibility(self):
+        other = User.objects.create_user('other', password='secret')
+        own = MaintenanceRequest.objects.create(facility_name='Own Clinic', created_by=self.user)
+        MaintenanceRequestEquipment.objects.create(request=own, equipment_type='Balance', model_name='B-1')
+        MaintenanceRequestEquipment.objects.create(request=own, equipment_type='Oven', model_name='O-2')
+        MaintenanceRequest.objects.create(facility_name='Other Clinic', created_by=other)
+
+        rows = self.read_csv(self.client.get(reverse('request_export')))
+        header = rows[0]
+        self.assertEqual([row[header.index('Facility')] for row in rows[1:]], ['Own Clinic', 'Own Clinic'])
+        self.assertEqual([row[header.index('Equipment model')] for row in rows[1:]], ['B-1', 'O-2'])
+
+        self.user.is_staff = True
+        self.user.save()
+        rows = self.read_csv(self.client.get(reverse('request_export'), {'q': 'Clinic', 'format': 'csv'}))
+        self.assertEqual(len(rows), 4)
+
+
+class ReportPDFTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        override = override_settings(REPORT_PDF_CACHE_DIR=Path(self.media_root) / 'pdf-cache')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.user)
+        product = Product.objects.create(name='Centrifuge (bench)', model='C-100')
+        ReportItem.objects.create(report=self.report, product=product, serial_number='SN-1')
+        self.add_image(make_jpeg())
+        signature = BytesIO()
+        Image.new('RGBA', (300, 100), (0, 0, 0, 0)).save(signature, 'PNG')
+        self.report.client_signature = ContentFile(signature.getvalue(), 'signature.png')
+        self.report.status = 'Completed'
+        self.report.service_date = datetime.datetime(2026, 3, 2, 9, 30, tzinfo=datetime.timezone.utc)
+        self.report.work_performed = 'Replaced the rotor. ' * 60
+        self.report.save()
+
+    def cached_files(self):
+        return sorted(p.name for p in (Path(self.media_root) / 'pdf-cache').glob('*.pdf'))
+
+    def test_renders_completed_report(self):
+        response = self.client.get(reverse('report_pdf', args=[self.report.pk]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        data = b''.join(response.streaming_content)
+        self.assertTrue(data.startswith(b'%PDF-1.4'))
+        self.assertTrue(data.rstrip().endswith(b'%%EOF'))
+        # Two logos, one photo and the signature, each embedded once
+        self.assertEqual(data.count(b'/Subtype /Image'), 4)
+        self.assertIn(b'/Count 2', data)
+
+    def test_cache_keyed_by_version(self):
+        self.client.get(reverse('report_pdf', args=[self.report.pk]))
+        first = self.cached_files()
+        self.assertEqual(len(first), 1)
+        with self.assertNumQueries(3):  # session, user, report version
+            response = self.client.get(reverse('report_pdf', args=[self.report.pk]) + '?download')
+        self.assertIn('attachment; filename="SR-', response['Content-Disposition'])
+
+        self.report.client_name = 'LAU'
+        self.report.save()
+        self.client.get(reverse('report_pdf', args=[self.report.pk]))
+        second = self.cached_files()
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first, second)
+
+        self.report.delete()
+        self.assertEqual(self.cached_files(), [])
+
+    def test_drafts_not_rendered(self):
+        draft = ServiceReport.objects.create(engineer=self.user)
+        self.assertEqual(self.client.get(reverse('report_pdf', args=[draft.pk])).status_code, 404)
+
+    def test_batch_archive(self):
+        ServiceReport.objects.create(engineer=self.user, status='Completed', service_date=self.report.service_date - datetime.timedelta(days=40))
+        output = Path(self.media_root) / 'march.zip'
+        call_command('render_report_pdfs', start='2026-03-01', end='2026-03-31', output=str(output), stdout=StringIO())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(archive.namelist(), [f'SR-{self.report.pk}.pdf'])
+        with self.assertRaises(CommandError):
+            call_command('render_report_pdfs', start='2026-03-31', end='2026-03-01', output=str(output))
+
+    def test_wrap_breaks_long_words(self):
+        lines = pdf.wrap('a ' + 'x' * 200, 100, 10)
+        self.assertEqual(lines[0], 'a')
+        self.assertTrue(all(pdf.text_width(line, 10) <= 100 for line in lines))
+        self.assertEqual(''.join(lines[1:]), 'x' * 200)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret', is_staff=True)
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name='Centrifuge', model='C-100')
+        self.report = ServiceReport.objects.create(engineer=self.user, client_name='AUB', status='Completed')
+        self.item = ReportItem.objects.create(report=self.report, product=self.product)
+        self.request = MaintenanceRequest.objects.create(facility_name='AUB', created_by=self.user)
+        self.report_url = reverse('report_detail', args=[self.report.pk])
+        self.request_url = reverse('request_detail', args=[self.request.pk])
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_report_is_not_rendered(self):
+        response = self.client.get(self.report_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(3):  # session, user, report version
+            cached = self.revalidate(self.report_url, response)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        modified_since = self.client.get(self.report_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(modified_since.status_code, 304)
+
+    def test_related_changes_invalidate(self):
+        response = self.client.get(self.report_url)
+        ReportItem.objects.create(report=self.report, product=self.product, serial_number='SN-2')
+        changed = self.revalidate(self.report_url, response)
+        self.assertEqual(changed.status_code, 200)
+
+        self.product.name = 'Centrifuge XL'
+        self.product.save()
+        renamed = self.revalidate(self.report_url, changed)
+        self.assertEqual(renamed.status_code, 200)
+        self.assertContains(renamed, 'Centrifuge XL')
+
+        # Products on other reports don't affect this one
+        Product.objects.create(name='Autoclave', model='A-1')
+        self.assertEqual(self.revalidate(self.report_url, renamed).status_code, 304)
+
+    def test_etag_depends_on_viewer(self):
+        response = self.client.get(self.report_url)
+        other = User.objects.create_user('other', password='secret')
+        self.client.force_login(other)
+        self.assertEqual(self.revalidate(self.report_url, response).status_code, 200)
+
+    def test_request_detail(self):
+        response = self.client.get(self.request_url)
+        self.assertEqual(self.revalidate(self.request_url, response).status_code, 304)
+        self.report.maintenance_request = self.request
+        self.report.save()
+        linked = self.revalidate(self.request_url, response)
+        self.assertContains(linked, f'SR-{self.report.pk}')
+
+        outsider = User.objects.create_user('outsider', password='secret')
+        self.client.force_login(outsider)
+        self.assertEqual(self.revalidate(self.request_url, linked).status_code, 403)
+        self.assertEqual(self.client.get(reverse('report_detail', args=[999])).status_code, 404)
+
+
+class DashboardCardCacheTests(TestCase):
+    def setUp(self):
+        caches['fragments'].clear()
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name='Centrifuge', model='C-100')
+        self.reports = [ServiceReport.objects.create(engineer=self.user, client_name=f'Client {i}') for i in range(3)]
+        ReportItem.objects.create(report=self.reports[0], product=self.product)
+
+    def rendered_cards(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return [t.name for t in response.templates].count('core/report_card.html')
+
+    def test_cards_rendered_once(self):
+        self.assertEqual(self.rendered_cards(), 3)
+        self.assertEqual(self.rendered_cards(), 0)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Client 2')
+        self.assertContains(response, 'Centrifuge')
+
+    def test_only_changed_cards_rerendered(self):
+        self.rendered_cards()
+        self.product.name = 'Centrifuge XL'
+        self.product.save()
+        self.assertEqual(self.rendered_cards(), 1)
+        self.assertContains(self.client.get(reverse('dashboard')), 'Centrifuge XL')
+
+        ReportItem.objects.create(report=self.reports[1], product=self.product)
+        ReportImage.objects.create(report=self.reports[2], image='report_photos/photo.jpg')
+        self.assertEqual(self.rendered_cards(), 2)
+
+        ServiceReport.objects.filter(pk=self.reports[0].pk).update(status='Completed')
+        self.assertEqual(self.rendered_cards(), 1)
+
+
+class DashboardCardsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret')
+        self.client.force_login(self.user)
+        product = Product.objects.create(name='Centrifuge', model='C-100')
+        for i in range(25):
+            report = ServiceReport.objects.create(
+                engineer=self.user, client_name=f'Client {i}', status='Completed' if i % 2 else 'Draft',
+                service_date=datetime.datetime(2026, 3, 2, 9, 30, tzinfo=datetime.timezone.utc),
+            )
+            ReportItem.objects.create(report=report, product=product)
+        ReportItem.objects.create(report=report, product=product)
+
+    def test_continues_from_dashboard_page(self):
+        page = self.client.get(reverse('dashboard')).context['page_obj']
+        response = self.client.get(reverse('report_cards'), {'cursor': page.next_cursor})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertIsNone(data['next'])
+        self.assertEqual([card['client'] for card in data['results']], [f'Client {i}' for i in range(4, -1, -1)])
+        self.assertEqual(set(data['results'][0]), {
+            'id', 'client', 'location', 'status', 'date', 'product', 'more', 'engineer', 'thumbnail', 'srcset',
+        })
+        self.assertEqual(data['results'][0]['date'], 'Mar 02, 2026')
+
+    def test_first_page_compact_and_filtered(self):
+        data = self.client.get(reverse('report_cards'), {'status': 'Draft'}).json()
+        self.assertEqual(len(data['results']), 13)
+        self.assertTrue(all(card['status'] == 'Draft' for card in data['results']))
+        self.assertEqual(data['results'][0]['more'], 1)
+        html = self.client.get(reverse('dashboard'), {'status': 'Draft'})
+        self.assertLess(len(json.dumps(data)), len(html.content) / 3)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('report_cards'), {'cursor': 'nope'}).status_code, 400)
+
+
+@override_settings(ROOT_URLCONF=settings.ASGI_URLCONF)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('engineer', password='secret', is_staff=True)
+        self.product = Product.objects.create(name='Centrifuge', model='C-100')
+        self.request = MaintenanceRequest.objects.create(facility_name='AUB', created_by=self.user)
+        self.report = ServiceReport.objects.create(
+            engineer=self.user, client_name='AUB', status='Completed', maintenance_request=self.request,
+        )
+        ReportItem.objects.create(report=self.report, product=self.product, serial_number='SN-1')
+        MaintenanceRequestEquipment.objects.create(request=self.request, equipment_type='Centrifuge', model_name='C-100')
+        self.report_url = reverse('report_detail', args=[self.report.pk])
+        self.request_url = reverse('request_detail', args=[self.request.pk])
+
+    async def test_pages_are_served_by_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        for url, view, text in [
+            (reverse('dashboard'), 'AsyncDashboardView', 'AUB'),
+            (self.report_url, 'AsyncServiceReportDetailView', 'SN-1'),
+            (self.request_url, 'AsyncMaintenanceRequestDetailView', f'SR-{self.report.pk}'),
+        ]:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.resolver_match.func.view_class.__name__, view)
+            self.assertContains(response, text)
+        # The related rows were read up front, so the template found them cached
+        self.assertEqual(response.asgi_request.metrics.queries, 6)
+
+    async def test_conditional_get(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.report_url)
+        cached = await self.async_client.get(self.report_url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual((await self.async_client.get(reverse('report_detail', args=[999]))).status_code, 404)
+
+    async def test_access_rules(self):
+        response = await self.async_client.get(self.report_url)
+        self.assertRedirects(response, f'{reverse("login")}?next={self.report_url}', fetch_redirect_response=False)
+
+        outsider = await User.objects.acreate_user('outsider', password='secret')
+        await self.async_client.aforce_login(outsider)
+        self.assertEqual((await self.async_client.get(self.request_url)).status_code, 403)
+        self.assertEqual((await self.async_client.get(self.report_url)).status_code, 200)
+
+
+
+class SignatureTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        override = override_settings(REPORT_SIGNATURE_CACHE_DIR=Path(self.media_root) / 'signature-cache')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.user)
+        self.strokes = signatures.parse(json.dumps({
+            'width': 500, 'height': 200,
+            'strokes': [[20, 150, 60, 40, 110, 160, 170, 30, 240, 170], [300.4, 100.6], [-5, 210, 480, 190]],
+        }))
+        self.report.set_signature(self.strokes)
+        self.report.save()
+
+    def signature_url(self, image_format, **params):
+        return reverse('report_signature', args=[self.report.pk, image_format]) + '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+
+    def test_compact_round_trip(self):
+        width, height, strokes = signatures.decode(self.strokes)
+        self.assertEqual((width, height), (500, 200))
+        self.assertEqual(strokes[1], [(300, 101)])
+        self.assertEqual(strokes[2], [(0, 200), (480, 190)])  # clamped to the pad
+        self.assertLess(len(self.strokes), 40)
+        self.assertIsNone(signatures.parse(json.dumps({'width': 500, 'height': 200, 'strokes': [[]]})))
+        bad_values = [
+            'not json', '{"width": 0, "height": 200, "strokes": []}', '{"width": 500}',
+            '{"width": 1e999, "height": 200, "strokes": []}',
+            '{"width": 500, "height": 200, "strokes": [[1e999, 10]]}',
+            '{"width": 500, "height": 200, "strokes": [[NaN, 10]]}',
+            '{"width": 1, "height": 4000, "strokes": [[0, 0, 1, 4000]]}',
+        ]
+        for bad in bad_values:
+            with self.assertRaises(ValidationError):
+                signatures.parse(bad)
+
+    def test_degenerate_pad_renders_bounded(self):
+        # Stored before parse() rejected such pads
+        data = signatures.encode(1, 4000, [[(0, 0), (1, 4000)]])
+        with Image.open(BytesIO(signatures.render_png(data, 1200))) as image:
+            self.assertEqual(image.size, (2, 9600))
+        self.assertIn(b'width="2" height="9600"', signatures.render_svg(data, 1200))
+
+    def test_unchanged_signature_is_kept(self):
+        digest = self.report.signature_digest
+        self.assertFalse(self.report.set_signature(signatures.parse(json.dumps({
+            'width': 500, 'height': 200,
+            'strokes': [[20, 150, 60, 40, 110, 160, 170, 30, 240, 170], [300, 101], [0, 200, 480, 190]],
+        }))))
+        self.assertEqual(self.report.signature_digest, digest)
+
+    def test_rendered_on_demand_and_cached(self):
+        response = self.client.get(self.signature_url('png', w=500))
+        self.assertEqual(response['Content-Type'], 'image/png')
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (600, 240))  # rounded up to a configured width
+            self.assertEqual(image.mode, 'RGBA')
+            self.assertGreater(image.getchannel('A').getextrema()[1], 200)
+
+        with self.assertNumQueries(3):  # session, user, digest; the strokes aren't loaded on a hit
+            again = self.client.get(self.signature_url('png', w=600))
+        self.assertEqual(again['ETag'], response['ETag'])
+        revalidated = self.client.get(self.signature_url('png', w=600), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        svg = self.client.get(self.signature_url('svg', w=300, v=self.report.signature_digest[:12]))
+        self.assertIn(b'viewBox="0 0 500 200"', b''.join(svg.streaming_content))
+        self.assertIn('immutable', svg['Cache-Control'])
+        self.assertEqual(len(list((Path(self.media_root) / 'signature-cache').iterdir())), 2)
+        self.assertEqual(self.client.get(self.signature_url('gif')).status_code, 404)
+
+    def test_detail_page_and_pdf_use_strokes(self):
+        response = self.client.get(reverse('report_detail', args=[self.report.pk]))
+        self.assertContains(response, self.report.signature_url)
+        layout = pdf.ReportLayout(ServiceReport.objects.get(pk=self.report.pk))
+        layout.render()
+        paths = [op for page in layout.pdf.pages for op in page if op.startswith(b'q 1 J 1 j')]
+        self.assertEqual(len(paths), 3)  # one vector path per stroke, no embedded image
+        self.assertEqual(len(layout.pdf.images), 2)  # just the letterhead logos
+
+
+class StaticAssetTests(TestCase):
+    def test_minify_js(self):
+        source = (
+            "// comment\nvar a = 'x // y', b = `${a} /* z */`;\n"
+            "var re = /[/]\\//g, c = a + +b, d = 4 / 2 / 1;\n"
+            "/* block */ if (re.test(a)) return\nc\n"
+        )
+        self.assertEqual(
+            assets.minify_js(source),
+            "var a='x // y',b=`${a} /* z */`;\nvar re=/[/]\\//g,c=a+ +b,d=4/2/1;\nif(re.test(a))return\nc",
+        )
+
+    def test_minify_css(self):
+        source = '/* theme */\n.card > a:hover,\n.card a {\n    content: "a  ;  b";\n    margin: 0 auto;\n}\n'
+        self.assertEqual(assets.minify_css(source), '.card>a:hover,.card a{content:"a  ;  b";margin:0 auto}')
+
+    def test_png_optimized_losslessly(self):
+        path = Path(settings.BASE_DIR) / 'static' / 'img' / 'iso_logo.png'
+        original = path.read_bytes()
+        optimized = assets.optimize_png(original)
+        self.assertLess(len(optimized), len(original))
+        with Image.open(BytesIO(original)) as before, Image.open(BytesIO(optimized)) as after:
+            self.assertEqual(before.convert('RGBA').tobytes(), after.convert('RGBA').tobytes())
+
+    def test_collectstatic_builds_hashed_compressed_assets(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'core.assets.StaticAssetStorage'}}
+        with override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            manifest = json.loads((Path(static_root) / 'staticfiles.json').read_text())['paths']
+            for name in ['js/report_form.js', 'css/styles.css']:
+                self.assertRegex(manifest[name], r'\.[0-9a-f]{12}\.(js|css)$')
+                hashed = Path(static_root) / manifest[name]
+                built = hashed.read_text()
+                self.assertLess(len(built), len((Path(settings.BASE_DIR) / 'static' / name).read_text()))
+                self.assertNotIn('/*', built)
+                self.assertEqual(gzip.decompress(hashed.with_name(hashed.name + '.gz').read_bytes()).decode(), built)
+            source = (Path(settings.BASE_DIR) / 'static' / 'js' / 'report_form.js').read_text()
+            self.assertEqual((Path(static_root) / manifest['js/report_form.js']).read_text(), assets.minify_js(source))
+
+            self.client.force_login(User.objects.create_user('engineer', password='secret'))
+            response = self.client.get(reverse('report_create'))
+            self.assertContains(response, settings.STATIC_URL + manifest['js/report_form.js'])
+            self.assertContains(response, settings.STATIC_URL + manifest['css/styles.css'])
+            asset = self.client.get(settings.STATIC_URL + manifest['js/report_form.js'], HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(asset['Content-Encoding'], 'gzip')
+            self.assertIn('immutable', asset['Cache-Control'])
+
+
+class MediaServingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.photo = self.add_image(make_jpeg())
+        self.url = self.photo.image.url
+        self.content = self.photo.image.read()
+
+    def test_requires_login_and_a_referencing_report(self):
+        self.assertEqual(resolve(self.url).url_name, 'media')
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.user)
+        orphan = ReportImage._meta.get_field('image').storage.save('report_photos/orphan.jpg', ContentFile(b'x'))
+        self.assertEqual(self.client.get(settings.MEDIA_URL + orphan).status_code, 404)
+        self.assertEqual(self.client.get(settings.MEDIA_URL + '../config/settings.py').status_code, 404)
+
+    def test_full_and_conditional_responses(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        with self.assertNumQueries(3):  # session, user and the ownership check
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_range_requests(self):
+        size = len(self.content)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{size}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+        # A range on a changed file isn't applied; the whole new file is sent
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+
+    def test_handed_to_front_end_server(self):
+        name = self.photo.image.name
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + name)
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], str(Path(self.media_root, name).resolve()))
+
+
+class SchedulingTests(TestCase):
+    MONDAY = datetime.date(2026, 3, 2)
+
+    def days(self, count):
+        return [self.MONDAY + datetime.timedelta(days=offset) for offset in range(count)]
+
+    def test_windows_urgency_and_districts(self):
+        tue, wed = self.days(3)[1:]
+        assignments, unscheduled = scheduling.plan_visits(
+            [
+                (1, 'Low', None, None, 'Tyre'),
+                (2, 'Emergency', None, None, 'Akkar'),
+                (3, 'Medium', wed, wed, 'Tripoli'),
+                (4, 'Low', None, None, 'Tyre'),
+                (5, 'High', None, self.MONDAY - datetime.timedelta(days=1), 'Beirut'),
+                (6, 'Low', self.MONDAY + datetime.timedelta(days=30), None, 'Beirut'),
+            ],
+            # Engineer 10 is already in Tyre on Monday
+            [(10, self.MONDAY, 'Tyre')], [10, 11], self.days(3), capacity=3,
+        )
+        self.assertEqual(assignments[2], (11, self.MONDAY))  # the free engineer goes to the emergency
+        self.assertEqual(assignments[1], (10, self.MONDAY))
+        self.assertEqual(assignments[4], (10, self.MONDAY))  # grouped with the other Tyre visit
+        self.assertEqual(assignments[3][1], wed)
+        self.assertEqual(unscheduled, {5: scheduling.PASSED, 6: scheduling.BEYOND_HORIZON})
+
+    def test_urgent_requests_take_scarce_slots(self):
+        requests = [(i, 'Low', None, None, 'Beirut') for i in range(5)] + [(9, 'High', None, None, 'Beirut')]
+        assignments, unscheduled = scheduling.plan_visits(requests, [], [1], self.days(1), capacity=2)
+        self.assertEqual(set(assignments), {0, 9})
+        self.assertEqual(set(unscheduled.values()), {scheduling.HORIZON_FULL})
+        # A request that can wait isn't sent to the other end of the country
+        assignments, _ = scheduling.plan_visits(
+            [(1, 'High', None, None, 'Hermel'), (2, 'Low', None, None, 'Tyre')], [], [1], self.days(2), capacity=2,
+        )
+        self.assertEqual(assignments, {1: (1, self.MONDAY), 2: (1, self.MONDAY + datetime.timedelta(days=1))})
+        # ...unless no nearby engineer turns up before the horizon ends
+        booked = [(1, day, 'Tripoli') for day in self.days(3)]
+        assignments, unscheduled = scheduling.plan_visits([(1, 'Low', None, None, 'Tyre')], booked, [1], self.days(3), capacity=2)
+        self.assertEqual((assignments, unscheduled), ({1: (1, self.days(3)[-1])}, {}))
+
+    def test_thousands_of_requests(self):
+        districts = list(stats.GOVERNORATES)
+        urgencies = list(scheduling.URGENCY_RANK)
+        requests = [
+            (i, urgencies[i % 4], self.MONDAY + datetime.timedelta(days=i % 9), None, districts[i % len(districts)])
+            for i in range(5000)
+        ]
+        start = time.perf_counter()
+        assignments, unscheduled = scheduling.plan_visits(requests, [], list(range(30)), self.days(14), capacity=4)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(len(assignments) + len(unscheduled), 5000)
+        self.assertEqual(len(assignments), 30 * 14 * 4)
+        for request_id, (_, day) in assignments.items():
+            self.assertGreaterEqual(day, requests[request_id][2])
+
+    def test_staff_view_previews_and_applies(self):
+        staff = User.objects.create_user('dispatcher', password='secret', is_staff=True)
+        engineer = User.objects.create_user('engineer', password='secret')
+        ServiceReport.objects.create(engineer=engineer, service_date=datetime.datetime(2026, 3, 2, 9, tzinfo=datetime.timezone.utc))
+        request = MaintenanceRequest.objects.create(facility_name='AUBMC', location='Beirut', urgency='High', created_by=staff)
+        url = reverse('request_schedule') + '?start=2026-03-02'
+
+        self.client.force_login(engineer)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertContains(response, f'#MR-{request.pk}')
+        self.assertEqual(response.context['plan'].assignments, {request.pk: (engineer.pk, self.MONDAY)})
+
+        previewed = {'start': '2026-03-02', 'digest': response.context['plan'].digest()}
+        self.assertContains(response, f'value="{previewed["digest"]}"')
+        self.assertEqual(self.client.post(reverse('request_schedule'), {'digest': previewed['digest']}).status_code, 400)
+
+        # A request opened since the preview changes the plan, so it isn't applied
+        late = MaintenanceRequest.objects.create(facility_name='LAU', location='Beirut', created_by=staff)
+        response = self.client.post(reverse('request_schedule'), previewed)
+        self.assertContains(response, 'nothing was scheduled', status_code=409)
+        self.assertFalse(MaintenanceRequest.objects.filter(status='Scheduled').exists())
+        late.delete()
+
+        response = self.client.post(reverse('request_schedule'), previewed)
+        self.assertRedirects(response, reverse('request_list') + '?status=Scheduled')
+        request.refresh_from_db()
+        self.assertEqual((request.status, request.assigned_engineer, request.scheduled_date), ('Scheduled', engineer, self.MONDAY))
+        self.assertContains(self.client.get(reverse('request_detail', args=[request.pk])), 'Scheduled Visit')
+
+        # The report and the scheduled request now fill two of the engineer's Monday slots
+        other = MaintenanceRequest.objects.create(facility_name='LAU', location='Beirut')
+        for visits, planned in ((2, '0 of 1'), (3, '1 of 1')):
+            out = StringIO()
+            call_command('schedule_requests', start=self.MONDAY, days=1, visits_per_day=visits, stdout=out)
+            self.assertIn(f'{planned} open requests planned', out.getvalue())
+        self.assertIn(f'MR-{other.pk}', out.getvalue())
+
+
+calls = []
+
+
+@tasks.task('tests.record')
+def record_task(value, fail_times=0):
+    calls.append(value)
+    if calls.count(value) <= fail_times:
+        raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key_dedupes_pending_jobs(self):
+        first = tasks.enqueue('tests.record', {'value': 'a'}, key='record:a')
+        second = tasks.enqueue('tests.record', {'value': 'a'}, key='record:a')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+        # Once the job has run the same key can be queued again
+        third = tasks.enqueue('tests.record', {'value': 'a'}, key='record:a')
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            tasks.enqueue('tests.missing')
+
+    @override_settings(TASKS_RETRY_DELAY=0)
+    def test_retries_then_succeeds(self):
+        job = tasks.enqueue('tests.record', {'value': 'b', 'fail_times': 2})
+        with self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(calls, ['b', 'b', 'b'])
+
+    def test_gives_up_after_max_attempts(self):
+        job = tasks.enqueue('tests.record', {'value': 'c', 'fail_times': 5}, max_attempts=1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+    def test_retry_waits_for_backoff(self):
+        job = tasks.enqueue('tests.record', {'value': 'd', 'fail_times': 1})
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(tasks.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertGreater(job.run_after, job.updated_at)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_claim_is_exclusive_and_stale_jobs_requeue(self):
+        job = tasks.enqueue('tests.record', {'value': 'e'})
+        claimed = tasks.claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(tasks.claim_next())
+
+        Job.objects.filter(pk=job.pk).update(locked_at=claimed.locked_at - datetime.timedelta(hours=1))
+        self.assertEqual(tasks.requeue_stale(), 1)
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, ['e'])
+
+    @override_settings(TASKS_MODE='eager')
+    def test_eager_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue('tests.record', {'value': 'f'})
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['f'])
+
+    def test_worker_command(self):
+        tasks.enqueue('tests.record', {'value': 'g'})
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        self.assertEqual(calls, ['g'])
+        self.assertIn('Processed 1 jobs.', out.getvalue())
+
+    @override_settings(SEARCH_INLINE_REINDEX_LIMIT=0)
+    def test_product_rename_reindexes_in_background(self):
+        user = User.objects.create_user('engineer')
+        product = Product.objects.create(name='Centrifuge', category='Lab', manufacturer='Acme', model='C1')
+        report = ServiceReport.objects.create(client_name='AUB', engineer=user)
+        ReportItem.objects.create(report=report, product=product)
+        product.name = 'Autoclave'
+        product.save()
+        job = Job.objects.get(idempotency_key=f'product-index:{product.pk}')
+        self.assertEqual((job.name, job.payload), ('search.index_product_reports', {'product_id': product.pk}))
+        search_pks = lambda q: list(search.search_reports(ServiceReport.objects.all(), q).values_list('pk', flat=True))
+        self.assertEqual(search_pks('autoclave'), [])
+        tasks.run_pending()
+        self.assertEqual(search_pks('autoclave'), [report.pk])
@@ -0,0 +1,90 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, UnidentifiedImageError
+
+from .models import ReportImage
+from .storage import adjust_references
+from .tasks import enqueue
+
+IMAGE_FIELD = 'images'
+ALLOWED_FORMATS = {'image/jpeg': 'JPEG', 'image/png': 'PNG'}
+
+
+class ReportImageUploadHandler(FileUploadHandler):
+    """
+    Enforce type and size limits on report photos while the body streams in.
+
+    Rejected files are skipped before they reach the memory/temp-file
+    handlers, and the reason is left on ``request.upload_rejections`` for
+    the view to report.
+    """
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+        self.size = 0
+        if field_name == IMAGE_FIELD and content_type not in ALLOWED_FORMATS:
+            self.reject(f'{file_name}: only JPEG and PNG photos can be attached.')
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name == IMAGE_FIELD:
+            self.size += len(raw_data)
+            limit = settings.REPORT_IMAGE_MAX_UPLOAD_SIZE
+            if self.size > limit:
+                self.reject(f'{self.file_name}: photos must be smaller than {filesizeformat(limit)}.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def reject(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_rejections'):
+                self.request.upload_rejections = []
+            self.request.upload_rejections.append(message)
+        raise SkipFile(message)
+
+
+def stage_images(request):
+    """
+    Validate the uploaded photos and write them to media storage.
+
+    Runs before the report transaction opens so no file I/O happens while
+    SQLite holds the write lock. Returns the stored names; blobs left over
+    from a transaction that later fails are collected by ``gc_media``.
+    """
+    errors = list(getattr(request, 'upload_rejections', []))
+    uploads = request.FILES.getlist(IMAGE_FIELD)
+    limit = settings.REPORT_IMAGE_MAX_UPLOAD_SIZE
+    for upload in uploads:
+        if upload.size > limit:
+            errors.append(f'{upload.name}: photos must be smaller than {filesizeformat(limit)}.')
+            continue
+        try:
+            with Image.open(upload) as image:
+                image_format = image.format
+                image.verify()
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            image_format = None
+        if image_format not in ALLOWED_FORMATS.values():
+            errors.append(f'{upload.name}: only JPEG and PNG photos can be attached.')
+        upload.seek(0)
+    if errors:
+        raise ValidationError(errors)
+
+    field = ReportImage._meta.get_field('image')
+    return [field.storage.save(field.generate_filename(None, upload.name), upload) for upload in uploads]
+
+
+def attach_images(report, names):
+    """Insert ReportImage rows for staged files in one query and queue their derivatives."""
+    if not names:
+        return []
+    report_images = ReportImage.objects.bulk_create([ReportImage(report=report, image=name) for name in names])
+    adjust_references(Counter(names))
+    for report_image in report_images:
+        enqueue('images.build_derivatives', {'image_id': report_image.pk}, key=f'derivatives:{report_image.pk}')
+    return report_images
@@ -1,21 +1,28 @@
 from django.urls import path
 from .views import (
-    DashboardView, ServiceReportCreateView, ServiceReportUpdateView, ServiceReportDetailView,
-    ProductListView, ProductCreateView, product_create_ajax,
-    MaintenanceRequestListView, MaintenanceRequestCreateView, MaintenanceRequestDetailView, MaintenanceRequestUpdateView
+    DashboardView, DashboardCardsView, ServiceReportExportView, ServiceReportCreateView, ServiceReportUpdateView, ServiceReportDetailView, ServiceReportPDFView, ServiceReportSignatureView,
+    ProductListView, ProductCreateView, product_create_ajax, product_search,
+    MaintenanceRequestListView, MaintenanceRequestExportView, RequestScheduleView, MaintenanceRequestCreateView, MaintenanceRequestDetailView, MaintenanceRequestUpdateView
 )
 
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'),
+    path('report/cards/', DashboardCardsView.as_view(), name='report_cards'),
+    path('report/export/', ServiceReportExportView.as_view(), name='report_export'),
     path('report/new/', ServiceReportCreateView.as_view(), name='report_create'),
     path('report/<int:pk>/edit/', ServiceReportUpdateView.as_view(), name='report_update'),
     path('report/<int:pk>/', ServiceReportDetailView.as_view(), name='report_detail'),
+    path('report/<int:pk>/pdf/', ServiceReportPDFView.as_view(), name='report_pdf'),
+    path('report/<int:pk>/signature.<str:image_format>', ServiceReportSignatureView.as_view(), name='report_signature'),
     path('products/', ProductListView.as_view(), name='product_list'),
     path('products/new/', ProductCreateView.as_view(), name='product_create'),
     path('products/create-ajax/', product_create_ajax, name='product_create_ajax'),
+    path('products/search/', product_search, name='product_search'),
     
     # Maintenance Requests
     path('requests/', MaintenanceRequestListView.as_view(), name='request_list'),
+    path('requests/export/', MaintenanceRequestExportView.as_view(), name='request_export'),
+    path('requests/schedule/', RequestScheduleView.as_view(), name='request_schedule'),
     path('requests/new/', MaintenanceRequestCreateView.as_view(), name='request_create'),
     path('requests/<int:pk>/', MaintenanceRequestDetailView.as_view(), name='request_detail'),
     path('requests/<int:pk>/edit/', MaintenanceRequestUpdateView.as_view(), name='request_update'),
@@ -1,40 +1,231 @@
-import base64
-from django.core.files.base import ContentFile
-from django.shortcuts import render, redirect
-from django.views.generic import ListView, CreateView, UpdateView, DetailView
+import datetime
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404, render, redirect
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.views.generic import View, ListView, CreateView, UpdateView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.urls import reverse_lazy
-from django.db.models import Q
-from .models import ServiceReport, Product, ReportImage, MaintenanceRequest, MaintenanceRequestEquipment
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.conf import settings
+from django.core.cache import caches
+from django.template.defaultfilters import date as date_filter
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.safestring import mark_safe
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .models import ServiceReport, ReportItem, ReportImage, Product, MaintenanceRequest, MaintenanceRequestEquipment
+from .concurrency import attach_prefetched, gather_reads
 from django.db import transaction
+from django.utils import timezone
+from . import exports, media, signatures
+from .instrumentation import budget
+from .stats import dashboard_summary
+from .pdf import report_pdf
+from .search import search_reports
+from .pagination import CursorPaginationMixin, CursorPaginator, InvalidCursor
+from .scheduling import Plan
+from .uploads import attach_images, stage_images
 from .forms import (
     ServiceReportForm, ProductForm, ReportItemFormSet, 
     MaintenanceRequestForm, MaintenanceRequestEquipmentFormSet
 )
 
-class DashboardView(LoginRequiredMixin, ListView):
-    model = ServiceReport
-    template_name = 'core/dashboard.html'
-    context_object_name = 'reports'
-    paginate_by = 20
+def related_version(model, fk, **extra):
+    """Subqueries summarising the rows of ``model`` pointing at the outer row: count, newest id, plus any ``extra`` aggregates."""
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    aggregates = {'count': Count('pk'), 'latest': Max('pk'), **extra}
+    return [Subquery(rows.annotate(value=aggregate).values('value')) for aggregate in aggregates.values()]
 
-    def get_queryset(self):
-        queryset = super().get_queryset().order_by('-created_at')
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs on a detail page with 304 before it is built.
+
+    ``get_version`` returns the row's last modification time and a tuple of
+    everything else the page depends on, read in one query. The ETag also
+    covers the viewing user, since links on the page depend on their rights,
+    and the collected assets, so a deploy doesn't leave pages pointing at
+    the previous build's hashed file names.
+    """
+
+    def get_version(self):
+        raise NotImplementedError
+
+    def get_validators(self, version):
+        if version is None:
+            raise Http404('No matching object found.')
+        last_modified, parts = version
+        user = self.request.user
+        assets = getattr(staticfiles_storage, 'manifest_hash', '')
+        etag = quote_etag(hashlib.sha1(repr((parts, user.pk, user.username, user.is_staff, assets)).encode()).hexdigest())
+        return etag, int(last_modified.timestamp())
+
+    def set_validators(self, response, etag, timestamp):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(timestamp))
+        # Browsers keep the page but revalidate it on every visit
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        etag, timestamp = self.get_validators(self.get_version())
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.set_validators(response, etag, timestamp)
+
+class AsyncLoginRequiredMixin:
+    """
+    LoginRequiredMixin for the async views served under ASGI.
+
+    The user is loaded with ``request.auser()`` and put on the request, so
+    nothing later resolves the lazy ``request.user`` synchronously. It
+    dispatches straight to View.dispatch, skipping the sync access mixins
+    of the view it extends; the view's ``get`` repeats their checks.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+def render_cards(reports):
+    """Each dashboard card's HTML, served from the fragment cache and rendered only on a miss."""
+    cache = caches[settings.DASHBOARD_CARD_CACHE]
+    keys = [f'dashboard-card:{report.pk}:{report.card_version}' for report in reports]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for key, report in zip(keys, reports):
+        if key not in cached:
+            cached[key] = missing[key] = render_to_string('core/report_card.html', {'report': report})
+        cards.append(mark_safe(cached[key]))
+    cache.set_many(missing)
+    return cards
+
+class ReportFilterMixin:
+    """The dashboard's ?q=, ?status= and category filters, shared with the export."""
+    category_filters = ['service_type', 'billing_category', 'final_status']
+
+    def filter_reports(self, queryset, ranked=False):
         search_query = self.request.GET.get('q')
         status_filter = self.request.GET.get('status')
         
         if search_query:
-            queryset = queryset.filter(
-                Q(client_name__icontains=search_query) |
-                Q(location__icontains=search_query) |
-                Q(items__product__name__icontains=search_query)
-            ).distinct()
+            queryset = search_reports(queryset, search_query, ranked=ranked)
         
         if status_filter:
             queryset = queryset.filter(status=status_filter)
+
+        # ?service_type=Repair&billing_category=Warranty, each an indexed flag lookup
+        for name in self.category_filters:
+            value = self.request.GET.get(name)
+            if value:
+                queryset = queryset.filter(**{f'{name}__has': value})
             
         return queryset
 
+@budget(queries=6)
+class DashboardView(LoginRequiredMixin, ReportFilterMixin, CursorPaginationMixin, ListView):
+    model = ServiceReport
+    template_name = 'core/dashboard.html'
+    context_object_name = 'reports'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return self.filter_reports(ServiceReport.objects.cards().order_by('-created_at'), ranked=True)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['category_filters'] = []
+        for name in self.category_filters:
+            field = ServiceReport._meta.get_field(name)
+            options = []
+            for value in field.flags:
+                params = self.request.GET.copy()
+                params.pop(self.cursor_kwarg, None)
+                active = params.get(name) == value
+                if active:
+                    params.pop(name)  # clicking the active filter clears it
+                else:
+                    params[name] = value
+                options.append({'label': value, 'url': '?' + params.urlencode(), 'active': active})
+            context['category_filters'].append((field.verbose_name, options))
+        context['cards'] = render_cards(context['reports'])
+        context['stats'] = self.get_stats()
+        params = self.request.GET.copy()
+        params.pop(self.cursor_kwarg, None)
+        context['filter_query'] = params.urlencode()
+        return context
+
+    def get_stats(self):
+        return dashboard_summary()
+
+@budget(queries=5)
+class AsyncDashboardView(AsyncLoginRequiredMixin, DashboardView):
+    """DashboardView under ASGI; the page of cards, the total and the sidebar stats are read at the same time."""
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        paginator = CursorPaginator(self.object_list, self.paginate_by)
+        try:
+            self.page, _, self.stats = await gather_reads(
+                lambda: paginator.page(request.GET.get(self.cursor_kwarg)),
+                lambda: paginator.count,  # cached, so the template's count doesn't query again
+                dashboard_summary,
+            )
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.page.paginator, self.page, self.page.object_list, self.page.has_other_pages()
+
+    def get_stats(self):
+        return self.stats
+
+def card_data(report):
+    """The fields a dashboard card shows, for building cards client-side."""
+    return {
+        'id': report.pk,
+        'client': report.client_name,
+        'location': report.location,
+        'status': report.status,
+        'date': date_filter(report.service_date, 'M d, Y'),
+        'product': report.first_product_name,
+        'more': max(report.item_count - 1, 0),
+        'engineer': report.engineer.username,
+        'thumbnail': report.first_thumbnail_url,
+        'srcset': report.first_image_srcset,
+    }
+
+@budget(queries=3)
+class DashboardCardsView(DashboardView):
+    """The next batch of dashboard cards as JSON, for infinite scroll."""
+
+    def get(self, request, *args, **kwargs):
+        paginator = CursorPaginator(self.get_queryset(), self.paginate_by)
+        try:
+            page = paginator.page(request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        return JsonResponse({'results': [card_data(report) for report in page], 'next': page.next_cursor})
+
+@budget(queries=2)
+class ServiceReportExportView(LoginRequiredMixin, ReportFilterMixin, View):
+    # Row queries run while the response streams, after the budget is checked
+    def get(self, request):
+        queryset = self.filter_reports(ServiceReport.objects.order_by('-created_at', '-id'))
+        rows = exports.report_rows(queryset)
+        filename = f'service-reports-{timezone.localdate():%Y-%m-%d}'
+        return exports.export_response(exports.REPORT_HEADERS, rows, filename, request.GET.get('format'), sheet='Service Reports')
+
+@budget(queries=40)
 class ServiceReportCreateView(LoginRequiredMixin, CreateView):
     model = ServiceReport
     form_class = ServiceReportForm
@@ -56,35 +247,38 @@ class ServiceReportCreateView(LoginRequiredMixin, CreateView):
                 pass
         return initial
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'request': self.request}
+
+    def get_items(self):
+        # Built once per request so a re-render reuses the validated formset
+        if not hasattr(self, 'items'):
+            data = self.request.POST if self.request.POST else None
+            self.items = ReportItemFormSet(data, request=self.request)
+        return self.items
+
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
-        if self.request.POST:
-            data['items'] = ReportItemFormSet(self.request.POST)
-        else:
-            data['items'] = ReportItemFormSet()
+        data['items'] = self.get_items()
         return data
 
     def form_valid(self, form):
-        context = self.get_context_data()
-        items = context['items']
+        items = self.get_items()
         
         if form.is_valid() and items.is_valid():
+            # Validate and write photos before the transaction takes the write lock
+            try:
+                image_names = stage_images(self.request)
+            except ValidationError as e:
+                form.add_error(None, e)
+                return self.render_to_response(self.get_context_data(form=form))
+
             with transaction.atomic():
                 self.object = form.save(commit=False)
                 self.object.engineer = self.request.user
                 
-                # Handle Signature Base64
-                signature_data = form.cleaned_data.get('client_signature')
-                if signature_data and hasattr(signature_data, 'startswith') and signature_data.startswith('data:image'):
-                    format, imgstr = signature_data.split(';base64,') 
-                    ext = format.split('/')[-1] 
-                    data = ContentFile(base64.b64decode(imgstr), name=f'signature_{self.object.client_name}_{self.object.service_date}.{ext}')
-                    self.object.client_signature = data
-                
-                # Manually sync categorical fields
-                self.object.service_type = form.cleaned_data.get('service_type', '')
-                self.object.billing_category = form.cleaned_data.get('billing_category', '')
-                self.object.final_status = form.cleaned_data.get('final_status', '')
+                if form.cleaned_data.get('signature_strokes'):
+                    self.object.set_signature(form.cleaned_data['signature_strokes'])
                 
                 self.object.save()
                 
@@ -92,80 +286,184 @@ class ServiceReportCreateView(LoginRequiredMixin, CreateView):
                 items.save()
                 
                 # Handle Images
-                images = self.request.FILES.getlist('images')
-                for image in images:
-                    ReportImage.objects.create(report=self.object, image=image)
+                attach_images(self.object, image_names)
                     
             return redirect(self.success_url)
         else:
             return self.render_to_response(self.get_context_data(form=form))
 
+@budget(queries=40)
 class ServiceReportUpdateView(LoginRequiredMixin, UpdateView):
     model = ServiceReport
     form_class = ServiceReportForm
     template_name = 'core/report_form.html'
     success_url = reverse_lazy('dashboard')
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'request': self.request}
+
+    def get_items(self):
+        if not hasattr(self, 'items'):
+            data = self.request.POST if self.request.POST else None
+            self.items = ReportItemFormSet(data, instance=self.object, request=self.request)
+        return self.items
+
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
-        if self.request.POST:
-            data['items'] = ReportItemFormSet(self.request.POST, instance=self.object)
-        else:
-            data['items'] = ReportItemFormSet(instance=self.object)
+        data['items'] = self.get_items()
         return data
 
     def form_valid(self, form):
-        context = self.get_context_data()
-        items = context['items']
+        items = self.get_items()
         
         if form.is_valid() and items.is_valid():
+            # Validate and write photos before the transaction takes the write lock
+            try:
+                image_names = stage_images(self.request)
+            except ValidationError as e:
+                form.add_error(None, e)
+                return self.render_to_response(self.get_context_data(form=form))
+
             with transaction.atomic():
                 self.object = form.save(commit=False)
                 
-                # Handle Signature Base64 (Only if changed/new)
-                signature_data = form.cleaned_data.get('client_signature')
-                if signature_data and hasattr(signature_data, 'startswith') and signature_data.startswith('data:image'):
-                    format, imgstr = signature_data.split(';base64,') 
-                    ext = format.split('/')[-1] 
-                    data = ContentFile(base64.b64decode(imgstr), name=f'signature_{self.object.client_name}_{self.object.service_date}.{ext}')
-                    self.object.client_signature = data
-                
-                # Manually sync categorical fields
-                self.object.service_type = form.cleaned_data.get('service_type', '')
-                self.object.billing_category = form.cleaned_data.get('billing_category', '')
-                self.object.final_status = form.cleaned_data.get('final_status', '')
+                # Strokes are only re-submitted when redrawn, and kept as they are if identical
+                if form.cleaned_data.get('signature_strokes'):
+                    self.object.set_signature(form.cleaned_data['signature_strokes'])
                 
                 self.object.save()
                 items.instance = self.object
                 items.save()
                 
-                images = self.request.FILES.getlist('images')
-                for image in images:
-                    ReportImage.objects.create(report=self.object, image=image)
+                attach_images(self.object, image_names)
                     
             return redirect(self.success_url)
         else:
             return self.render_to_response(self.get_context_data(form=form))
 
-class ServiceReportDetailView(LoginRequiredMixin, DetailView):
+@budget(queries=10)
+class ServiceReportDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     model = ServiceReport
     template_name = 'core/report_detail.html'
     context_object_name = 'report'
 
+    def get_version(self):
+        row = ServiceReport.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', 'engineer_id', 'maintenance_request_id',
+            *related_version(ReportItem, 'report', products=Max('product__updated_at')),
+            *related_version(ReportImage, 'report', thumbnails=Count('pk', filter=~Q(thumbnail=''))),
+        ).first()
+        return row and (row[0], row)
+
+@budget(queries=6)
+class AsyncServiceReportDetailView(AsyncLoginRequiredMixin, ServiceReportDetailView):
+    """ServiceReportDetailView under ASGI; the report, its items and its photos are read at the same time."""
+
+    async def get(self, request, *args, **kwargs):
+        etag, timestamp = self.get_validators(await sync_to_async(self.get_version)())
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            pk = self.kwargs['pk']
+            reports, items, images = await gather_reads(
+                lambda: list(ServiceReport.objects.select_related('engineer', 'maintenance_request').filter(pk=pk)),
+                lambda: list(ReportItem.objects.select_related('product').filter(report=pk)),
+                lambda: list(ReportImage.objects.filter(report=pk)),
+            )
+            if not reports:
+                raise Http404('No matching object found.')
+            self.object = attach_prefetched(reports[0], items=items, images=images)
+            response = self.render_to_response(self.get_context_data(object=self.object))
+        return self.set_validators(response, etag, timestamp)
+
+@budget(queries=8)
+class ServiceReportPDFView(LoginRequiredMixin, View):
+    # A cache hit only needs the report's version, so only that is loaded here
+    def get(self, request, pk):
+        report = get_object_or_404(ServiceReport.objects.only('id', 'status', 'updated_at'), pk=pk)
+        if report.status != 'Completed':
+            raise Http404('Only completed reports can be downloaded as PDF.')
+        return FileResponse(
+            report_pdf(report).open('rb'), content_type='application/pdf',
+            as_attachment='download' in request.GET, filename=f'SR-{report.pk}.pdf',
+        )
+
+@budget(queries=4)
+class ServiceReportSignatureView(LoginRequiredMixin, View):
+    """A drawn signature as PNG or SVG, at the configured width nearest ``?w=``."""
+
+    def get(self, request, pk, image_format):
+        if image_format not in signatures.FORMATS:
+            raise Http404('Unknown signature format.')
+        report = get_object_or_404(ServiceReport.objects.only('id', 'signature_digest'), pk=pk)
+        if not report.signature_digest:
+            raise Http404('This report has no drawn signature.')
+        try:
+            width = signatures.render_width(int(request.GET.get('w', 600)))
+        except ValueError:
+            raise Http404('Invalid signature width.')
+        etag = quote_etag(f'{report.signature_digest}-{width}')
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            path = signatures.signature_file(report, image_format, width)
+            response = FileResponse(path.open('rb'), content_type=signatures.FORMATS[image_format])
+        response.headers.setdefault('ETag', etag)
+        if request.GET.get('v') == report.signature_digest[:12]:
+            # Versioned URLs never change content
+            patch_cache_control(response, private=True, max_age=365 * 24 * 3600, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+@budget(queries=3)
+class MediaView(LoginRequiredMixin, View):
+    """
+    A photo or legacy signature under MEDIA_URL. Only files referenced by a
+    report are served, and only to users who can open that report, which
+    is every signed-in user, as on the report pages.
+    """
+
+    def get(self, request, name):
+        if media.owning_report(name) is None:
+            raise Http404('No such file.')
+        return media.send_file(request, name)
+
+@budget(queries=4)
 class ProductListView(LoginRequiredMixin, ListView):
     model = Product
     template_name = 'core/product_list.html'
     context_object_name = 'products'
 
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.contrib.auth.decorators import login_required
+from django.db.models.functions import Lower
+from django.views.decorators.http import require_GET, require_POST
 
+@budget(queries=6)
 class ProductCreateView(LoginRequiredMixin, CreateView):
     model = Product
     form_class = ProductForm
     template_name = 'core/product_form.html'
     success_url = reverse_lazy('product_list')
 
+@budget(queries=4)
+@login_required
+@require_GET
+def product_search(request):
+    # Prefix match on the indexed lower(name); keyset pages of 20
+    q = request.GET.get('q', '').strip().lower()
+    queryset = Product.objects.filter(is_active=True).annotate(name_key=Lower('name'))
+    if q:
+        queryset = queryset.filter(name_key__gte=q, name_key__lt=q + '\uffff')
+    paginator = CursorPaginator(queryset.order_by('name_key').only('id', 'name', 'model'), 20)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse({
+        'results': [{'id': p.id, 'name': p.name, 'label': str(p)} for p in page],
+        'next': page.next_cursor,
+    })
+
+@budget(queries=6)
 @require_POST
 def product_create_ajax(request):
     form = ProductForm(request.POST)
@@ -181,14 +479,10 @@ def product_create_ajax(request):
         'errors': form.errors
     }, status=400)
 # Maintenance Request Views
-class MaintenanceRequestListView(LoginRequiredMixin, ListView):
-    model = MaintenanceRequest
-    template_name = 'core/request_list.html'
-    context_object_name = 'requests'
-    paginate_by = 20
+class RequestFilterMixin:
+    """The request list's visibility rule and ?q=/?status= filters, shared with the export."""
 
-    def get_queryset(self):
-        queryset = super().get_queryset().order_by('-created_at')
+    def filter_requests(self, queryset):
         if not self.request.user.is_staff:
             queryset = queryset.filter(created_by=self.request.user)
             
@@ -207,6 +501,33 @@ class MaintenanceRequestListView(LoginRequiredMixin, ListView):
             ).distinct()
         return queryset
 
+@budget(queries=6)
+class MaintenanceRequestListView(LoginRequiredMixin, RequestFilterMixin, CursorPaginationMixin, ListView):
+    model = MaintenanceRequest
+    template_name = 'core/request_list.html'
+    context_object_name = 'requests'
+    paginate_by = 20
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('created_by').prefetch_related('equipment_items').order_by('-created_at')
+        return self.filter_requests(queryset)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop(self.cursor_kwarg, None)
+        context['filter_query'] = params.urlencode()
+        return context
+
+@budget(queries=2)
+class MaintenanceRequestExportView(LoginRequiredMixin, RequestFilterMixin, View):
+    def get(self, request):
+        queryset = self.filter_requests(MaintenanceRequest.objects.order_by('-created_at', '-id'))
+        rows = exports.request_rows(queryset)
+        filename = f'maintenance-requests-{timezone.localdate():%Y-%m-%d}'
+        return exports.export_response(exports.REQUEST_HEADERS, rows, filename, request.GET.get('format'), sheet='Maintenance Requests')
+
+@budget(queries=15)
 class MaintenanceRequestCreateView(LoginRequiredMixin, CreateView):
     model = MaintenanceRequest
     form_class = MaintenanceRequestForm
@@ -238,15 +559,87 @@ class MaintenanceRequestCreateView(LoginRequiredMixin, CreateView):
             return redirect(self.success_url)
         return self.render_to_response(self.get_context_data(form=form))
 
-class MaintenanceRequestDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+@budget(queries=12)
+class RequestScheduleView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Staff preview of the dispatch plan for the open requests; posting it marks them Scheduled."""
+    template_name = 'core/request_schedule.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def render_plan(self, plan, changed=False):
+        return render(self.request, self.template_name, {
+            'plan': plan, 'day_plans': plan.day_plans(), 'unscheduled': plan.unscheduled_rows(), 'changed': changed,
+        }, status=409 if changed else 200)
+
+    def get(self, request):
+        try:
+            start = datetime.date.fromisoformat(request.GET.get('start', ''))
+        except ValueError:
+            start = None
+        return self.render_plan(Plan(start=start))
+
+    def post(self, request):
+        # Only the plan that was previewed is applied: the same start date,
+        # and the same assignments once recomputed
+        try:
+            start = datetime.date.fromisoformat(request.POST.get('start', ''))
+        except ValueError:
+            return HttpResponseBadRequest('Missing or invalid start date.')
+        with transaction.atomic():
+            plan = Plan(start=start)
+            if plan.digest() != request.POST.get('digest'):
+                return self.render_plan(plan, changed=True)
+            plan.apply()
+        return redirect(f"{reverse('request_list')}?status=Scheduled")
+
+@budget(queries=9)
+class MaintenanceRequestDetailView(LoginRequiredMixin, UserPassesTestMixin, ConditionalGetMixin, DetailView):
     model = MaintenanceRequest
     template_name = 'core/request_detail.html'
     context_object_name = 'request'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('created_by', 'assigned_engineer')
+
     def test_func(self):
         obj = self.get_object()
         return self.request.user.is_staff or obj.created_by == self.request.user
 
+    def get_version(self):
+        # The linked reports are listed on the page, so their edits count too
+        row = MaintenanceRequest.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', 'created_by_id',
+            *related_version(MaintenanceRequestEquipment, 'request'),
+            *related_version(ServiceReport, 'maintenance_request', updated=Max('updated_at')),
+        ).first()
+        return row and (max(value for value in (row[0], row[-1]) if value), row)
+
+@budget(queries=6)
+class AsyncMaintenanceRequestDetailView(AsyncLoginRequiredMixin, MaintenanceRequestDetailView):
+    """MaintenanceRequestDetailView under ASGI; the request, its equipment and its reports are read at the same time."""
+
+    async def get(self, request, *args, **kwargs):
+        version = await sync_to_async(self.get_version)()
+        etag, timestamp = self.get_validators(version)
+        _, (_, created_by_id, *_) = version
+        if not (request.user.is_staff or created_by_id == request.user.pk):
+            return self.handle_no_permission()
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            pk = self.kwargs['pk']
+            requests, equipment, reports = await gather_reads(
+                lambda: list(MaintenanceRequest.objects.select_related('created_by', 'assigned_engineer').filter(pk=pk)),
+                lambda: list(MaintenanceRequestEquipment.objects.filter(request=pk)),
+                lambda: list(ServiceReport.objects.filter(maintenance_request=pk)),
+            )
+            if not requests:
+                raise Http404('No matching object found.')
+            self.object = attach_prefetched(requests[0], equipment_items=equipment, service_reports=reports)
+            response = self.render_to_response(self.get_context_data(object=self.object))
+        return self.set_validators(response, etag, timestamp)
+
+@budget(queries=15)
 class MaintenanceRequestUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     model = MaintenanceRequest
     form_class = MaintenanceRequestForm
@@ -0,0 +1,56 @@
+// Infinite scroll: fetch the next cursor page as JSON when the end of the grid comes into view.
+// The Next link stays as the fallback without JavaScript.
+(function() {
+    var sentinel = document.getElementById('report-scroll-sentinel');
+    var next = sentinel.dataset.next || null;
+    if (!next || !('IntersectionObserver' in window)) return;
+
+    var grid = document.getElementById('report-grid');
+    var template = document.getElementById('report-card-template');
+    var detailUrl = sentinel.dataset.detailUrl, editUrl = sentinel.dataset.editUrl;
+    document.getElementById('report-next-link').style.display = 'none';
+    var loading = false;
+
+    function buildCard(card) {
+        var node = template.content.firstElementChild.cloneNode(true);
+        var field = name => node.querySelector('[data-field="' + name + '"]');
+        if (card.thumbnail) {
+            field('thumbnail').src = card.thumbnail;
+            if (card.srcset) field('thumbnail').srcset = card.srcset;
+            field('placeholder').remove();
+        } else {
+            field('thumbnail').remove();
+        }
+        field('status').textContent = card.status;
+        field('status').classList.add('badge-' + card.status.toLowerCase());
+        field('client').textContent = card.client || '';
+        field('location').textContent = card.location || '';
+        if (card.product) {
+            field('product').textContent = card.product;
+            field('more').textContent = card.more ? '(+' + card.more + ')' : '';
+        } else {
+            field('product').textContent = '-';
+            field('product').style.color = 'var(--text-muted)';
+        }
+        field('date').textContent = card.date;
+        field('engineer').textContent = card.engineer.charAt(0).toUpperCase();
+        field('engineer').title = card.engineer;
+        field('detail').href = detailUrl.replace('/0/', '/' + card.id + '/');
+        if (card.status === 'Draft') field('edit').href = editUrl.replace('/0/', '/' + card.id + '/');
+        else field('edit').remove();
+        return node;
+    }
+
+    var observer = new IntersectionObserver(function(entries) {
+        if (!entries[0].isIntersecting || loading || !next) return;
+        loading = true;
+        var params = new URLSearchParams(sentinel.dataset.filterQuery);
+        params.set('cursor', next);
+        fetch(sentinel.dataset.cardsUrl + "?" + params).then(r => r.json()).then(d => {
+            d.results.forEach(card => grid.appendChild(buildCard(card)));
+            next = d.next;
+            if (!next) observer.disconnect();
+        }).finally(() => { loading = false; });
+    }, { rootMargin: '600px' });
+    observer.observe(sentinel);
+})();
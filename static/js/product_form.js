@@ -0,0 +1,6 @@
+document.addEventListener('DOMContentLoaded', function() {
+    var inputs = document.querySelectorAll('input[type="text"], input[type="number"], select, textarea');
+    inputs.forEach(function(input) {
+        input.classList.add('form-control');
+    });
+});
@@ -0,0 +1,280 @@
+// Apply form-control class to all inputs for consistent styling
+document.addEventListener('DOMContentLoaded', function() {
+    var inputs = document.querySelectorAll('input[type="text"], input[type="datetime-local"], select, textarea');
+    inputs.forEach(function(input) {
+        input.classList.add('form-control');
+    });
+
+    // Ensure checkbox containers look good
+    var checkboxLists = document.querySelectorAll('.checkbox-list-container ul');
+    checkboxLists.forEach(function(ul) {
+        ul.style.listStyle = 'none';
+        ul.style.padding = '0';
+        ul.style.margin = '0';
+        ul.style.display = 'grid';
+        ul.style.gridTemplateColumns = '1fr';
+        ul.style.gap = '8px';
+    });
+
+    var checkboxItems = document.querySelectorAll('.checkbox-list-container li');
+    checkboxItems.forEach(function(li) {
+        li.style.display = 'flex';
+        li.style.alignItems = 'center';
+        li.style.gap = '10px';
+        li.style.background = '#fff';
+        li.style.padding = '8px 12px';
+        li.style.borderRadius = '6px';
+        li.style.border = '1px solid #e2e8f0';
+    });
+
+    // Specific fix for checkbox
+    var checkboxes = document.querySelectorAll('input[type="checkbox"]');
+    checkboxes.forEach(function(box) {
+         box.style.width = "auto";
+         box.style.transform = "scale(1.5)";
+         box.style.margin = "10px";
+    });
+
+    // Handle deletion of equipment cards (delegated)
+    document.getElementById('equipment-list').addEventListener('click', function(e) {
+        if (e.target && e.target.closest('.remove-item-btn')) {
+            var btn = e.target.closest('.remove-item-btn');
+            var wrapper = btn.closest('.equipment-card-wrapper');
+            if (wrapper) {
+                var deleteCheckbox = wrapper.querySelector('input[type="checkbox"][name$="-DELETE"]');
+                if (deleteCheckbox) {
+                    deleteCheckbox.checked = true;
+                    wrapper.style.display = 'none';
+                } else {
+                    wrapper.remove();
+                }
+            }
+        }
+    });
+});
+
+// --- CLEAN SIGNATURE & FORM LOGIC ---
+var canvas = document.getElementById('signature-pad');
+var ctx = canvas.getContext('2d');
+var signatureInput = document.getElementById('id_signature_strokes');
+var isDrawing = false;
+var lastX = 0, lastY = 0;
+var hasSigned = false;
+// Points of each stroke as flat [x0, y0, x1, y1, ...] arrays in pad pixels;
+// these are what gets submitted, the server renders the image
+var strokes = [];
+
+
+function resizeCanvas() {
+    var ratio = window.devicePixelRatio || 1;
+    var wrapper = document.getElementById('sig-pad-wrapper');
+
+    var w = wrapper.clientWidth;
+    var h = 200;
+
+    canvas.width = w * ratio;
+    canvas.height = h * ratio;
+    canvas.style.width = w + 'px';
+    canvas.style.height = h + 'px';
+
+    ctx.setTransform(1, 0, 0, 1, 0, 0);
+    ctx.scale(ratio, ratio);
+    ctx.lineCap = 'round'; ctx.lineJoin = 'round'; ctx.lineWidth = 2.5; ctx.strokeStyle = '#0f172a';
+
+    clearSignature();
+}
+
+function clearSignature() {
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    hasSigned = false;
+    strokes = [];
+    signatureInput.value = '';
+}
+
+function getMousePos(e) {
+    var rect = canvas.getBoundingClientRect();
+    var clientX = (e.clientX || (e.touches && e.touches[0] ? e.touches[0].clientX : 0));
+    var clientY = (e.clientY || (e.touches && e.touches[0] ? e.touches[0].clientY : 0));
+
+    var ratio = window.devicePixelRatio || 1;
+    var scaleX = canvas.width / (rect.width * ratio);
+    var scaleY = canvas.height / (rect.height * ratio);
+
+    return {
+        x: (clientX - rect.left) * scaleX,
+        y: (clientY - rect.top) * scaleY
+    };
+}
+
+function startDraw(e) {
+    isDrawing = true;
+    var p = getMousePos(e);
+    lastX = p.x; lastY = p.y;
+    ctx.beginPath(); ctx.moveTo(lastX, lastY);
+    strokes.push([Math.round(p.x), Math.round(p.y)]);
+    hasSigned = true;
+    if (e.cancelable) e.preventDefault();
+}
+
+function draw(e) {
+    if (!isDrawing) return;
+    var p = getMousePos(e);
+    ctx.lineTo(p.x, p.y); ctx.stroke();
+    lastX = p.x; lastY = p.y;
+    var stroke = strokes[strokes.length - 1];
+    var x = Math.round(p.x), y = Math.round(p.y);
+    if (x !== stroke[stroke.length - 2] || y !== stroke[stroke.length - 1]) stroke.push(x, y);
+    if (e.cancelable) e.preventDefault();
+}
+
+canvas.addEventListener('mousedown', startDraw);
+canvas.addEventListener('mousemove', draw);
+window.addEventListener('mouseup', () => isDrawing = false);
+canvas.addEventListener('touchstart', startDraw, { passive: false });
+canvas.addEventListener('touchmove', draw, { passive: false });
+canvas.addEventListener('touchend', () => isDrawing = false);
+
+function confirmSignature() {
+    if (!hasSigned) { alert("Please sign first."); return; }
+
+    var ratio = window.devicePixelRatio || 1;
+    signatureInput.value = JSON.stringify({
+        width: Math.round(canvas.width / ratio),
+        height: Math.round(canvas.height / ratio),
+        strokes: strokes
+    });
+
+    document.getElementById('signature-preview-img').src = canvas.toDataURL('image/png');
+    document.getElementById('signature-editor').style.display = 'none';
+    document.getElementById('signature-preview-container').style.display = 'block';
+}
+
+function replaceSignature() {
+    clearSignature();
+    document.getElementById('signature-editor').style.display = 'block';
+    document.getElementById('signature-preview-container').style.display = 'none';
+    resizeCanvas();
+}
+
+window.addEventListener('resize', resizeCanvas);
+resizeCanvas();
+
+// Handle existing signature on load
+window.addEventListener('DOMContentLoaded', function() {
+    var existingSig = document.getElementById('reportForm').dataset.signatureUrl;
+    if (existingSig) {
+        document.getElementById('signature-editor').style.display = 'none';
+        document.getElementById('signature-preview-container').style.display = 'block';
+    }
+});
+
+document.getElementById('reportForm').addEventListener('submit', function(e) {
+     // Form submission handled by Django
+});
+
+// --- RESTORED EQUIPMENT & PRODUCT AJAX LOGIC ---
+var eqModal = document.getElementById("equipmentModal");
+var addEqBtn = document.getElementById("add-equipment");
+var saveEqBtn = document.getElementById("saveEquipmentBtn");
+
+var productSearch = document.getElementById("modal_product_search");
+var productResults = document.getElementById("modal_product_results");
+var productSearchTimer = null, productNext = null;
+
+function selectProduct(id, label) {
+    document.getElementById("modal_product").value = id;
+    productSearch.value = label;
+    productResults.style.display = "none";
+}
+
+function searchProducts(cursor) {
+    var params = new URLSearchParams({ q: productSearch.value });
+    if (cursor) params.set('cursor', cursor);
+    fetch(document.getElementById('reportForm').dataset.productSearchUrl + '?' + params).then(r => r.json()).then(d => {
+        if (!cursor) productResults.innerHTML = "";
+        var more = productResults.querySelector('.product-more');
+        if (more) more.remove();
+        d.results.forEach(p => {
+            var row = document.createElement('div');
+            row.textContent = p.label;
+            row.style.cssText = "padding: 0.4rem 0.6rem; cursor: pointer; border-bottom: 1px solid #f1f5f9;";
+            row.onclick = () => selectProduct(p.id, p.label);
+            productResults.appendChild(row);
+        });
+        productNext = d.next;
+        if (productNext) {
+            var row = document.createElement('div');
+            row.className = 'product-more';
+            row.textContent = 'Show more...';
+            row.style.cssText = "padding: 0.4rem 0.6rem; cursor: pointer; color: #0369a1;";
+            row.onclick = () => searchProducts(productNext);
+            productResults.appendChild(row);
+        }
+        productResults.style.display = productResults.children.length ? "block" : "none";
+    });
+}
+
+productSearch.addEventListener('input', () => {
+    document.getElementById("modal_product").value = "";
+    clearTimeout(productSearchTimer);
+    productSearchTimer = setTimeout(() => searchProducts(null), 200);
+});
+productSearch.addEventListener('focus', () => { if (!productResults.children.length) searchProducts(null); });
+
+addEqBtn.onclick = () => {
+    eqModal.style.display = "block";
+};
+
+function closeEqModal() {
+    eqModal.style.display = "none";
+    document.getElementById("modal_product").value = "";
+    productSearch.value = "";
+    productResults.innerHTML = "";
+    productResults.style.display = "none";
+    document.getElementById("modal_serial").value = "";
+    document.getElementById("modal_note").value = "";
+}
+
+window.onclick = (e) => {
+    if (e.target == eqModal) closeEqModal();
+    if (e.target == document.getElementById("productModal")) document.getElementById("productModal").style.display = "none";
+};
+
+saveEqBtn.onclick = () => {
+    var pId = document.getElementById("modal_product").value;
+    var pText = productSearch.value;
+    var sn = document.getElementById("modal_serial").value, nt = document.getElementById("modal_note").value;
+
+    if (!pId) { alert("Select product"); return; }
+
+    var idx = document.getElementById('id_items-TOTAL_FORMS').value;
+    var html = document.getElementById('empty-form').innerHTML.replace(/__prefix__/g, idx);
+    var div = document.createElement('div'); div.innerHTML = html;
+    var wrap = div.querySelector('.equipment-card-wrapper');
+
+    wrap.querySelector('input[name$="-product"]').value = pId;
+    wrap.querySelectorAll('input[type="text"]')[0].value = sn;
+    wrap.querySelectorAll('input[type="text"]')[1].value = nt;
+
+    var card = document.createElement('div');
+    card.className = 'equipment-summary-card';
+    card.style.cssText = "background:#f0f9ff; border:1px solid #bae6fd; padding:1rem; border-radius:8px; margin-bottom:1rem; display:flex; justify-content:space-between; align-items:center;";
+    card.innerHTML = `<div><div style="font-weight:700;">${pText}</div><div style="font-size:0.85rem;">S/N: ${sn||'N/A'}</div></div><button type="button" class="btn btn-sm btn-outline-danger remove-item-btn">&times; Remove</button>`;
+
+    wrap.appendChild(card);
+    document.getElementById('equipment-list').appendChild(wrap);
+    document.getElementById('id_items-TOTAL_FORMS').value = parseInt(idx) + 1;
+    closeEqModal();
+};
+
+document.getElementById('quickProductForm').addEventListener('submit', function(e) {
+    e.preventDefault();
+    fetch(document.getElementById('reportForm').dataset.productCreateUrl, {
+        method: 'POST', body: new FormData(this), headers: { 'X-CSRFToken': this.elements.csrfmiddlewaretoken.value }
+    }).then(r => r.json()).then(d => {
+        if (d.success) {
+            selectProduct(d.id, d.name);
+            document.getElementById("productModal").style.display = "none";
+        }
+    });
+});
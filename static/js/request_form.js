@@ -0,0 +1,51 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Universal form-control class
+    var inputs = document.querySelectorAll('input, select, textarea');
+    inputs.forEach(function(input) {
+        if (input.type !== 'submit' && input.type !== 'hidden') {
+            input.classList.add('form-control');
+        }
+    });
+
+    // Dynamic FormSet Logic for Equipment
+    const container = document.getElementById('equipment-list-container');
+    const addBtn = document.getElementById('add-instrument-btn');
+    const totalForms = document.getElementById('id_equipment_items-TOTAL_FORMS');
+    const emptyFormHtml = document.getElementById('empty-eq-form').innerHTML;
+
+    addBtn.addEventListener('click', function() {
+        const currentCount = parseInt(totalForms.value);
+        const newFormHtml = emptyFormHtml.replace(/__prefix__/g, currentCount);
+
+        const div = document.createElement('div');
+        div.innerHTML = newFormHtml;
+        const newCard = div.firstElementChild;
+
+        container.appendChild(newCard);
+        totalForms.value = currentCount + 1;
+
+        // Apply form-control to new inputs
+        newCard.querySelectorAll('input, select, textarea').forEach(input => {
+            input.classList.add('form-control');
+        });
+    });
+
+    // Removal (Delegation)
+    container.addEventListener('click', function(e) {
+        if (e.target.closest('.remove-eq-btn')) {
+            const card = e.target.closest('.equipment-request-card');
+            const deleteCheckbox = card.querySelector('input[type="checkbox"][name$="-DELETE"]');
+
+            if (deleteCheckbox) {
+                // Existing form: mark for deletion
+                deleteCheckbox.checked = true;
+                card.style.display = 'none';
+            } else {
+                // New form: just remove from DOM
+                card.remove();
+                // Optional: decrement totalForms.value if you're feeling adventurous, 
+                // but Django's FormSet usually handles gaps fine if the indices stay consistent.
+            }
+        }
+    });
+});